@@ -0,0 +1,117 @@
+"""Compare cache encodings for large package lists.
+
+Builds synthetic winget inventories (name, id, version, source records with
+realistic publisher prefixes) and reports, per row count and format:
+
+* save_ms  - encoding the list
+* load_ms  - decoding it back
+* bytes    - encoded size
+
+Formats:
+
+* json_pretty    - the old app_cache.json layout: indented JSON of display strings
+* json_compact   - compact JSON of the records
+* binary         - cache_codec's interned column layout
+
+Usage:
+    python benchmarks/cache_format.py
+    python benchmarks/cache_format.py --rows 1000 10000 50000 --repeat 5 --output cache_format.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+import cache_codec  # noqa: E402
+
+PUBLISHERS = ["Microsoft", "Google", "Mozilla", "JetBrains", "Adobe", "Oracle", "Valve", "Discord",
+              "Spotify", "Zoom", "Docker", "GitHub", "Python", "OpenJS", "VideoLAN", "Notepad++",
+              "7zip", "Git", "Postman", "Canonical", "Amazon", "Logitech", "NVIDIA", "Intel"]
+SOURCES = ["winget", "msstore", ""]
+
+
+def make_records(rows, seed=1):
+    """Synthetic inventory with repeated publishers, versions and sources"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        publisher = rng.choice(PUBLISHERS)
+        product = f"Product{i}"
+        records.append({
+            "name": f"{publisher} {product} {rng.choice(['', 'Pro', 'Community', 'Runtime'])}".strip(),
+            "id": f"{publisher}.{product}",
+            "version": f"{rng.randint(1, 30)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}",
+            "source": rng.choice(SOURCES)
+        })
+    return records
+
+
+def display_strings(records):
+    return [f"{r['name']} ({r['id']}) - v{r['version']}" for r in records]
+
+
+FORMATS = {
+    "json_pretty": (
+        lambda records: json.dumps(display_strings(records), indent=2, ensure_ascii=False).encode("utf-8"),
+        lambda blob: json.loads(blob.decode("utf-8"))
+    ),
+    "json_compact": (
+        lambda records: json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        lambda blob: json.loads(blob.decode("utf-8"))
+    ),
+    "binary": (cache_codec.encode, cache_codec.decode),
+}
+
+
+def timed(function, argument, repeat):
+    """Median milliseconds over repeat runs, and the last result"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def run(row_counts, repeat):
+    report = []
+    for rows in row_counts:
+        records = make_records(rows)
+        for name, (encode, decode) in FORMATS.items():
+            save_ms, blob = timed(encode, records, repeat)
+            load_ms, _ = timed(decode, blob, repeat)
+            report.append({"rows": rows, "format": name, "save_ms": round(save_ms, 2),
+                           "load_ms": round(load_ms, 2), "bytes": len(blob)})
+        assert cache_codec.decode(cache_codec.encode(records)) == records
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cache encodings on synthetic package lists")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000], help="row counts to test")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (median is reported)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run(args.rows, max(1, args.repeat))
+
+    print(f"{'rows':>7} {'format':<13} {'save ms':>9} {'load ms':>9} {'bytes':>11}")
+    for row in report:
+        print(f"{row['rows']:>7} {row['format']:<13} {row['save_ms']:>9.2f} {row['load_ms']:>9.2f} {row['bytes']:>11,}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Offscreen startup benchmark for Winstaller.
+
+Launches the GUI in fresh interpreters with the Qt "offscreen" platform and
+reports, per run and as medians:
+
+* import_ms        - importing PyQt and the application modules
+* first_paint_ms   - process start until the main window paints for the first time
+* interactive_ms   - process start until the event loop is idle after that paint
+
+Usage:
+    python benchmarks/startup_benchmark.py --runs 5
+    python benchmarks/startup_benchmark.py --runs 5 --max-interactive-ms 1500
+
+Exits with status 1 when a budget is exceeded, so it can gate release builds.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS = ("import_ms", "first_paint_ms", "interactive_ms")
+
+
+def measure_once():
+    """Start the GUI in this process and print one JSON measurement"""
+    start = time.perf_counter()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, REPO_ROOT)
+
+    import main
+    from PyQt5.QtCore import QObject, QEvent, QTimer
+
+    imported = time.perf_counter()
+    result = {"import_ms": (imported - start) * 1000}
+
+    app = main.setup_application()
+    window = main.MainWindow()
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "first_paint_ms" not in result:
+                result["first_paint_ms"] = (time.perf_counter() - start) * 1000
+                # A zero timer only fires once the queued startup work is done
+                QTimer.singleShot(0, on_interactive)
+            return False
+
+    def on_interactive():
+        result["interactive_ms"] = (time.perf_counter() - start) * 1000
+        app.quit()
+
+    paint_filter = FirstPaintFilter()
+    window.installEventFilter(paint_filter)
+    window.show()
+
+    # Never hang a CI job if the window never paints
+    QTimer.singleShot(30000, app.quit)
+    app.exec_()
+
+    print(json.dumps(result))
+
+
+def run_child():
+    """Run one measurement in a fresh interpreter so imports are cold"""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+        env=env,
+        timeout=120
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"Startup run produced no measurement:\n{completed.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Winstaller startup time offscreen")
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--max-first-paint-ms", type=float, help="fail if the median first paint exceeds this")
+    parser.add_argument("--max-interactive-ms", type=float, help="fail if the median time to interactive exceeds this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_once()
+        return 0
+
+    runs = [run_child() for _ in range(max(1, args.runs))]
+    report = {
+        "runs": runs,
+        "median": {
+            metric: statistics.median(run[metric] for run in runs if metric in run)
+            for metric in METRICS
+            if any(metric in run for run in runs)
+        }
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+    budgets = {
+        "import_ms": args.max_import_ms,
+        "first_paint_ms": args.max_first_paint_ms,
+        "interactive_ms": args.max_interactive_ms,
+    }
+    failed = False
+    for metric, budget in budgets.items():
+        value = report["median"].get(metric)
+        if budget is not None and (value is None or value > budget):
+            print(f"Startup budget exceeded: {metric} = {value} ms (budget {budget} ms)", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
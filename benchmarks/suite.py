@@ -0,0 +1,277 @@
+"""End-to-end benchmark suite running against the fake winget.
+
+Puts benchmarks/fake_winget first on PATH and keeps all state in a temporary
+WINSTALLER_HOME, so it runs anywhere and never touches the real winget or the
+user's data. Reports, per benchmark, the median and fastest of --repeat runs:
+
+* parse_*        - parse_winget_table on list/upgrade output
+* winget_*       - WingetManager calls: cold (spawn + parse + cache write) and warm
+* cache_*        - CacheManager writes and cold reads through the state store
+* history_*      - InstallationHistoryManager appends, stats and queries
+* favorites_*    - joining favorites against an inventory
+* widget_*       - filling the result lists offscreen (skipped without PyQt5)
+
+Usage:
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --only winget cache --repeat 10
+    python benchmarks/suite.py --compare baseline.json --max-regression 1.25
+
+With --compare, exits with status 1 when a benchmark's median is more than
+--max-regression times the baseline's, so a change that slows something down
+is visible in CI.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_WINGET_DIR = os.path.join(REPO_ROOT, "benchmarks", "fake_winget")
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+
+def timed(function, repeat, setup=None):
+    """Milliseconds for each of repeat runs of function(), after setup() if given"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def fake_winget(*args, **env):
+    """Stdout of the fake winget run with extra FAKE_WINGET_* settings"""
+    environment = dict(os.environ, **{f"FAKE_WINGET_{key.upper()}": str(value) for key, value in env.items()})
+    return subprocess.run([sys.executable, os.path.join(FAKE_WINGET_DIR, "winget"), *args],
+                          capture_output=True, text=True, encoding="utf-8", env=environment).stdout
+
+
+def parse_benchmarks(rows):
+    from winget_manager import parse_winget_table
+    list_output = fake_winget("list", rows=rows)
+    upgrade_output = fake_winget("upgrade", rows=rows)
+    yield "parse_list", lambda: parse_winget_table(list_output), None
+    yield "parse_upgrade", lambda: parse_winget_table(upgrade_output), None
+
+
+def winget_benchmarks(rows):
+    from winget_manager import WingetManager
+    os.environ["FAKE_WINGET_ROWS"] = str(rows)
+    manager = WingetManager()
+    installed = manager.list_installed_records(use_cache=False)
+    package_id = installed[0]["id"]
+    yield "winget_list_cold", lambda: manager.list_installed_records(use_cache=False), None
+    yield "winget_list_warm", lambda: manager.list_installed_records(), None
+    yield "winget_upgrade_cold", lambda: manager.get_upgradeable_records(use_cache=False), None
+    yield "winget_search_page_cold", lambda: manager.search("studio", use_cache=False, page=0), None
+    yield "winget_search_full_cold", lambda: manager.search("studio", use_cache=False), None
+    yield "winget_show_cold", lambda: manager.show(package_id, use_cache=False), None
+    yield "winget_show_warm", lambda: manager.show(package_id), None
+
+
+def cache_benchmarks(rows, store):
+    from cache_manager import CacheManager
+    from winget_manager import parse_winget_table
+    records = parse_winget_table(fake_winget("list", rows=rows))
+    cache = CacheManager(store)
+    cache.set_cached_data("bench_records", records)
+    yield "cache_write", lambda: cache.set_cached_data("bench_records", records), None
+    yield "cache_read_warm", lambda: cache.get_cached_data("bench_records"), None
+    # A new manager has nothing decoded yet, like another process or a restart
+    yield "cache_read_cold", lambda: CacheManager(store).get_cached_data("bench_records"), None
+
+
+def history_benchmarks(rows, store):
+    from installation_history import InstallationHistoryManager
+    from winget_manager import parse_winget_table
+    records = parse_winget_table(fake_winget("list", rows=rows))
+    history = InstallationHistoryManager(store)
+    history.load_history()
+    entries = []
+    for i in range(rows * 5):
+        record = records[i % len(records)]
+        entries.append({"date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T12:00:00",
+                        "action": ("install", "uninstall", "upgrade")[i % 3],
+                        "status": "failed" if i % 7 == 0 else "success",
+                        "app_name": record["name"], "package_id": record["id"],
+                        "version": record["version"], "duration": 10.0 + i % 50})
+    history._append_entries(entries)
+    package_id = records[0]["id"]
+    yield "history_append", lambda: history.add_installation("Bench App", "Bench.App", "1.0", duration=1.0), None
+    yield "history_stats", lambda: history.get_installation_stats(), None
+    yield "history_recent_page", lambda: history.get_installation_history(limit=50), None
+    yield "history_query_package", lambda: history.query(package=package_id).fetch(0, 50), None
+    yield "history_query_failed", lambda: history.query(status="failed").fetch(0, 50), None
+
+
+def favorites_benchmarks(rows, store):
+    from favorites_manager import FavoritesManager
+    from winget_manager import parse_winget_table
+    installed = parse_winget_table(fake_winget("list", rows=rows))
+    upgrades = parse_winget_table(fake_winget("upgrade", rows=rows))
+    favorites = FavoritesManager(store)
+    favorites.bulk_add([(record["name"], record["id"]) for record in installed[::2]])
+    # Alternate between two inventories so every join has changed rows to re-annotate
+    changed = [dict(record, version=record["version"] + ".1") for record in installed]
+    inventories = [installed, changed]
+    def join():
+        favorites.update_inventory(inventories[0])
+        inventories.reverse()
+    yield "favorites_join", join, None
+    favorites.update_upgrades(upgrades)
+    yield "favorites_annotated", favorites.get_annotated_favorites, None
+
+
+def widget_benchmarks(rows, store):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from widgets import InstalledAppsWidget, SearchWidget
+    from winget_manager import WingetManager
+    from config_manager import ConfigManager
+    from installation_history import InstallationHistoryManager
+    from favorites_manager import FavoritesManager
+
+    app = QApplication.instance() or QApplication([])
+    os.environ["FAKE_WINGET_ROWS"] = str(rows)
+    manager = WingetManager()
+    config = ConfigManager(store)
+    history = InstallationHistoryManager(store)
+    installed_widget = InstalledAppsWidget(manager, history, config)
+    search_widget = SearchWidget(manager, config, history, FavoritesManager(store))
+    apps = manager.list_installed(use_cache=False)
+    results = manager.search("studio", use_cache=False)
+
+    def populate_installed():
+        installed_widget.on_apps_loaded(apps, "installed")
+        app.processEvents()
+
+    def populate_search():
+        search_widget.on_search_results(results)
+        app.processEvents()
+
+    yield "widget_populate_installed", populate_installed, None
+    yield "widget_populate_search", populate_search, None
+
+
+GROUPS = {
+    "parse": parse_benchmarks,
+    "winget": winget_benchmarks,
+    "cache": cache_benchmarks,
+    "history": history_benchmarks,
+    "favorites": favorites_benchmarks,
+    "widget": widget_benchmarks,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(groups, rows, repeat):
+    from state_store import StateStore
+
+    results = []
+    skipped = {}
+    for group in groups:
+        with tempfile.TemporaryDirectory(prefix="winstaller-bench-") as home:
+            os.environ["WINSTALLER_HOME"] = home
+            store = StateStore(os.path.join(home, "bench.db"), migrate=False)
+            # winget and parse groups use the default store, in the same temporary home
+            factory = GROUPS[group]
+            try:
+                benchmarks = factory(rows) if group in ("parse", "winget") else factory(rows, store)
+                for name, function, setup in benchmarks:
+                    times = timed(function, repeat, setup)
+                    results.append({"name": name, "group": group, "rows": rows, "runs": repeat,
+                                    "median_ms": round(statistics.median(times), 3),
+                                    "min_ms": round(min(times), 3)})
+            except ImportError as e:
+                skipped[group] = str(e)
+            finally:
+                import state_store
+                if state_store._default_store is not None:
+                    state_store._default_store.close()
+                    state_store._default_store = None
+                store.close()
+    return results, skipped
+
+
+def compare(results, baseline_path, max_regression):
+    """Print each benchmark against the baseline; returns the regressed names"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {row["name"]: row for row in json.load(f)["results"]}
+    regressed = []
+    print(f"\n{'benchmark':<28} {'baseline ms':>12} {'now ms':>10} {'ratio':>7}")
+    for row in results:
+        before = baseline.get(row["name"])
+        if not before or not before["median_ms"]:
+            continue
+        ratio = row["median_ms"] / before["median_ms"]
+        flag = "  REGRESSED" if ratio > max_regression else ""
+        print(f"{row['name']:<28} {before['median_ms']:>12.3f} {row['median_ms']:>10.3f} {ratio:>7.2f}{flag}")
+        if ratio > max_regression:
+            regressed.append(row["name"])
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Winstaller's managers and widgets against a fake winget")
+    parser.add_argument("--only", nargs="+", choices=sorted(GROUPS), help="benchmark groups to run (default: all)")
+    parser.add_argument("--rows", type=int, default=1000, help="installed packages reported by the fake winget")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark (median is reported)")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="with --compare, fail if a median grows by more than this factor")
+    args = parser.parse_args()
+
+    os.environ["PATH"] = FAKE_WINGET_DIR + os.pathsep + os.environ.get("PATH", "")
+    groups = args.only or list(GROUPS)
+    results, skipped = run(groups, args.rows, max(1, args.repeat))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "rows": args.rows,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+    print(f"{'benchmark':<28} {'median ms':>10} {'min ms':>10}")
+    for row in results:
+        print(f"{row['name']:<28} {row['median_ms']:>10.3f} {row['min_ms']:>10.3f}")
+    for group, reason in skipped.items():
+        print(f"{group}: skipped ({reason})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.max_regression)
+        if regressed:
+            print(f"Regressed: {', '.join(regressed)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""Winstaller command line: the GUI's engine without Qt, see src/cli.py"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+# --profile must be handled before the profiled modules are imported
+from profiling import configure_from_args
+configure_from_args(sys.argv)
+
+from cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,28 +6,38 @@ from PyQt5.QtGui import QIcon
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# --profile must be handled before the profiled modules are imported
+from profiling import configure_from_args
+configure_from_args(sys.argv)
+
 from main_window import MainWindow
+from styles import APP_STYLESHEET
+
+FADE_IN_MS = 150
 
 def setup_application():
     """Setup application with performance optimizations"""
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
-    
+
     app = QApplication(sys.argv)
-    
+
     app.setApplicationName("Winstaller")
     app.setApplicationVersion("1.0.0")
     app.setOrganizationName("Winstaller")
-    
+
     try:
         icon = QIcon("package.png")
         app.setWindowIcon(icon)
     except Exception as e:
         print(f"Could not load application icon: {e}")
-    
+
     if sys.platform == "win32":
         app.setStyle('Fusion')
-    
+
+    # One application-level sheet, parsed once, instead of per-widget sheets
+    app.setStyleSheet(APP_STYLESHEET)
+
     return app
 
 if __name__ == "__main__":
@@ -35,15 +45,15 @@ if __name__ == "__main__":
     window = MainWindow()
     window.setWindowOpacity(0.0)
     window.show()
-    
+
     from PyQt5.QtCore import QPropertyAnimation, QEasingCurve
     fade_in = QPropertyAnimation(window, b"windowOpacity")
-    fade_in.setDuration(600)  # 600ms fade-in
+    fade_in.setDuration(FADE_IN_MS)
     fade_in.setStartValue(0.0)
     fade_in.setEndValue(1.0)
     fade_in.setEasingCurve(QEasingCurve.OutCubic)
     fade_in.start()
-    
+
     window.fade_animation = fade_in
-    
-    sys.exit(app.exec_())
\ No newline at end of file
+
+    sys.exit(app.exec_())
@@ -0,0 +1,219 @@
+"""Compact binary encoding for cached winget results
+
+Layout (all integers little-endian):
+
+    magic "WSC" | format version (u8) | kind (u8) | payload
+
+Kinds:
+
+* KIND_JSON    - payload is UTF-8 JSON, for anything that isn't a list of
+                 records or strings
+* KIND_STRINGS - payload is the strings joined with NUL
+* KIND_RECORDS - list of dicts with string values, stored column by column:
+
+    rows (u32) | index width (u8, 2 or 4) | table size (u32)
+    column count (u8) | column names, NUL-joined, u32 length prefixed
+    string table, NUL-joined, u32 length prefixed
+    one array of string-table indexes per column (rows entries each)
+
+  Every distinct string is stored once and index 0 means "key absent".
+  Package ids are split at the first dot into a publisher part and the
+  rest, stored as two columns, so a publisher prefix like "Microsoft" is
+  stored once however many packages share it.
+"""
+
+import itertools
+import json
+import operator
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List
+
+MAGIC = b"WSC"
+FORMAT_VERSION = 1
+
+KIND_JSON = 0
+KIND_STRINGS = 1
+KIND_RECORDS = 2
+
+SPLIT_COLUMNS = ("id",)
+SPLIT_SUFFIX = "\x01rest"  # marks the second half of a split column
+
+_HEADER = struct.Struct("<3sBB")
+_RECORDS_HEADER = struct.Struct("<IBIB")
+_LENGTH = struct.Struct("<I")
+_SEPARATOR = "\0"
+
+
+class CacheFormatError(ValueError):
+    """Raised for data that is not in a supported cache format"""
+
+
+def _is_string_list(data):
+    return all(isinstance(item, str) and _SEPARATOR not in item for item in data)
+
+
+def _index_array(width):
+    return array("H" if width == 2 else "I")
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack_text(text):
+    data = text.encode("utf-8")
+    return _LENGTH.pack(len(data)) + data
+
+
+def encode(data: Any) -> bytes:
+    """Encode a cache value, choosing the most compact kind that fits"""
+    if isinstance(data, list) and data and all(type(item) is dict for item in data):
+        payload = _encode_records(data)
+        if payload is not None:
+            return _HEADER.pack(MAGIC, FORMAT_VERSION, KIND_RECORDS) + payload
+    elif isinstance(data, list) and _is_string_list(data):
+        payload = _SEPARATOR.join(data).encode("utf-8")
+        return _HEADER.pack(MAGIC, FORMAT_VERSION, KIND_STRINGS) + _LENGTH.pack(len(data)) + payload
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, KIND_JSON) + payload
+
+
+def _columns_of(records):
+    """Column name -> list of values (None where a record lacks the key)"""
+    keys = list(dict.fromkeys(itertools.chain.from_iterable(records)))
+    columns = {}
+    for key in keys:
+        try:
+            values = list(map(operator.itemgetter(key), records))
+        except KeyError:
+            values = [record.get(key) for record in records]
+        if key in SPLIT_COLUMNS:
+            parts = [value.partition(".") if value is not None else (None, "", "") for value in values]
+            columns[key] = [head for head, _, _ in parts]
+            columns[key + SPLIT_SUFFIX] = [dot + tail for _, dot, tail in parts]
+        else:
+            columns[key] = values
+    return columns
+
+
+def _encode_records(records: List[Dict[str, str]]):
+    """Column payload for records, or None if a value isn't a NUL-free string"""
+    try:
+        columns = _columns_of(records)
+    except (AttributeError, TypeError):
+        return None  # a non-string id
+
+    # Index 0 is reserved for "absent"; the table is in first-seen order.
+    # Checking the distinct values is much cheaper than checking every cell.
+    try:
+        distinct = dict.fromkeys(itertools.chain.from_iterable(columns.values()))
+    except TypeError:
+        return None  # an unhashable value such as a nested list
+    distinct.pop(None, None)
+    table = list(distinct)
+    if not set(map(type, table)) <= {str} or any(_SEPARATOR in key for key in columns):
+        return None
+    table_text = _SEPARATOR.join(table)
+    if table_text.count(_SEPARATOR) != max(len(table) - 1, 0):
+        return None
+    lookup = dict(zip(table, range(1, len(table) + 1)))
+    lookup[None] = 0
+
+    width = 2 if len(table) < 0xFFFF else 4
+    parts = [
+        _RECORDS_HEADER.pack(len(records), width, len(table), len(columns)),
+        _pack_text(_SEPARATOR.join(columns)),
+        _pack_text(table_text),
+    ]
+    for values in columns.values():
+        indexes = _index_array(width)
+        indexes.extend(map(lookup.__getitem__, values))
+        parts.append(_to_little_endian(indexes))
+    return b"".join(parts)
+
+
+def is_encoded(blob) -> bool:
+    """True for bytes produced by encode()"""
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:3]) == MAGIC
+
+
+def decode(blob: bytes) -> Any:
+    """Decode bytes produced by encode()"""
+    blob = memoryview(blob)
+    if len(blob) < _HEADER.size:
+        raise CacheFormatError("Cache entry is truncated")
+    magic, version, kind = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise CacheFormatError("Not a cache entry")
+    if version != FORMAT_VERSION:
+        raise CacheFormatError(f"Unsupported cache format version {version}")
+
+    payload = blob[_HEADER.size:]
+    if kind == KIND_JSON:
+        return json.loads(bytes(payload).decode("utf-8"))
+    if kind == KIND_STRINGS:
+        count = _LENGTH.unpack_from(payload)[0]
+        text = bytes(payload[_LENGTH.size:]).decode("utf-8")
+        return text.split(_SEPARATOR) if count else []
+    if kind == KIND_RECORDS:
+        return _decode_records(payload)
+    raise CacheFormatError(f"Unknown cache entry kind {kind}")
+
+
+def _read_text(payload, offset):
+    length = _LENGTH.unpack_from(payload, offset)[0]
+    offset += _LENGTH.size
+    return bytes(payload[offset:offset + length]).decode("utf-8"), offset + length
+
+
+def _decode_records(payload) -> List[Dict[str, str]]:
+    rows, width, table_size, column_count = _RECORDS_HEADER.unpack_from(payload)
+    offset = _RECORDS_HEADER.size
+    column_text, offset = _read_text(payload, offset)
+    table_text, offset = _read_text(payload, offset)
+    columns = column_text.split(_SEPARATOR) if column_count else []
+    # Index 0 ("absent") maps to None
+    table = [None] + (table_text.split(_SEPARATOR) if table_size else [])
+
+    values = {}
+    for column in columns:
+        indexes = _index_array(width)
+        size = rows * indexes.itemsize
+        indexes.frombytes(payload[offset:offset + size])
+        offset += size
+        values[column] = list(map(table.__getitem__, _from_little_endian(indexes)))
+
+    keys = [column for column in columns if not column.endswith(SPLIT_SUFFIX)]
+    for key in keys:
+        if key in SPLIT_COLUMNS:
+            tails = values.pop(key + SPLIT_SUFFIX)
+            heads = values[key]
+            if None in heads:
+                values[key] = [head if head is None else head + tail for head, tail in zip(heads, tails)]
+            else:
+                values[key] = list(map(operator.add, heads, tails))
+
+    # Filled a column at a time: about twice as fast as dict(zip(keys, row))
+    # per row, and absent keys (None) are simply skipped
+    records = [{} for _ in range(rows)]
+    for key in keys:
+        column = values[key]
+        if None in column:
+            for record, value in zip(records, column):
+                if value is not None:
+                    record[key] = value
+        else:
+            for record, value in zip(records, column):
+                record[key] = value
+    return records
@@ -1,70 +1,302 @@
 import json
 import time
-import os
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import cache_codec
+from metrics import metrics
+from profiling import profiled
+from state_store import StateStore, get_default_store
+
+GENERATION_KEY = "cache_generation"
+
+# Seconds a result stays fresh, per winget operation. Overridable through
+# the "cache_ttls" config key, which may also set "negative", "error" and
+# "stale".
+DEFAULT_TTLS = {"search": 300, "installed": 120, "upgradeable": 300, "sources": 3600, "show": 3600}
+NEGATIVE_TTL = 60  # empty or partial results
+ERROR_TTL = 30  # timeouts and failures to start winget
+STALE_MAX_AGE = 7 * 24 * 3600  # expired results kept as a fallback when winget fails
+CACHE_TTLS_KEY = "cache_ttls"
+# Adaptive range: identical refreshes double the TTL up to MAX_STRETCH times
+# the base, and the first refresh after a local install uses SHORTEN_FACTOR
+MAX_STRETCH = 8
+SHORTEN_FACTOR = 0.5
+
+
+class CachePolicy:
+    """Decides how long each freshly fetched result should be cached"""
+
+    def __init__(self, config=None):
+        self.config = config
+        self._lock = threading.Lock()
+        self._fingerprints = {}  # cache key -> hash of the last stored data
+        self._stretch = {}  # cache key -> current TTL multiplier
+        self._last_ttl = {}  # cache key -> TTL chosen for the last write
+        self._changed_locally = set()  # operations affected by a local install
+
+    def base_ttl(self, operation: str) -> float:
+        overrides = self.config.get(CACHE_TTLS_KEY, {}) if self.config else {}
+        if operation in overrides:
+            return overrides[operation]
+        if operation == "negative":
+            return NEGATIVE_TTL
+        if operation == "error":
+            return ERROR_TTL
+        if operation == "stale":
+            return STALE_MAX_AGE
+        return DEFAULT_TTLS.get(operation, 300)
+
+    def ttl_for(self, operation: str, cache_key: str, data, partial: bool = False) -> float:
+        """TTL for data just fetched for cache_key, adapting to how often it changes"""
+        fingerprint = hash(json.dumps(data, sort_keys=True))
+        with self._lock:
+            if operation in self._changed_locally:
+                # The system was just modified; check again sooner
+                self._changed_locally.discard(operation)
+                stretch = SHORTEN_FACTOR
+            elif self._fingerprints.get(cache_key) == fingerprint:
+                stretch = min(max(self._stretch.get(cache_key, 1), 1) * 2, MAX_STRETCH)
+            else:
+                stretch = 1
+            self._fingerprints[cache_key] = fingerprint
+            self._stretch[cache_key] = stretch
+
+        if partial or not data:
+            ttl = self.base_ttl("negative") * min(stretch, 1)
+        else:
+            ttl = self.base_ttl(operation) * stretch
+        with self._lock:
+            self._last_ttl[cache_key] = ttl
+        return ttl
+
+    def error_ttl(self) -> float:
+        return self.base_ttl("error")
+
+    def stale_max_age(self) -> float:
+        return self.base_ttl("stale")
+
+    def local_change(self, operations: List[str]):
+        """Note that an install/uninstall/upgrade has just changed these results"""
+        with self._lock:
+            self._changed_locally.update(operations)
+
+    def current_ttls(self) -> Dict[str, float]:
+        """TTL chosen for each cache key's last write, for diagnostics"""
+        with self._lock:
+            return dict(self._last_ttl)
+
+
+class CacheStats:
+    """Counts how cache lookups were answered, per operation"""
+    OUTCOMES = ("hit", "negative_hit", "error_backoff", "miss")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self.started = time.time()
+
+    def record(self, operation: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(operation, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Counts per operation plus hit_rate, the share answered without running winget"""
+        with self._lock:
+            result = {}
+            for operation, counts in self._counts.items():
+                total = sum(counts.values())
+                answered = total - counts["miss"]
+                result[operation] = dict(counts, total=total,
+                                         hit_rate=(answered / total * 100) if total else 0)
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+            self.started = time.time()
+
+
+class LRUCache:
+    """Bounded in-memory mapping that evicts the least recently used key"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
 
 class CacheManager:
-    def __init__(self, cache_file="app_cache.json"):
-        self.cache_file = cache_file
+    """Cache of winget results shared by every thread and Winstaller process
+
+    Entries live in the state store in the compact cache_codec format and
+    are decoded the first time each key is read; each process keeps the
+    decoded ones in memory. Every write or delete bumps a generation counter
+    and stamps the row with it (deletes leave a tombstone row), so when
+    another process commits, only the keys changed since the last generation
+    seen here are dropped from memory.
+    """
+
+    def __init__(self, store: Optional[StateStore] = None):
+        self.store = store or get_default_store()
+        # Decoded entries, filled on first read of each key: key -> (timestamp, data, ttl)
         self.cache = {}
-        self.load_cache()
-    
+        self.stats = CacheStats()
+        # Background loaders (search, prewarm) read and write concurrently
+        self._lock = threading.RLock()
+        self._data_version = self.store.data_version()
+        row = self.store.query_one("SELECT MAX(generation) FROM cache")
+        self._generation = (row[0] or 0) if row else 0
+
     def load_cache(self):
-        """Load cache from file"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    self.cache = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self.cache = {}
-        else:
+        """Forget decoded entries so the next reads come from the store"""
+        with self._lock:
             self.cache = {}
-    
-    def save_cache(self):
-        """Save cache to file"""
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
-        except IOError:
-            pass  # Silently fail if can't save cache
-    
+
+    def _sync(self):
+        """Drop memory copies of keys another process changed since the last look"""
+        version = self.store.data_version()
+        if version == self._data_version:
+            return
+        self._data_version = version
+        for key, generation in self.store.query(
+                "SELECT key, generation FROM cache WHERE generation > ?", (self._generation,)):
+            if self.cache.pop(key, None) is not None:
+                metrics.increment("cache.dropped_by_other_process")
+            self._generation = max(self._generation, generation)
+
+    def _lookup(self, key: str):
+        self._sync()
+        entry = self.cache.get(key)
+        if entry is None:
+            with metrics.timer("cache.read"):
+                row = self.store.query_one("SELECT timestamp, data, ttl FROM cache WHERE key = ?", (key,))
+            if row is None or row[1] is None:
+                return None
+            try:
+                with metrics.timer("cache.decode"):
+                    data = self._decode(row[1])
+            except ValueError as e:
+                print(f"Ignoring unreadable cache entry {key}: {e}")
+                return None
+            entry = (row[0], data, row[2])
+            self.cache[key] = entry
+        return entry
+
+    @staticmethod
+    def _decode(value):
+        # Entries written before the binary format are JSON text
+        if isinstance(value, str):
+            return json.loads(value)
+        return cache_codec.decode(value)
+
+    def _write(self, rows):
+        """Store (key, encoded data or None for a tombstone, timestamp, ttl) rows under a new generation"""
+        with self.store.transaction():
+            generation = self.store.next_generation(GENERATION_KEY)
+            self.store.executemany(
+                "INSERT OR REPLACE INTO cache (key, data, timestamp, ttl, generation) VALUES (?, ?, ?, ?, ?)",
+                ((key, data, timestamp, ttl, generation) for key, data, timestamp, ttl in rows))
+        if generation == self._generation + 1:
+            # Nobody else wrote in between, so there is nothing to re-read
+            self._generation = generation
+
+    @profiled("cache")
     def get_cached_data(self, key: str, max_age_seconds: int = 300) -> Optional[List]:
-        """Get cached data if it's still valid (default 5 minutes)"""
-        if key not in self.cache:
-            return None
-        
-        cached_item = self.cache[key]
-        if time.time() - cached_item.get('timestamp', 0) > max_age_seconds:
-            # Cache expired
-            del self.cache[key]
-            return None
-        
-        return cached_item.get('data')
-    
-    def set_cached_data(self, key: str, data: List):
-        """Cache data with current timestamp"""
-        self.cache[key] = {
-            'data': data,
-            'timestamp': time.time()
-        }
-        self.save_cache()
-    
+        """Get cached data if it's still valid
+
+        A TTL stored with the entry takes precedence over max_age_seconds
+        (default 5 minutes).
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return None
+
+            timestamp, data, ttl = entry
+            if time.time() - timestamp > (ttl if ttl is not None else max_age_seconds):
+                # Cache expired
+                return None
+
+            return data
+
+    @profiled("cache")
+    def get_stale_data(self, key: str) -> Optional[List]:
+        """Get cached data however old it is, or None"""
+        with self._lock:
+            entry = self._lookup(key)
+            return entry[1] if entry is not None else None
+
+    @profiled("cache")
+    def set_cached_data(self, key: str, data: List, ttl: Optional[float] = None):
+        """Cache data with current timestamp, optionally with its own TTL"""
+        timestamp = time.time()
+        with metrics.timer("cache.encode"):
+            encoded = cache_codec.encode(data)
+        with self._lock, metrics.timer("cache.write"):
+            self._write([(key, encoded, timestamp, ttl)])
+            self.cache[key] = (timestamp, data, ttl)
+
+    def invalidate(self, keys: List[str]):
+        """Drop the given keys here and in every other running instance"""
+        timestamp = time.time()
+        with self._lock:
+            self._write([(key, None, timestamp, None) for key in keys])
+            for key in keys:
+                self.cache.pop(key, None)
+
     def clear_cache(self):
         """Clear all cached data"""
-        self.cache = {}
-        self.save_cache()
-    
-    def clear_expired_cache(self, max_age_seconds: int = 3600):
-        """Clear cache entries older than specified age (default 1 hour)"""
-        current_time = time.time()
-        expired_keys = []
-        
-        for key, value in self.cache.items():
-            if current_time - value.get('timestamp', 0) > max_age_seconds:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.cache[key]
-        
-        if expired_keys:
-            self.save_cache()
+        with self._lock:
+            keys = [key for (key,) in self.store.query("SELECT key FROM cache WHERE data IS NOT NULL")]
+            self.invalidate(keys)
+            self.cache = {}
+
+    def clear_expired_cache(self, max_age_seconds: int = 3600, stale_max_age: float = STALE_MAX_AGE):
+        """Clear cache entries older than specified age (default 1 hour)
+
+        Entries whose own TTL is longer are kept until it runs out. Data is
+        kept stale_max_age seconds longer still (default a week), so a failed
+        fetch can fall back to it, see get_stale_data. Old tombstones go
+        without the grace period; by then every instance has seen them or
+        would treat the entry as expired anyway.
+        """
+        now = time.time()
+        with self._lock:
+            self.store.execute(
+                "DELETE FROM cache WHERE timestamp + MAX(COALESCE(ttl, 0), ?)"
+                " + CASE WHEN data IS NULL THEN 0 ELSE ? END < ?",
+                (max_age_seconds, stale_max_age, now))
+            self.cache = {key: entry for key, entry in self.cache.items()
+                          if entry[0] + max(entry[2] or 0, max_age_seconds) + stale_max_age >= now}
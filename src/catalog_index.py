@@ -0,0 +1,329 @@
+"""Read-only winget catalog snapshot with a trigram search index
+
+The catalog is one flat file, opened with mmap so a search only pages in the
+postings and records it touches, and so every Winstaller process on the
+machine shares the same pages through the OS page cache. Layout (all
+integers little-endian):
+
+    header            HEADER
+    record offsets    u32 * (records + 1), relative to the record data
+    record data       per record: name NUL id NUL version NUL source NUL
+    trigram table     TRIGRAM_ENTRY * trigrams, sorted by key
+    postings          u32 record numbers, ascending per trigram
+
+Trigram keys are the CRC-32 of three lower-cased characters of
+"name id", padded with a space at each end. A rare key collision only
+adds a candidate, which the final scoring rejects.
+
+Each snapshot is written to its own versioned file and published by
+atomically replacing a small pointer file. Readers holding the old file
+keep using it until their next lookup; this also works on Windows, where
+a mapped file can't be replaced or deleted. The snapshot is written under a
+private ".part" name first; renaming it into place, publishing it and
+removing older snapshots happen under a lock file, so processes refreshing
+at the same time never remove the snapshot another one just published.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+MAGIC = b"WCAT"
+FORMAT_VERSION = 1
+POINTER_FILE = "catalog.current"
+CATALOG_PREFIX = "catalog-"
+CATALOG_SUFFIX = ".idx"
+PART_SUFFIX = ".part"
+LOCK_FILE = "catalog.lock"
+# Unfinished snapshots of a crashed refresh are removed after this long
+STALE_PART_AGE = 24 * 3600
+
+# magic, version, reserved, records, trigrams, offsets/records/trigrams/postings positions, created
+HEADER = struct.Struct("<4sHHIIQQQQd")
+TRIGRAM_ENTRY = struct.Struct("<III")  # key, first posting, posting count
+FIELDS = ("name", "id", "version", "source")
+
+# Share of the query's trigrams a record must contain to count as a match
+MIN_SIMILARITY = 0.3
+
+
+def _trigrams(text: str):
+    """Distinct trigram keys of lower-cased, space-padded text"""
+    padded = f" {text.lower()} "
+    return {zlib.crc32(padded[i:i + 3].encode("utf-8")) for i in range(len(padded) - 2)}
+
+
+def relevance(query: str, name: str, package_id: str) -> float:
+    """How well a package matches a search query, 0 if it doesn't contain it
+
+    Exact, prefix and whole-word matches rank above other substring matches.
+    """
+    needle = query.lower().strip()
+    name, package_id = name.lower(), package_id.lower()
+    if needle in (name, package_id):
+        return 3.0
+    if name.startswith(needle) or package_id.startswith(needle):
+        return 2.0
+    if needle in name.split() or needle in package_id.split("."):
+        return 1.5
+    if needle in name or needle in package_id:
+        return 1.0
+    return 0.0
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _u32_array(data) -> array:
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def write_catalog(directory: str, records: List[Dict[str, str]]) -> str:
+    """Write a new catalog snapshot and publish it, returning its path"""
+    os.makedirs(directory, exist_ok=True)
+
+    record_data = bytearray()
+    offsets = array("I", [0])
+    postings: Dict[int, List[int]] = {}
+    for number, record in enumerate(records):
+        values = [(record.get(field) or "").replace("\0", "") for field in FIELDS]
+        record_data += "\0".join(values).encode("utf-8") + b"\0"
+        offsets.append(len(record_data))
+        for key in _trigrams(f"{values[0]} {values[1]}"):
+            postings.setdefault(key, []).append(number)
+
+    table = bytearray()
+    posting_values = array("I")
+    for key in sorted(postings):
+        numbers = postings[key]
+        table += TRIGRAM_ENTRY.pack(key, len(posting_values), len(numbers))
+        posting_values.extend(numbers)
+
+    offsets_pos = HEADER.size
+    records_pos = offsets_pos + len(offsets) * 4
+    trigrams_pos = records_pos + len(record_data)
+    postings_pos = trigrams_pos + len(table)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(records), len(postings),
+                         offsets_pos, records_pos, trigrams_pos, postings_pos, time.time())
+
+    descriptor, part_path = tempfile.mkstemp(prefix=f"{CATALOG_PREFIX}{time.time_ns()}-", suffix=PART_SUFFIX,
+                                             dir=directory)
+    name = os.path.basename(part_path)[:-len(PART_SUFFIX)] + CATALOG_SUFFIX
+    path = os.path.join(directory, name)
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(header)
+            f.write(_little_endian(offsets))
+            f.write(record_data)
+            f.write(table)
+            f.write(_little_endian(posting_values))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp's files are private; other users of a shared folder read them too
+        os.chmod(part_path, 0o644)
+        with _publish_lock(directory):
+            os.replace(part_path, path)
+            _write_pointer(directory, name)
+            _remove_old_snapshots(directory, keep=name)
+    except BaseException:
+        _remove_quietly(part_path)
+        raise
+    return path
+
+
+@contextmanager
+def _publish_lock(directory: str):
+    """Exclusive lock between processes (and threads) publishing into directory"""
+    with open(os.path.join(directory, LOCK_FILE), "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after 10 s
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_pointer(directory: str, name: str):
+    """Point readers at name with a single rename"""
+    descriptor, pointer_tmp = tempfile.mkstemp(prefix=POINTER_FILE + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.chmod(pointer_tmp, 0o644)
+        os.replace(pointer_tmp, os.path.join(directory, POINTER_FILE))
+    except BaseException:
+        _remove_quietly(pointer_tmp)
+        raise
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _remove_old_snapshots(directory: str, keep: str):
+    for entry in os.listdir(directory):
+        if not entry.startswith(CATALOG_PREFIX) or entry == keep:
+            continue
+        path = os.path.join(directory, entry)
+        if entry.endswith(PART_SUFFIX):
+            # Another refresh may still be writing it
+            try:
+                if time.time() - os.path.getmtime(path) < STALE_PART_AGE:
+                    continue
+            except OSError:
+                continue
+        elif not entry.endswith(CATALOG_SUFFIX):
+            continue
+        # Fails while still mapped by another process (Windows); removed next time
+        _remove_quietly(path)
+
+
+class CatalogIndex:
+    """Searchable view of the current catalog snapshot in a directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._name = None
+        self._file = None
+        self._map = None
+        self._header = None
+
+    def _current_name(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _ensure_current(self) -> bool:
+        """Map the published snapshot, switching over if it was replaced"""
+        name = self._current_name()
+        if name is None:
+            return False
+        if name == self._name:
+            return True
+        try:
+            catalog_file = open(os.path.join(self.directory, name), "rb")
+            mapped = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            print(f"Could not open search catalog {name}: {e}")
+            return self._map is not None
+        header = HEADER.unpack_from(mapped)
+        if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+            mapped.close()
+            catalog_file.close()
+            return self._map is not None
+        self._close()
+        self._name, self._file, self._map, self._header = name, catalog_file, mapped, header
+        return True
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._name = self._file = self._map = self._header = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def is_available(self) -> bool:
+        with self._lock:
+            return self._ensure_current()
+
+    def age_seconds(self) -> Optional[float]:
+        """Seconds since the current snapshot was written, None without one"""
+        with self._lock:
+            if not self._ensure_current():
+                return None
+            return time.time() - self._header[9]
+
+    def __len__(self):
+        with self._lock:
+            return self._header[3] if self._ensure_current() else 0
+
+    def _record(self, number: int) -> Dict[str, str]:
+        offsets_pos, records_pos = self._header[5], self._header[6]
+        start, end = struct.unpack_from("<II", self._map, offsets_pos + number * 4)
+        values = self._map[records_pos + start:records_pos + end - 1].decode("utf-8").split("\0")
+        return dict(zip(FIELDS, values))
+
+    def _postings(self, key: int):
+        """Record numbers containing a trigram, by binary search of the table"""
+        trigram_count, trigrams_pos, postings_pos = self._header[4], self._header[7], self._header[8]
+        low, high = 0, trigram_count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, first, count = TRIGRAM_ENTRY.unpack_from(self._map, trigrams_pos + middle * TRIGRAM_ENTRY.size)
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                start = postings_pos + first * 4
+                return _u32_array(self._map[start:start + count * 4])
+        return ()
+
+    def search(self, query: str, limit: int = 100) -> List[Dict[str, str]]:
+        """Fuzzy search by name and id, best matches first
+
+        Records are ranked by relevance(), then by the share of the query's
+        trigrams they contain (typos).
+        """
+        needle = query.lower().strip()
+        if not needle:
+            return []
+        keys = _trigrams(needle)
+        with self._lock:
+            if not self._ensure_current():
+                return []
+            shared = Counter()
+            for key in keys:
+                shared.update(self._postings(key))
+            needed = max(1, int(len(keys) * MIN_SIMILARITY + 0.999))
+            candidates = [(count, number) for number, count in shared.items() if count >= needed]
+            # Only the best-sharing candidates are decoded and scored
+            candidates.sort(reverse=True)
+            scored = []
+            for count, number in candidates[:limit * 5]:
+                record = self._record(number)
+                score = relevance(needle, record["name"], record["id"]) or count / len(keys)
+                scored.append((-score, len(record["name"]), number, record))
+        scored.sort()
+        return [record for _, _, _, record in scored[:limit]]
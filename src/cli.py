@@ -0,0 +1,356 @@
+"""Headless command line for scripts and scheduled tasks
+
+Runs on the same engine as the GUI (WingetManager, CacheManager,
+FavoritesManager, InstallationHistoryManager and the shared state store), so
+caches, favorites and history are shared with the app, but never imports Qt.
+
+    python cli.py search vscode --json
+    python cli.py list
+    python cli.py upgrades --json
+    python cli.py upgrade --all --jobs 2
+    python cli.py favorites install-missing --jobs 3
+    python cli.py history --status failed --since 2024-01-01 --json
+    python cli.py jobs                  # journaled batches, see job_journal.py
+    python cli.py resume                # continue interrupted batches
+    python cli.py daemon start          # shared engine, see daemon.py
+    python cli.py list --daemon
+
+Exit status is 0 on success, 1 when any package in a batch failed and 2 for
+usage errors.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import re
+import sys
+
+from config_manager import ConfigManager
+from daemon import DaemonClient, DaemonError, DaemonManager, DaemonService, connect_manager
+from favorites_manager import FavoritesManager
+from installation_history import InstallationHistoryManager
+from job_journal import JobJournal
+from jobs import DEFAULT_JOBS, MAX_JOBS, resume_job, run_batch
+
+_DISPLAY_PATTERN = re.compile(r"^(.*) \(([^()]+)\)$")
+
+
+def record_from_display(text):
+    """Split a "Name (Id)" search result into a record"""
+    match = _DISPLAY_PATTERN.match(text)
+    if match:
+        return {"name": match.group(1), "id": match.group(2)}
+    return {"name": text, "id": ""}
+
+
+class Cli:
+    """Runs one parsed command and prints its result, as text or JSON"""
+
+    def __init__(self, args, stdout=None):
+        self.args = args
+        # Results go to stdout; main() sends the managers' diagnostic prints to stderr
+        self.stdout = stdout or sys.stdout
+        self.config = ConfigManager()
+        # --daemon forces the daemon, otherwise the use_daemon config key decides
+        self.manager = connect_manager(self.config, True if args.daemon else None)
+        self._history = None
+        self._favorites = None
+        self._journal = None
+
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = InstallationHistoryManager()
+        return self._history
+
+    @property
+    def journal(self):
+        if self._journal is None:
+            self._journal = JobJournal()
+        return self._journal
+
+    @property
+    def favorites(self):
+        if self._favorites is None:
+            self._favorites = FavoritesManager()
+            self.manager.add_listener(self._favorites.on_records_changed)
+        return self._favorites
+
+    def output(self, data, lines):
+        """Print data as JSON with --json, otherwise the given text lines"""
+        if self.args.json:
+            json.dump(data, self.stdout, indent=2, ensure_ascii=False)
+            self.stdout.write("\n")
+        else:
+            for line in lines:
+                print(line, file=self.stdout)
+
+    def run(self):
+        try:
+            return getattr(self, "cmd_" + self.args.command.replace("-", "_"))()
+        finally:
+            self.config.flush()
+
+    def use_cache(self):
+        return not self.args.no_cache
+
+    def cmd_search(self):
+        if self.args.all_sources:
+            records = self.manager.search_sources(self.args.query, use_cache=self.use_cache())
+        else:
+            records = [record_from_display(text) for text in
+                       self.manager.search(self.args.query, use_cache=self.use_cache(), page=self.args.page)]
+        self.output(records, [f"{record['name']}\t{record['id']}" + (f"\t{', '.join(record['sources'])}"
+                                                                     if record.get("sources") else "")
+                              for record in records])
+        return 0
+
+    def cmd_list(self):
+        records = self.manager.list_installed_records(use_cache=self.use_cache())
+        self.output(records, [f"{record['name']}\t{record['id']}\t{record.get('version', '')}" for record in records])
+        return 0
+
+    def cmd_upgrades(self):
+        records = self.manager.get_upgradeable_records(use_cache=self.use_cache())
+        self.output(records, [f"{record['name']}\t{record['id']}\t{record.get('version', '')} -> "
+                              f"{record.get('available', '')}" for record in records])
+        return 0
+
+    def cmd_show(self):
+        details = self.manager.show(self.args.package_id, use_cache=self.use_cache())
+        if not details:
+            print(f"No package found: {self.args.package_id}", file=sys.stderr)
+            return 1
+        self.output(details, [f"{key}: {value}" for key, value in details.items()])
+        return 0
+
+    def cmd_install(self):
+        return self.batch("install", [(package_id, package_id) for package_id in self.args.package_ids])
+
+    def cmd_uninstall(self):
+        return self.batch("uninstall", [(package_id, package_id) for package_id in self.args.package_ids])
+
+    def cmd_upgrade(self):
+        if self.args.all:
+            records = self.manager.get_upgradeable_records(use_cache=False)
+            packages = [(record["name"], record["id"]) for record in records if record.get("id")]
+        else:
+            packages = [(package_id, package_id) for package_id in self.args.package_ids]
+        return self.batch("upgrade", packages)
+
+    def cmd_favorites(self):
+        favorites = self.favorites
+        # Fresh fetches are joined through the listener, cache hits here
+        favorites.update_inventory(self.manager.list_installed_records(use_cache=self.use_cache()))
+        favorites.update_upgrades(self.manager.get_upgradeable_records(use_cache=self.use_cache()))
+        if self.args.action == "install-missing":
+            return self.batch("install", [(fav["app_name"], fav["package_id"])
+                                          for fav in favorites.missing_favorites()])
+        if self.args.action == "upgrade-outdated":
+            return self.batch("upgrade", [(fav["app_name"], fav["package_id"])
+                                          for fav in favorites.outdated_favorites()])
+        annotated = favorites.get_annotated_favorites()
+        self.output(annotated, [f"{fav['app_name']}\t{fav['package_id']}\t{fav['status']}"
+                                + (f"\t{fav['installed_version']}" if fav["installed_version"] else "")
+                                + (f" -> {fav['available_version']}" if fav["available_version"] else "")
+                                for fav in annotated] or ["No favorites yet."])
+        return 0
+
+    def cmd_history(self):
+        query = self.history.query(action=self.args.action, status=self.args.status, package=self.args.package,
+                                   since=self.args.since, until=self.args.until)
+        entries = query.fetch(0, self.args.limit) if self.args.limit else query.fetch(0, len(query))
+        if self.args.export:
+            with open(self.args.export, "w", encoding="utf-8") as f:
+                json.dump({"history": entries}, f, indent=2, ensure_ascii=False)
+            print(f"Exported {len(entries)} entries to {self.args.export}", file=sys.stderr)
+            return 0
+        self.output(entries, [f"{entry.get('date', '')[:19]}\t{entry.get('action', '')}\t{entry.get('status', '')}\t"
+                              f"{entry.get('package_id', '')}\t{entry.get('version', '')}" for entry in entries])
+        return 0
+
+    def cmd_jobs(self):
+        jobs = self.journal.interrupted() if self.args.interrupted else self.journal.recent(self.args.limit)
+        lines = []
+        for job in jobs:
+            counts = {}
+            for item in job["items"]:
+                counts[item["state"]] = counts.get(item["state"], 0) + 1
+            summary = ", ".join(f"{count} {state}" for state, count in counts.items())
+            lines.append(f"{job['id']}\t{job['created'][:19]}\t{job['operation']}\t{job['state']}\t{summary}")
+        self.output(jobs, lines or ["No journaled jobs."])
+        return 0
+
+    def cmd_resume(self):
+        if self.args.job_ids:
+            job_ids = self.args.job_ids
+        else:
+            job_ids = [job["id"] for job in self.journal.interrupted()]
+        if not job_ids:
+            self.output([], ["No interrupted jobs."])
+            return 0
+        results = []
+        status = 0
+        for job_id in job_ids:
+            journaled = self.journal.get(job_id)
+            operation = journaled["operation"] if journaled else "resume"
+            items = self.run_batch(lambda on_item: self.resume_one(job_id, on_item), operation)
+            if items is None:
+                print(f"Job {job_id} is not interrupted (finished, unknown or running elsewhere).", file=sys.stderr)
+                status = status or 1
+                continue
+            failed = sum(1 for item in items if not item["success"])
+            results.append({"job_id": job_id, "successful": len(items) - failed, "failed": failed, "items": items})
+            status = status or (1 if failed else 0)
+        self.output(results, [f"job {result['job_id']}: {result['successful']} succeeded, {result['failed']} failed"
+                              for result in results])
+        return status
+
+    def resume_one(self, job_id, on_item):
+        if isinstance(self.manager, DaemonManager):
+            return self.manager.resume_job(job_id, self.args.jobs, on_item)
+        return resume_job(self.manager, self.history, self.journal, job_id, self.args.jobs, on_item)
+
+    def run_batch(self, run, operation):
+        """run(on_item) with the progress printer; returns its items"""
+        def progress(item):
+            if not self.args.json:
+                status = "ok" if item["success"] else "FAILED"
+                print(f"{operation} {item['id']}: {status} ({item['seconds']:.1f} s)", file=self.stdout, flush=True)
+
+        return run(progress)
+
+    def batch(self, operation, packages):
+        if not packages:
+            self.output({"operation": operation, "successful": 0, "failed": 0, "items": []},
+                        [f"No packages to {operation}."])
+            return 0
+
+        if isinstance(self.manager, DaemonManager):
+            items = self.run_batch(lambda on_item: self.manager.run_job(operation, packages, self.args.jobs, on_item),
+                                   operation)
+        else:
+            job_id = self.journal.create(operation, packages)
+            items = self.run_batch(lambda on_item: run_batch(self.manager, self.history, operation, packages,
+                                                             self.args.jobs, on_item, journal=self.journal,
+                                                             job_id=job_id), operation)
+        successful = sum(1 for item in items if item["success"])
+        failed = len(items) - successful
+        self.output({"operation": operation, "successful": successful, "failed": failed, "items": items},
+                    [f"{operation}: {successful} succeeded, {failed} failed"])
+        return 1 if failed else 0
+
+
+def run_daemon(args):
+    """daemon start|stop|status"""
+    if args.action == "start":
+        try:
+            DaemonService().serve(args.port)
+        except DaemonError as e:
+            print(e, file=sys.stderr)
+            return 1
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    client = DaemonClient.connect()
+    if client is None:
+        print("No Winstaller daemon is running.", file=sys.stderr)
+        return 1
+    try:
+        if args.action == "stop":
+            client.call("shutdown")
+            print(f"Stopped the daemon on port {client.info['port']}.")
+        else:
+            status = client.call("ping")
+            jobs = client.call("jobs")
+            active = [job for job in jobs if job["state"] in ("queued", "running")]
+            print(f"Daemon running on port {client.info['port']}, pid {status['pid']}, "
+                  f"up {status['uptime_s']:.0f} s, {len(active)} of {len(jobs)} jobs active.")
+    finally:
+        client.close()
+    return 0
+
+
+def _date(text):
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text}")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    common.add_argument("--no-cache", action="store_true", help="ask winget instead of using cached results")
+    common.add_argument("--daemon", action="store_true", help="go through the running daemon")
+    batch = argparse.ArgumentParser(add_help=False)
+    batch.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS,
+                       help=f"packages processed at the same time (default {DEFAULT_JOBS}, at most {MAX_JOBS})")
+
+    parser = argparse.ArgumentParser(prog="winstaller", description="Winstaller without the window")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", parents=[common], help="search for packages")
+    search.add_argument("query")
+    search.add_argument("--page", type=int, help="only this page of results (0-based)")
+    search.add_argument("--all-sources", action="store_true", help="search every source in parallel and merge")
+
+    commands.add_parser("list", parents=[common], help="list installed packages")
+    commands.add_parser("upgrades", parents=[common], help="list packages with an upgrade available")
+
+    show = commands.add_parser("show", parents=[common], help="show package details")
+    show.add_argument("package_id")
+
+    for name in ("install", "uninstall"):
+        command = commands.add_parser(name, parents=[common, batch], help=f"{name} packages by id")
+        command.add_argument("package_ids", nargs="+", metavar="ID")
+
+    upgrade = commands.add_parser("upgrade", parents=[common, batch], help="upgrade packages by id")
+    upgrade.add_argument("package_ids", nargs="*", metavar="ID")
+    upgrade.add_argument("--all", action="store_true", help="upgrade everything with an upgrade available")
+
+    favorites = commands.add_parser("favorites", parents=[common, batch], help="favorites status and batches")
+    favorites.add_argument("action", nargs="?", default="status",
+                           choices=["status", "install-missing", "upgrade-outdated"])
+
+    history = commands.add_parser("history", parents=[common], help="show or export the history")
+    history.add_argument("--action", choices=["install", "uninstall", "upgrade"])
+    history.add_argument("--status", choices=["success", "failed"])
+    history.add_argument("--package", help="package id, exact or its beginning")
+    history.add_argument("--since", type=_date, help="first day, YYYY-MM-DD")
+    history.add_argument("--until", type=_date, help="last day, YYYY-MM-DD")
+    history.add_argument("--limit", type=int, default=50, help="newest entries to show, 0 for all (default 50)")
+    history.add_argument("--export", metavar="PATH", help="write the entries to a JSON file")
+
+    jobs = commands.add_parser("jobs", parents=[common], help="list journaled batch jobs")
+    jobs.add_argument("--interrupted", action="store_true", help="only jobs that can be resumed")
+    jobs.add_argument("--limit", type=int, default=20, help="newest jobs to show (default 20)")
+
+    resume = commands.add_parser("resume", parents=[common, batch], help="continue interrupted batch jobs")
+    resume.add_argument("job_ids", nargs="*", type=int, metavar="JOB",
+                        help="journal ids from the jobs command (default: every interrupted job)")
+
+    daemon = commands.add_parser("daemon", help="run or control the shared background service")
+    daemon.add_argument("action", choices=["start", "stop", "status"])
+    daemon.add_argument("--port", type=int, default=0, help="with start: port on 127.0.0.1 (default: any free one)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "upgrade" and not args.all and not args.package_ids:
+        parser.error("upgrade needs package ids or --all")
+    if args.command == "daemon":
+        return run_daemon(args)
+    try:
+        stdout = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            return Cli(args, stdout).run()
+    except BrokenPipeError:
+        # Output piped into head or similar that stopped reading
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
@@ -1,26 +1,138 @@
 import json
-import os
+import threading
+from contextlib import contextmanager
+from state_store import get_default_store
+
+DEFAULT_DEBOUNCE_SECONDS = 0.5
 
 class ConfigManager:
-    def __init__(self, filename="config.json"):
-        self.filename = filename
+    def __init__(self, store=None, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS):
+        self.store = store or get_default_store()
+        self.debounce_seconds = debounce_seconds
         self.config = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._batch_depth = 0
+        self._timer = None
+        self._listeners = []  # (key or None for every key, callback)
         self.load()
 
     def load(self):
-        if os.path.exists(self.filename):
-            with open(self.filename, "r") as f:
-                self.config = json.load(f)
-        else:
-            self.config = {}
+        """Load the config, skipping values that can't be decoded"""
+        config = {}
+        for key, value in self.store.query("SELECT key, value FROM config"):
+            try:
+                config[key] = json.loads(value)
+            except ValueError as e:
+                print(f"Error loading config key {key}: {e}")
+        with self._lock:
+            self.config = config
+            self._dirty = False
 
     def save(self):
-        with open(self.filename, "w") as f:
-            json.dump(self.config, f, indent=4)
+        """Write the config now, in one transaction"""
+        with self._lock:
+            self._cancel_timer()
+            rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in self.config.items()]
+            self._dirty = False
+            try:
+                with self.store.transaction():
+                    self.store.execute("DELETE FROM config")
+                    self.store.executemany("INSERT INTO config (key, value) VALUES (?, ?)", rows)
+            except Exception as e:
+                print(f"Error saving config: {e}")
+
+    def flush(self):
+        """Write any pending debounced changes immediately"""
+        with self._lock:
+            pending = self._dirty
+        if pending:
+            self.save()
 
     def get(self, key, default=None):
-        return self.config.get(key, default)
+        with self._lock:
+            return self.config.get(key, default)
+
+    def set(self, key, value, debounce=False):
+        """Set a value and persist it
+
+        Inside batch() the write happens once when the batch ends. With
+        debounce=True, rapid updates (window geometry, filter text) are
+        coalesced into one write after debounce_seconds of quiet.
+        """
+        with self._lock:
+            if key in self.config and self.config[key] == value:
+                return
+            self.config[key] = value
+            self._dirty = True
+            if self._batch_depth:
+                write_now = False
+            elif debounce:
+                self._schedule_save()
+                write_now = False
+            else:
+                write_now = True
+        if write_now:
+            self.save()
+        self._notify(key, value)
+
+    def update(self, values, debounce=False):
+        """Set several values with a single write"""
+        with self.batch():
+            for key, value in values.items():
+                self.set(key, value, debounce=debounce)
+
+    @contextmanager
+    def batch(self):
+        """Collect set() calls into one atomic write
+
+        If the block raises, the config is rolled back and nothing is written.
+        Batches can be nested; the outermost one writes.
+        """
+        with self._lock:
+            if self._batch_depth == 0:
+                self._snapshot = (dict(self.config), self._dirty)
+            self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.config, self._dirty = self._snapshot
+            raise
+        else:
+            with self._lock:
+                self._batch_depth -= 1
+                write_now = self._batch_depth == 0 and self._dirty
+            if write_now:
+                self.save()
+
+    def subscribe(self, callback, key=None):
+        """Call callback(key, value) when key (or, without a key, anything) changes"""
+        with self._lock:
+            self._listeners.append((key, callback))
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._listeners = [(key, cb) for key, cb in self._listeners if cb != callback]
+
+    def _notify(self, key, value):
+        with self._lock:
+            listeners = [cb for watched, cb in self._listeners if watched is None or watched == key]
+        for callback in listeners:
+            try:
+                callback(key, value)
+            except Exception as e:
+                print(f"Config listener error: {e}")
+
+    def _schedule_save(self):
+        self._cancel_timer()
+        self._timer = threading.Timer(self.debounce_seconds, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
 
-    def set(self, key, value):
-        self.config[key] = value
-        self.save()
\ No newline at end of file
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
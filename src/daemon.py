@@ -0,0 +1,481 @@
+"""Optional background service shared by every Winstaller window and script
+
+The daemon owns one WingetManager, with its in-memory caches, and one job
+queue. GUI and CLI clients talk to it over a localhost TCP socket, so
+concurrent clients share a warm cache and never run winget batches against
+each other.
+
+Protocol: one JSON object per line, both ways. A request is
+    {"id": 1, "token": "...", "method": "search", "params": {"query": "git"}}
+and is answered with {"id": 1, "result": ...} or {"id": 1, "error": "..."}.
+After "subscribe" the connection also receives job events, objects with an
+"event" key (job_queued, item_started, item_finished, job_finished).
+
+The port and a random token are written to daemon.json in the state
+directory when the daemon starts; only a client that can read the user's
+state directory can use it.
+
+    python cli.py daemon start    # runs in the foreground
+    python cli.py --daemon list   # any command, through the daemon
+"""
+
+import itertools
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from hmac import compare_digest
+
+from config_manager import ConfigManager
+from favorites_manager import FavoritesManager
+from installation_history import InstallationHistoryManager
+from job_journal import JobJournal
+from jobs import DEFAULT_JOBS, JobQueue
+from state_store import default_state_dir
+from winget_manager import SEARCH_PAGE_SIZE, WingetManager
+
+DAEMON_FILE = "daemon.json"
+# Config key: let the GUI use a running daemon
+USE_DAEMON_KEY = "use_daemon"
+HOST = "127.0.0.1"
+CONNECT_TIMEOUT = 2
+
+
+class DaemonError(Exception):
+    """The daemon is unreachable or refused a request"""
+
+
+def daemon_file(state_dir=None):
+    return os.path.join(state_dir or default_state_dir(), DAEMON_FILE)
+
+
+def read_daemon_info(state_dir=None):
+    """Port, token and pid of the running daemon, or None"""
+    try:
+        with open(daemon_file(state_dir), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        return info if isinstance(info, dict) and "port" in info and "token" in info else None
+    except (OSError, ValueError):
+        return None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection: requests are answered in order"""
+
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+
+    def send(self, message):
+        data = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.write_lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    def handle(self):
+        service = self.server.service
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                except (ValueError, AttributeError):
+                    self.send({"id": None, "error": "invalid request"})
+                    continue
+                if not service.check_token(request.get("token")):
+                    self.send({"id": request_id, "error": "unauthorized"})
+                    break
+                try:
+                    result = service.call(request.get("method"), request.get("params") or {}, self)
+                    self.send({"id": request_id, "result": result})
+                except Exception as e:
+                    self.send({"id": request_id, "error": f"{type(e).__name__}: {e}"})
+        except OSError:
+            pass
+        finally:
+            service.unsubscribe(self)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = False
+
+
+class DaemonService:
+    """The engine behind the daemon: manager, caches, favorites, history and the job queue"""
+
+    def __init__(self, config=None):
+        self.config = config or ConfigManager()
+        self.manager = WingetManager(self.config)
+        self.history = InstallationHistoryManager()
+        self.favorites = FavoritesManager()
+        self.manager.add_listener(self.favorites.on_records_changed)
+        self.journal = JobJournal()
+        self.jobs = JobQueue(self.manager, self.history, on_event=self.broadcast, journal=self.journal)
+        self.token = secrets.token_hex(16)
+        self.server = None
+        self.started = time.time()
+        self._subscribers = set()
+        self._subscribers_lock = threading.Lock()
+        self.methods = {
+            "ping": self.ping,
+            "search": self.manager.search,
+            "search_sources": self.manager.search_sources,
+            "list": self.manager.list_installed_records,
+            "upgrades": self.manager.get_upgradeable_records,
+            "show": self.manager.show,
+            "sources": self.manager.list_sources,
+            "favorites": self.annotated_favorites,
+            "clear_caches": self.manager.clear_all_caches,
+            "submit_job": self.submit_job,
+            "jobs": self.jobs.list,
+            "job": self.jobs.get,
+            "cancel_job": self.jobs.cancel,
+            "wait_job": self.jobs.wait,
+            "resume_job": self.jobs.resume,
+            "journal": self.journal.recent,
+            "interrupted_jobs": self.journal.interrupted,
+            "shutdown": self.shutdown,
+        }
+
+    def check_token(self, token):
+        return isinstance(token, str) and compare_digest(token, self.token)
+
+    def call(self, method, params, handler):
+        if method == "subscribe":
+            with self._subscribers_lock:
+                self._subscribers.add(handler)
+            return True
+        function = self.methods.get(method)
+        if function is None:
+            raise DaemonError(f"Unknown method: {method}")
+        return function(**params)
+
+    def unsubscribe(self, handler):
+        with self._subscribers_lock:
+            self._subscribers.discard(handler)
+
+    def broadcast(self, event):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for handler in subscribers:
+            try:
+                handler.send(event)
+            except OSError:
+                self.unsubscribe(handler)
+
+    def ping(self):
+        return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started, 1)}
+
+    def annotated_favorites(self, use_cache=True):
+        self.favorites.update_inventory(self.manager.list_installed_records(use_cache))
+        self.favorites.update_upgrades(self.manager.get_upgradeable_records(use_cache))
+        return self.favorites.get_annotated_favorites()
+
+    def submit_job(self, operation, packages, jobs=DEFAULT_JOBS, record=True):
+        """Queue a batch of [name, id] packages; record=False leaves history to the client"""
+        return self.jobs.submit(operation, [tuple(package) for package in packages], jobs, record)
+
+    def shutdown(self):
+        # serve_forever() can't be stopped from one of its own request threads
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return True
+
+    def serve(self, port=0, state_dir=None):
+        """Listen on localhost until shut down; refuses to start next to a live daemon"""
+        client = DaemonClient.connect(state_dir)
+        if client is not None:
+            client.close()
+            raise DaemonError(f"A daemon is already running on port {client.info['port']}")
+
+        self.server = _Server((HOST, port), _Handler)
+        self.server.service = self
+        path = daemon_file(state_dir)
+        info = {"port": self.server.server_address[1], "token": self.token, "pid": os.getpid()}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(temporary, path)
+        print(f"Winstaller daemon listening on {HOST}:{info['port']}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if (read_daemon_info(state_dir) or {}).get("pid") == os.getpid():
+                os.remove(path)
+            self.config.flush()
+
+
+class DaemonClient:
+    """Connection to a running daemon
+
+    call() may be used from several threads; each thread gets a connection
+    of its own, so a long call (waiting for an install) doesn't hold up the
+    others.
+    """
+
+    def __init__(self, info):
+        self.info = info
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._connection()
+
+    @classmethod
+    def connect(cls, state_dir=None):
+        """A client for the running daemon, or None when there is none"""
+        info = read_daemon_info(state_dir)
+        if info is None:
+            return None
+        try:
+            client = cls(info)
+            client.call("ping")
+            return client
+        except (OSError, DaemonError):
+            return None
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sock = socket.create_connection((HOST, self.info["port"]), CONNECT_TIMEOUT)
+            sock.settimeout(None)
+            connection = (sock, sock.makefile("rb"))
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            with self._connections_lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            connection[0].close()
+
+    def call(self, method, **params):
+        """Result of a daemon method; raises DaemonError when it fails or the daemon is gone"""
+        request_id = next(self._ids)
+        request = {"id": request_id, "token": self.info["token"], "method": method, "params": params}
+        try:
+            sock, reader = self._connection()
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            while True:
+                line = reader.readline()
+                if not line:
+                    raise DaemonError("The daemon closed the connection")
+                message = json.loads(line)
+                if message.get("id") == request_id:
+                    break
+        except (OSError, ValueError) as e:
+            self._drop_connection()
+            raise DaemonError(f"Daemon connection failed: {e}")
+        except DaemonError:
+            self._drop_connection()
+            raise
+        if "error" in message:
+            raise DaemonError(message["error"])
+        return message.get("result")
+
+    def subscribe(self, on_event):
+        """Pass job events to on_event(event) from a reader thread; returns the client to close when done"""
+        events = DaemonClient(self.info)
+        events.call("subscribe")
+        _, reader = events._connection()
+
+        def read():
+            try:
+                for line in reader:
+                    message = json.loads(line)
+                    if "event" in message:
+                        on_event(message)
+            except (OSError, ValueError):
+                pass
+
+        threading.Thread(target=read, name="daemon-events", daemon=True).start()
+        return events
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for sock, _ in connections:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+class DaemonManager(WingetManager):
+    """WingetManager whose winget work happens in the daemon
+
+    Listings, search, details and installs go to the daemon and share its
+    warm caches and job queue. When the daemon is gone they fall back to
+    running winget here. The catalog, prefetching and raw output stay local.
+    """
+
+    def __init__(self, client, config=None):
+        super().__init__(config)
+        self.client = client
+
+    def _remote(self, method, fallback, **params):
+        try:
+            return self.client.call(method, **params)
+        except DaemonError as e:
+            print(f"Daemon {method} failed, running winget directly: {e}")
+            return fallback()
+
+    def search(self, query, use_cache=True, page=None, page_size=SEARCH_PAGE_SIZE):
+        return self._remote("search", lambda: WingetManager.search(self, query, use_cache, page, page_size),
+                            query=query, use_cache=use_cache, page=page, page_size=page_size)
+
+    def search_sources(self, query, on_source_results=None, use_cache=True):
+        # Per-source callbacks need the results as each source finishes
+        if on_source_results is not None:
+            return WingetManager.search_sources(self, query, on_source_results, use_cache)
+        return self._remote("search_sources", lambda: WingetManager.search_sources(self, query, None, use_cache),
+                            query=query, use_cache=use_cache)
+
+    def _remote_records(self, kind, method, fallback, use_cache):
+        """Records from the daemon, told to the listeners; the local fallback tells them itself"""
+        try:
+            records = self.client.call(method, use_cache=use_cache)
+        except DaemonError as e:
+            print(f"Daemon {method} failed, running winget directly: {e}")
+            return fallback()
+        self._notify_listeners(kind, records)
+        return records
+
+    def list_installed_records(self, use_cache=True):
+        return self._remote_records("installed", "list",
+                                    lambda: WingetManager.list_installed_records(self, use_cache), use_cache)
+
+    def get_upgradeable_records(self, use_cache=True):
+        return self._remote_records("upgradeable", "upgrades",
+                                    lambda: WingetManager.get_upgradeable_records(self, use_cache), use_cache)
+
+    def show(self, package_id, use_cache=True, low_priority=False):
+        if use_cache:
+            details = self.details.get(package_id)
+            if details is not None:
+                return details
+        details = self._remote("show", lambda: WingetManager.show(self, package_id, use_cache, low_priority),
+                               package_id=package_id, use_cache=use_cache, low_priority=low_priority)
+        self.details.put(package_id, details)
+        return details
+
+    def clear_all_caches(self):
+        try:
+            self.client.call("clear_caches")
+        except DaemonError as e:
+            print(f"Could not clear the daemon's caches: {e}")
+        super().clear_all_caches()
+
+    def install(self, app_name):
+        return self._run_one("install", app_name)
+
+    def uninstall(self, app_name):
+        return self._run_one("uninstall", app_name)
+
+    def upgrade(self, app_name):
+        return self._run_one("upgrade", app_name)
+
+    def _run_one(self, operation, app_name):
+        """Run one package through the daemon's queue; history stays with the caller"""
+        try:
+            job = self.client.call("submit_job", operation=operation, packages=[[app_name, app_name]], record=False)
+        except DaemonError as e:
+            print(f"Daemon {operation} failed, running winget directly: {e}")
+            return getattr(WingetManager, operation)(self, app_name)
+        # Submitted: never run it a second time here, even if the wait fails
+        try:
+            job = self.client.call("wait_job", job_id=job["id"])
+        except DaemonError as e:
+            print(f"Lost track of daemon job {job['id']}: {e}")
+            return False
+        success = job["items"][0]["state"] == "done"
+        if success:
+            self._clear_install_caches()
+        return success
+
+    def run_job(self, operation, packages, jobs=DEFAULT_JOBS, on_item=None):
+        """Run a whole batch in the daemon, recording history there
+
+        on_item(item) gets each package as it finishes, like jobs.run_batch.
+        Returns the finished items.
+        """
+        return self._follow_job("submit_job", on_item, operation=operation,
+                                packages=[list(p) for p in packages], jobs=jobs)
+
+    def resume_job(self, journal_id, jobs=DEFAULT_JOBS, on_item=None):
+        """Resume an interrupted journaled batch in the daemon; None if the journal doesn't have it"""
+        return self._follow_job("resume_job", on_item, journal_id=journal_id, jobs=jobs)
+
+    def _follow_job(self, method, on_item, **params):
+        lock = threading.Lock()
+        state = {"job_id": None, "early": [], "delivered": set()}
+
+        def deliver(item):
+            with lock:
+                if item["id"] in state["delivered"]:
+                    return
+                state["delivered"].add(item["id"])
+            if on_item:
+                on_item(item)
+
+        def on_event(event):
+            if event.get("event") != "item_finished":
+                return
+            item = {key: event[key] for key in ("name", "id", "success", "seconds")}
+            with lock:
+                if state["job_id"] is None:
+                    state["early"].append((event["job_id"], item))
+                    return
+                if event["job_id"] != state["job_id"]:
+                    return
+            deliver(item)
+
+        events = self.client.subscribe(on_event)
+        try:
+            job = self.client.call(method, **params)
+            if job is None:
+                return None
+            with lock:
+                state["job_id"] = job["id"]
+                early, state["early"] = state["early"], []
+            for event_job_id, item in early:
+                if event_job_id == job["id"]:
+                    deliver(item)
+            job = self.client.call("wait_job", job_id=job["id"])
+        finally:
+            events.close()
+        finished = [{"name": item["name"], "id": item["id"], "success": item["state"] == "done",
+                     "seconds": item["seconds"]}
+                    for item in job["items"] if item["state"] in ("done", "failed")]
+        # Events still in flight when the job ended
+        for item in finished:
+            deliver(item)
+        if any(item["success"] for item in finished):
+            self._clear_install_caches()
+        return finished
+
+
+def connect_manager(config=None, use_daemon=None):
+    """A DaemonManager when a daemon is wanted and running, otherwise a WingetManager
+
+    use_daemon defaults to the use_daemon config key.
+    """
+    if use_daemon is None:
+        use_daemon = bool(config and config.get(USE_DAEMON_KEY, False))
+    if use_daemon:
+        client = DaemonClient.connect()
+        if client is not None:
+            return DaemonManager(client, config)
+        print("No Winstaller daemon running, running winget directly")
+    return WingetManager(config)
@@ -1,5 +1,11 @@
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QMessageBox, QProgressBar
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMessageBox,
+                             QProgressBar, QComboBox, QLineEdit, QCheckBox, QDateEdit, QTableView,
+                             QHeaderView, QAbstractItemView, QTableWidget, QTableWidgetItem, QTextEdit,
+                             QPlainTextEdit)
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, Qt, QAbstractTableModel, QModelIndex, QDate, QTimer
+from PyQt5.QtGui import QFontDatabase
+from jobs import JobQueue
+from winget_manager import RAW_COMMANDS, format_raw_output
 
 class InstallThread(QThread):
     finished = pyqtSignal(bool)
@@ -13,6 +19,79 @@ class InstallThread(QThread):
         success = self.manager.install(self.app_name)
         self.finished.emit(success)
 
+class BatchJobQueue(QObject):
+    """The window's one JobQueue (see jobs.py), with its events delivered on the GUI thread
+
+    Batches from every tab are queued here and run one after another, so two
+    never compete for the Windows Installer lock. Each is journaled (see
+    job_journal.py) and recorded in the history from the queue's worker.
+    """
+    event_received = pyqtSignal(object)  # a JobQueue event dict
+
+    def __init__(self, manager, history, journal):
+        super().__init__()
+        # Emitted from the worker thread; Qt queues it to this object's thread
+        self.queue = JobQueue(manager, history, on_event=self.event_received.emit, journal=journal)
+
+    def submit(self, operation, packages):
+        """A BatchJob for install, upgrade or uninstall of (app_name, package_id) pairs; call start()"""
+        return BatchJob(self, operation, packages)
+
+    def resume(self, journal_id):
+        """A BatchJob continuing an interrupted journaled job; call start()"""
+        return BatchJob(self, journal_id=journal_id)
+
+class BatchJob(QObject):
+    """One batch on a BatchJobQueue, reported through signals"""
+    item_started = pyqtSignal(int, str)  # index, app name
+    item_finished = pyqtSignal(str, str, bool, float)  # app name, package id, success, seconds
+    batch_finished = pyqtSignal(int, int)  # successful, failed
+
+    def __init__(self, jobs, operation=None, packages=None, journal_id=None):
+        # Owned by the queue until it finishes, whoever else holds it
+        super().__init__(jobs)
+        self.jobs = jobs
+        self.operation = operation
+        self.packages = packages
+        self.journal_id = journal_id
+        self.job_id = None
+        self.positions = {}
+
+    def start(self):
+        """Queue the batch; it starts once the batches queued before it are done"""
+        self.jobs.event_received.connect(self.on_event)
+        if self.journal_id is not None:
+            job = self.jobs.queue.resume(self.journal_id)
+        else:
+            job = self.jobs.queue.submit(self.operation, self.packages)
+        if job is None:
+            self.finish(0, 0)
+            return
+        self.job_id = job["id"]
+        self.positions = {item["id"]: i for i, item in enumerate(job["items"])}
+
+    def cancel(self):
+        """Stop after the package that is currently running"""
+        if self.job_id is not None:
+            self.jobs.queue.cancel(self.job_id)
+
+    def on_event(self, event):
+        job_id = event["job"]["id"] if "job" in event else event.get("job_id")
+        if self.job_id is None or job_id != self.job_id:
+            return
+        if event["event"] == "item_started":
+            self.item_started.emit(self.positions.get(event["id"], 0), event["name"])
+        elif event["event"] == "item_finished":
+            self.item_finished.emit(event["name"], event["id"], event["success"], float(event["seconds"]))
+        elif event["event"] == "job_finished":
+            states = [item["state"] for item in event["job"]["items"]]
+            self.finish(states.count("done"), states.count("failed"))
+
+    def finish(self, successful, failed):
+        self.jobs.event_received.disconnect(self.on_event)
+        self.batch_finished.emit(successful, failed)
+        self.deleteLater()
+
 class InstallDialog(QDialog):
     def __init__(self, app_name, manager):
         super().__init__()
@@ -107,4 +186,481 @@ class UninstallDialog(QDialog):
             self.accept()
         else:
             QMessageBox.warning(self, "Error", f"Failed to uninstall {self.app_name}.")
-            self.reject()
\ No newline at end of file
+            self.reject()
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """Table model that pages history entries in from a HistoryQuery as the view scrolls"""
+    PAGE_SIZE = 200
+    COLUMNS = ["Date", "Action", "Application", "Package ID", "Version", "Status", "Duration"]
+    ACTION_LABELS = {"install": "📦 Install", "uninstall": "🗑️ Uninstall", "upgrade": "⬆️ Upgrade"}
+    STATUS_LABELS = {"success": "✅ Success", "failed": "❌ Failed"}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = None
+        self.entries = []
+        self.last_id = None  # where the next page continues, see HistoryQuery.page
+
+    def set_query(self, query):
+        """Show a new result set, loading only its first page"""
+        self.beginResetModel()
+        self.query = query
+        self.entries, self.last_id = query.page(self.PAGE_SIZE) if query is not None else ([], None)
+        self.endResetModel()
+
+    def total(self):
+        return len(self.query) if self.query is not None else 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.last_id is not None and len(self.entries) < self.total()
+
+    def fetchMore(self, parent=QModelIndex()):
+        start = len(self.entries)
+        page, last_id = self.query.page(self.PAGE_SIZE, self.last_id)
+        self.last_id = last_id
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self.entries.extend(page)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        entry = self.entries[index.row()]
+        column = index.column()
+        if column == 0:
+            return entry.get("date", "").replace("T", " ")[:19]
+        if column == 1:
+            action = entry.get("action", "unknown")
+            return self.ACTION_LABELS.get(action, action.title())
+        if column == 2:
+            return entry.get("app_name", "")
+        if column == 3:
+            return entry.get("package_id", "")
+        if column == 4:
+            return entry.get("version", "")
+        if column == 5:
+            status = entry.get("status", "unknown")
+            return self.STATUS_LABELS.get(status, f"⚠️ {status.title()}")
+        duration = entry.get("duration")
+        return f"{duration:.1f}s" if isinstance(duration, (int, float)) else ""
+
+
+class HistoryDialog(QDialog):
+    """Installation history viewer backed by the indexed history store"""
+    ACTION_FILTERS = {"All actions": None, "Installations": "install", "Uninstallations": "uninstall", "Upgrades": "upgrade"}
+    STATUS_FILTERS = {"Any status": None, "Successful": "success", "Failed": "failed"}
+
+    FILTERS_KEY = "history_filters"
+
+    def __init__(self, history, parent=None, config=None):
+        super().__init__(parent)
+        self.history = history
+        self.config = config
+        self.setWindowTitle("Installation History")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout()
+
+        # Filter row
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Filter:"))
+
+        self.action_combo = QComboBox()
+        self.action_combo.addItems(list(self.ACTION_FILTERS))
+        self.status_combo = QComboBox()
+        self.status_combo.addItems(list(self.STATUS_FILTERS))
+
+        self.package_edit = QLineEdit()
+        self.package_edit.setPlaceholderText("Package ID...")
+
+        self.date_check = QCheckBox("From")
+        self.since_edit = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.until_edit = QDateEdit(QDate.currentDate())
+        for date_edit in (self.since_edit, self.until_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setEnabled(False)
+
+        filter_layout.addWidget(self.action_combo)
+        filter_layout.addWidget(self.status_combo)
+        filter_layout.addWidget(self.package_edit, 1)
+        filter_layout.addWidget(self.date_check)
+        filter_layout.addWidget(self.since_edit)
+        filter_layout.addWidget(QLabel("to"))
+        filter_layout.addWidget(self.until_edit)
+
+        stats_btn = QPushButton("📊 Show Statistics")
+        stats_btn.clicked.connect(self.show_statistics)
+        filter_layout.addWidget(stats_btn)
+
+        layout.addLayout(filter_layout)
+
+        # History table, rows are paged in on scroll
+        self.model = HistoryTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table, 1)
+
+        # Footer
+        footer_layout = QHBoxLayout()
+        self.count_label = QLabel("")
+        footer_layout.addWidget(self.count_label)
+        footer_layout.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        footer_layout.addWidget(close_btn)
+        layout.addLayout(footer_layout)
+
+        self.setLayout(layout)
+
+        # Typing in the package box is debounced; other filters apply at once
+        self.package_timer = QTimer(self)
+        self.package_timer.setSingleShot(True)
+        self.package_timer.timeout.connect(self.apply_filters)
+        self.package_edit.textChanged.connect(lambda: self.package_timer.start(300))
+        self.action_combo.currentTextChanged.connect(self.apply_filters)
+        self.status_combo.currentTextChanged.connect(self.apply_filters)
+        self.date_check.toggled.connect(self.on_date_range_toggled)
+        self.since_edit.dateChanged.connect(self.apply_filters)
+        self.until_edit.dateChanged.connect(self.apply_filters)
+        self.model.rowsInserted.connect(self.update_count_label)
+        self.model.modelReset.connect(self.update_count_label)
+
+        self.restore_filters()
+        self.apply_filters()
+
+    def restore_filters(self):
+        """Reapply the filters used the last time the dialog was open"""
+        saved = self.config.get(self.FILTERS_KEY, {}) if self.config else {}
+        for widget, value in ((self.action_combo, saved.get("action")), (self.status_combo, saved.get("status"))):
+            if value:
+                widget.blockSignals(True)
+                widget.setCurrentText(value)  # unknown text is ignored by a non-editable combo
+                widget.blockSignals(False)
+        self.package_edit.blockSignals(True)
+        self.package_edit.setText(saved.get("package", ""))
+        self.package_edit.blockSignals(False)
+
+    def on_date_range_toggled(self, enabled):
+        self.since_edit.setEnabled(enabled)
+        self.until_edit.setEnabled(enabled)
+        self.apply_filters()
+
+    def apply_filters(self):
+        """Re-query the store with the current filters"""
+        since = until = None
+        if self.date_check.isChecked():
+            since = self.since_edit.date().toPyDate()
+            until = self.until_edit.date().toPyDate()
+
+        query = self.history.query(
+            action=self.ACTION_FILTERS[self.action_combo.currentText()],
+            status=self.STATUS_FILTERS[self.status_combo.currentText()],
+            package=self.package_edit.text().strip() or None,
+            since=since,
+            until=until
+        )
+        self.model.set_query(query)
+
+        if self.config:
+            self.config.set(self.FILTERS_KEY, {
+                "action": self.action_combo.currentText(),
+                "status": self.status_combo.currentText(),
+                "package": self.package_edit.text().strip()
+            }, debounce=True)
+
+    def update_count_label(self, *args):
+        total = self.model.total()
+        if total == 0:
+            self.count_label.setText("No matching history entries")
+        else:
+            self.count_label.setText(f"Showing {self.model.rowCount()} of {total} entries")
+
+    def show_statistics(self):
+        stats = self.history.get_installation_stats()
+
+        def average(action):
+            seconds = stats['average_durations'].get(action)
+            return f"{seconds:.1f}s" if seconds is not None else "n/a"
+
+        top_packages = "\n".join(f"   • {package_id}: {count}" for package_id, count in stats['top_packages']) or "   • None yet"
+        activity = "\n".join(f"   • {day}: {count}" for day, count in stats['recent_activity'])
+
+        stats_text = f"""Installation Statistics:
+
+📊 Total Operations: {stats['total_operations']}
+
+📦 Installations:
+   • Successful: {stats['successful_installs']}
+   • Failed: {stats['failed_installs']}
+   • Total: {stats['total_installs']}
+
+🗑️ Uninstallations:
+   • Successful: {stats['successful_uninstalls']}
+   • Failed: {stats['failed_uninstalls']}
+   • Total: {stats['total_uninstalls']}
+
+📈 Success Rate:
+   • Overall: {stats['overall_success_rate']:.1f}%
+   • Installations: {stats['install_success_rate']:.1f}%
+   • Uninstallations: {stats['uninstall_success_rate']:.1f}%
+
+⏱️ Average Duration:
+   • Installations: {average('install')}
+   • Uninstallations: {average('uninstall')}
+
+🏆 Most Active Packages:
+{top_packages}
+
+📅 Last 7 Days:
+{activity}
+"""
+        QMessageBox.information(self, "Installation Statistics", stats_text)
+
+
+class DiagnosticsDialog(QDialog):
+    """Tools > Diagnostics: timing histograms, counters and UI stalls, exportable as JSON"""
+    COLUMNS = ["Metric", "Count", "Mean ms", "p50 ms", "p95 ms", "Max ms"]
+    STALL_FRAMES = 6  # innermost frames shown per stall; the export has them all
+    
+    def __init__(self, metrics, cache_stats=None, watchdog=None, parent=None):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.cache_stats = cache_stats
+        self.watchdog = watchdog
+        self.setWindowTitle("Diagnostics")
+        self.resize(760, 520)
+        
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table, 1)
+        
+        self.stalls_view = QTextEdit()
+        self.stalls_view.setReadOnly(True)
+        self.stalls_view.setLineWrapMode(QTextEdit.NoWrap)
+        if watchdog is not None:
+            layout.addWidget(QLabel(f"Recent UI stalls (over {watchdog.threshold_ms:.0f} ms):"))
+            layout.addWidget(self.stalls_view, 1)
+        else:
+            self.stalls_view.hide()
+        
+        buttons = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+        export_btn = QPushButton("Export JSON...")
+        export_btn.clicked.connect(self.export)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        for button in (refresh_btn, reset_btn, export_btn):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+        
+        self.refresh()
+    
+    def refresh(self):
+        snapshot = self.metrics.snapshot()
+        timings = snapshot["timings"]
+        counters = snapshot["counters"]
+        self.summary_label.setText(f"{len(timings)} timings and {len(counters)} counters "
+                                   f"collected over {snapshot['uptime_s']:.0f} s")
+        
+        self.table.setRowCount(len(timings) + len(counters))
+        row = 0
+        for name, summary in timings.items():
+            values = [name, summary["count"], summary["mean_ms"], summary["p50_ms"],
+                      summary["p95_ms"], summary["max_ms"]]
+            self.set_row(row, values)
+            row += 1
+        for name, count in counters.items():
+            self.set_row(row, [name, count, "", "", "", ""])
+            row += 1
+        
+        if self.watchdog is not None:
+            self.stalls_view.setPlainText(self.format_stalls(self.watchdog.stalls()))
+    
+    def format_stalls(self, stalls):
+        if not stalls:
+            return "No stalls recorded."
+        lines = []
+        for stall in reversed(stalls):
+            lines.append(f"{stall['time']}  {stall['duration_ms']:.0f} ms")
+            for frame in stall["stack"][-self.STALL_FRAMES:]:
+                lines.extend("    " + line for line in frame.rstrip().splitlines())
+            lines.append("")
+        return "\n".join(lines)
+    
+    def set_row(self, row, values):
+        for column, value in enumerate(values):
+            text = f"{value:.2f}" if isinstance(value, float) else str(value)
+            item = QTableWidgetItem(text)
+            if column:
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(row, column, item)
+    
+    def reset(self):
+        self.metrics.reset()
+        if self.cache_stats is not None:
+            self.cache_stats.reset()
+        if self.watchdog is not None:
+            self.watchdog.clear()
+        self.refresh()
+    
+    def export(self):
+        from PyQt5.QtWidgets import QFileDialog
+        path, _ = QFileDialog.getSaveFileName(self, "Export Diagnostics", "winstaller-diagnostics.json",
+                                              "JSON files (*.json)")
+        if not path:
+            return
+        extra = {}
+        if self.cache_stats is not None:
+            extra["cache"] = self.cache_stats.snapshot()
+        if self.watchdog is not None:
+            extra["stalls"] = self.watchdog.stalls()
+        try:
+            self.metrics.export(path, extra)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", f"Could not write {path}: {e}")
+
+class RawOutputThread(QThread):
+    """Run winget list or upgrade for the debug viewer, streaming its output"""
+    output_received = pyqtSignal(str, str)  # stream ("stdout"/"stderr"), line
+    output_finished = pyqtSignal(str)  # full report
+    
+    def __init__(self, manager, command):
+        super().__init__()
+        self.manager = manager
+        self.command = command
+    
+    def run(self):
+        report = self.manager.get_raw_winget_output(self.command, on_output=self.output_received.emit)
+        self.output_finished.emit(report)
+
+class DebugOutputDialog(QDialog):
+    """Raw winget output: recent runs kept by the manager, or a fresh run shown as it arrives"""
+    FLUSH_INTERVAL_MS = 100  # streamed lines are appended in batches
+    
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.captures = []
+        self.pending = []
+        self.thread = None
+        self.setWindowTitle("Debug: Raw Winget Output")
+        self.resize(800, 600)
+        
+        layout = QVBoxLayout(self)
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Recent runs:"))
+        self.capture_combo = QComboBox()
+        self.capture_combo.currentIndexChanged.connect(self.show_capture)
+        top.addWidget(self.capture_combo, 1)
+        self.run_buttons = []
+        for command in RAW_COMMANDS:
+            button = QPushButton(f"Run winget {command}")
+            button.clicked.connect(lambda checked, command=command: self.run_command(command))
+            top.addWidget(button)
+            self.run_buttons.append(button)
+        layout.addLayout(top)
+        
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text_edit.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.text_edit, 1)
+        
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+        
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush_output)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.is_running():
+            return
+        self.refresh_captures()
+        # Only run winget when there is nothing captured to look at
+        if self.captures:
+            self.show_capture(0)
+        else:
+            self.run_command("list")
+    
+    def is_running(self):
+        return self.thread is not None and self.thread.isRunning()
+    
+    def refresh_captures(self):
+        self.captures = self.manager.recent_raw_outputs()
+        self.capture_combo.blockSignals(True)
+        self.capture_combo.clear()
+        for capture in self.captures:
+            returncode = "timed out" if capture["returncode"] is None else f"exit {capture['returncode']}"
+            self.capture_combo.addItem(f"{capture['time']}  {' '.join(capture['command'][1:3])}  ({returncode})")
+        self.capture_combo.blockSignals(False)
+    
+    def show_capture(self, index):
+        if 0 <= index < len(self.captures) and not self.is_running():
+            self.text_edit.setPlainText(format_raw_output(self.captures[index]))
+    
+    def run_command(self, command):
+        if self.is_running():
+            return
+        self.set_running(True)
+        self.text_edit.setPlainText(f"Running: {' '.join(RAW_COMMANDS[command])}\n")
+        self.thread = RawOutputThread(self.manager, command)
+        self.thread.output_received.connect(self.on_output)
+        self.thread.output_finished.connect(self.on_finished)
+        self.thread.start()
+        self.flush_timer.start()
+    
+    def set_running(self, running):
+        self.capture_combo.setEnabled(not running)
+        for button in self.run_buttons:
+            button.setEnabled(not running)
+    
+    def on_output(self, stream, line):
+        self.pending.append(line if stream == "stdout" else f"[stderr] {line}")
+    
+    def flush_output(self):
+        if self.pending:
+            text = "".join(self.pending).rstrip("\n")
+            self.pending = []
+            self.text_edit.appendPlainText(text)
+    
+    def on_finished(self, report):
+        self.flush_timer.stop()
+        self.pending = []
+        self.set_running(False)
+        self.refresh_captures()
+        self.text_edit.setPlainText(report)
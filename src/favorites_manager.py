@@ -1,71 +1,220 @@
 import json
-import os
+import threading
 from datetime import datetime
+from state_store import get_default_store
+
+STATUS_INSTALLED = "installed"
+STATUS_UPGRADE_AVAILABLE = "upgrade_available"
+STATUS_NOT_INSTALLED = "not_installed"
 
 class FavoritesManager:
-    def __init__(self):
-        self.favorites_file = "favorites.json"
-        self.favorites = self.load_favorites()
-    
+    def __init__(self, store=None):
+        self.store = store or get_default_store()
+        # Favorites keyed by package_id, in the order they were added
+        self._favorites = {}
+        self._lock = threading.RLock()
+        # Hash tables over the latest winget inventory/upgrade records, keyed by
+        # lower-cased package id (winget ids are case-insensitive). None until
+        # the first listing arrives.
+        self._installed = None
+        self._upgrades = {}
+        self._status = {}
+        self.load_favorites()
+
     def load_favorites(self):
-        """Load favorites from file"""
+        """Load favorites from the state store"""
+        favorites = []
         try:
-            if os.path.exists(self.favorites_file):
-                with open(self.favorites_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {"favorites": []}
+            favorites = self.store.query(
+                "SELECT app_name, package_id, description, added_date FROM favorites ORDER BY rowid")
         except Exception as e:
             print(f"Error loading favorites: {e}")
-            return {"favorites": []}
-    
+
+        with self._lock:
+            self._favorites = {
+                package_id: {"app_name": app_name, "package_id": package_id,
+                             "description": description, "added_date": added_date}
+                for app_name, package_id, description, added_date in favorites
+            }
+            self._status = {}
+            self._annotate(self._favorites)
+        return self._favorites
+
     def save_favorites(self):
-        """Save favorites to file"""
+        """Rewrite all favorites in the state store"""
         try:
-            with open(self.favorites_file, 'w', encoding='utf-8') as f:
-                json.dump(self.favorites, f, indent=2, ensure_ascii=False)
+            with self._lock, self.store.transaction():
+                self.store.execute("DELETE FROM favorites")
+                self._insert(self._favorites.values())
         except Exception as e:
             print(f"Error saving favorites: {e}")
-    
-    def add_favorite(self, app_name, package_id, description=""):
-        """Add an application to favorites"""
-        # Check if already exists
-        for fav in self.favorites["favorites"]:
-            if fav["package_id"] == package_id:
-                return False  # Already exists
-        
-        favorite = {
+
+    def _insert(self, favorites):
+        self.store.executemany(
+            "INSERT OR REPLACE INTO favorites (package_id, app_name, description, added_date) VALUES (?, ?, ?, ?)",
+            ((fav["package_id"], fav["app_name"], fav["description"], fav["added_date"]) for fav in favorites))
+
+    def _new_favorite(self, app_name, package_id, description=""):
+        return {
             "app_name": app_name,
             "package_id": package_id,
             "description": description,
             "added_date": datetime.now().isoformat()
         }
-        
-        self.favorites["favorites"].append(favorite)
-        self.save_favorites()
-        return True
-    
+
+    def add_favorite(self, app_name, package_id, description=""):
+        """Add an application to favorites"""
+        return self.bulk_add([(app_name, package_id, description)]) > 0
+
+    def bulk_add(self, apps):
+        """Add many (app_name, package_id[, description]) entries with a single save
+
+        The favorites only change once the save has committed. Returns the
+        number of favorites that were actually added.
+        """
+        with self._lock:
+            added = {}
+            for app in apps:
+                package_id = app[1]
+                if package_id and package_id not in self._favorites and package_id not in added:
+                    added[package_id] = self._new_favorite(*app)
+            if added:
+                try:
+                    with self.store.transaction():
+                        self._insert(added.values())
+                except Exception as e:
+                    print(f"Error saving favorites: {e}")
+                    return 0
+                self._favorites.update(added)
+                self._annotate(added)
+        return len(added)
+
     def remove_favorite(self, package_id):
         """Remove an application from favorites"""
-        original_count = len(self.favorites["favorites"])
-        self.favorites["favorites"] = [
-            fav for fav in self.favorites["favorites"] 
-            if fav["package_id"] != package_id
-        ]
-        
-        if len(self.favorites["favorites"]) < original_count:
-            self.save_favorites()
-            return True
-        return False
-    
+        return self.bulk_remove([package_id]) > 0
+
+    def bulk_remove(self, package_ids):
+        """Remove many favorites with a single save, returning how many were removed
+
+        The favorites only change once the save has committed.
+        """
+        with self._lock:
+            removed = list(dict.fromkeys(package_id for package_id in package_ids
+                                         if package_id in self._favorites))
+            if removed:
+                try:
+                    with self.store.transaction():
+                        self.store.executemany("DELETE FROM favorites WHERE package_id = ?",
+                                               ((package_id,) for package_id in removed))
+                except Exception as e:
+                    print(f"Error saving favorites: {e}")
+                    return 0
+                for package_id in removed:
+                    del self._favorites[package_id]
+                    self._status.pop(package_id, None)
+        return len(removed)
+
     def get_favorites(self):
         """Get all favorite applications"""
-        return self.favorites["favorites"]
-    
+        with self._lock:
+            return list(self._favorites.values())
+
     def is_favorite(self, package_id):
         """Check if an application is in favorites"""
-        return any(fav["package_id"] == package_id for fav in self.favorites["favorites"])
-    
+        return package_id in self._favorites
+
     def clear_favorites(self):
         """Clear all favorites"""
-        self.favorites = {"favorites": []}
-        self.save_favorites()
+        with self._lock:
+            self._favorites = {}
+            self._status = {}
+            self.save_favorites()
+
+    def import_favorites(self, path):
+        """Merge favorites from an exported file, returning how many were new"""
+        with open(path, 'r', encoding='utf-8') as f:
+            imported = json.load(f).get("favorites", [])
+        return self.bulk_add(
+            (fav.get("app_name", fav["package_id"]), fav["package_id"], fav.get("description", ""))
+            for fav in imported if fav.get("package_id")
+        )
+
+    def export_favorites(self, path):
+        """Write all favorites to a JSON file that import_favorites() can read"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"favorites": self.get_favorites()}, f, indent=2, ensure_ascii=False)
+
+    def on_records_changed(self, kind, records):
+        """Listener for WingetManager: take in fresh installed/upgradeable records"""
+        if kind == "installed":
+            self.update_inventory(records)
+        elif kind == "upgradeable":
+            self.update_upgrades(records)
+
+    def update_inventory(self, installed_records):
+        """Join a new `winget list` result against the favorites"""
+        table = {record["id"].lower(): record for record in installed_records}
+        with self._lock:
+            previous = self._installed or {}
+            self._installed = table
+            # Only favorites whose side of the join changed are re-annotated
+            changed = [package_id for package_id in self._favorites
+                       if previous.get(package_id.lower()) != table.get(package_id.lower())
+                       or package_id not in self._status]
+            self._annotate(changed)
+
+    def update_upgrades(self, upgradeable_records):
+        """Join a new `winget upgrade` result against the favorites"""
+        table = {record["id"].lower(): record for record in upgradeable_records}
+        with self._lock:
+            previous = self._upgrades
+            self._upgrades = table
+            changed = [package_id for package_id in self._favorites
+                       if previous.get(package_id.lower()) != table.get(package_id.lower())]
+            self._annotate(changed)
+
+    def has_inventory(self):
+        """True once an installed-packages listing has been joined"""
+        return self._installed is not None
+
+    def _annotate(self, package_ids):
+        if self._installed is None:
+            return
+        for package_id in package_ids:
+            if package_id not in self._favorites:
+                continue
+            key = package_id.lower()
+            installed = self._installed.get(key)
+            upgrade = self._upgrades.get(key)
+            if upgrade is not None:
+                status = STATUS_UPGRADE_AVAILABLE
+            elif installed is not None:
+                status = STATUS_INSTALLED
+            else:
+                status = STATUS_NOT_INSTALLED
+            self._status[package_id] = {
+                "status": status,
+                "installed_version": (installed or upgrade or {}).get("version", ""),
+                "available_version": (upgrade or {}).get("available", "")
+            }
+
+    def get_annotated_favorites(self):
+        """Favorites with status, installed_version and available_version fields
+
+        Status is None until an inventory has been joined.
+        """
+        with self._lock:
+            annotated = []
+            for package_id, fav in self._favorites.items():
+                entry = dict(fav)
+                entry.update(self._status.get(package_id, {"status": None, "installed_version": "", "available_version": ""}))
+                annotated.append(entry)
+            return annotated
+
+    def missing_favorites(self):
+        """Favorites that are not installed"""
+        return [fav for fav in self.get_annotated_favorites() if fav["status"] == STATUS_NOT_INSTALLED]
+
+    def outdated_favorites(self):
+        """Installed favorites with an upgrade available"""
+        return [fav for fav in self.get_annotated_favorites() if fav["status"] == STATUS_UPGRADE_AVAILABLE]
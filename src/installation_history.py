@@ -1,33 +1,158 @@
-import json
-import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
+from state_store import INSERT_HISTORY, get_default_store, history_row
+
+HISTORY_COLUMNS = ("date", "action", "status", "app_name", "package_id", "version", "duration")
+SELECT_HISTORY = "SELECT " + ", ".join(HISTORY_COLUMNS) + " FROM history"
+
+# Running totals live in history_stats as (name, key) -> value and are
+# updated in the same transaction as each append. STAT_GROUPS recomputes
+# them from the history table alone when they are missing or out of step.
+STAT_GROUPS = (
+    ("entries", "''", "COUNT(*)", ""),
+    ("by_action", "action", "COUNT(*)", ""),
+    ("by_status", "status", "COUNT(*)", ""),
+    ("by_action_status", "action || ':' || status", "COUNT(*)", ""),
+    ("by_package", "package_id", "COUNT(*)", ""),
+    ("by_day", "substr(date, 1, 10)", "COUNT(*)", ""),
+    ("duration_count", "action", "COUNT(*)", " WHERE duration IS NOT NULL"),
+    ("duration_total", "action", "SUM(duration)", " WHERE duration IS NOT NULL"),
+)
+
+
+def _stat_deltas(entry):
+    """Counter increments for one history entry, matching STAT_GROUPS"""
+    action = entry.get("action") or "unknown"
+    status = entry.get("status") or "unknown"
+    deltas = [
+        ("entries", "", 1),
+        ("by_action", action, 1),
+        ("by_status", status, 1),
+        ("by_action_status", f"{action}:{status}", 1),
+        ("by_package", entry.get("package_id") or "", 1),
+        ("by_day", (entry.get("date") or "")[:10], 1)
+    ]
+    duration = entry.get("duration")
+    if isinstance(duration, (int, float)):
+        deltas.append(("duration_count", action, 1))
+        deltas.append(("duration_total", action, duration))
+    return deltas
+
+
+def _entry_from_row(row):
+    """History entry dict for a row, leaving out unset columns"""
+    return {column: value for column, value in zip(HISTORY_COLUMNS, row) if value is not None}
+
+
+def _rate(part, whole):
+    return (part / whole * 100) if whole > 0 else 0
+
+
+class HistoryQuery:
+    """Filtered view over the history, read newest first in pages
+
+    Only the filter is held; rows are read from the store when a page is
+    fetched. page() continues from the last id it returned, so every page
+    costs the same however far the reader has scrolled; fetch() skips rows
+    with OFFSET and is for the first few pages only.
+    """
+
+    def __init__(self, manager, clauses, params):
+        self._manager = manager
+        self._clauses = clauses
+        self._params = params
+        self._count = None
+
+    @staticmethod
+    def _where(clauses):
+        return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self._manager.store.query_one(
+                "SELECT COUNT(*) FROM history" + self._where(self._clauses), self._params)[0]
+        return self._count
+
+    def fetch(self, start, count):
+        """Entries start..start+count of the result, newest first"""
+        rows = self._manager.store.query(
+            SELECT_HISTORY + self._where(self._clauses) + " ORDER BY id DESC LIMIT ? OFFSET ?",
+            self._params + (count, start))
+        return [_entry_from_row(row) for row in rows]
+
+    def page(self, count, before_id=None):
+        """Up to count entries older than before_id (None: the newest), and the id to continue from
+
+        Returns (entries, last_id); last_id is None once nothing was left.
+        """
+        clauses, params = self._clauses, self._params
+        if before_id is not None:
+            clauses, params = clauses + ["id < ?"], params + (before_id,)
+        rows = self._manager.store.query(
+            "SELECT id, " + ", ".join(HISTORY_COLUMNS) + " FROM history" + self._where(clauses)
+            + " ORDER BY id DESC LIMIT ?", params + (count,))
+        return [_entry_from_row(row[1:]) for row in rows], (rows[-1][0] if rows else None)
+
 
 class InstallationHistoryManager:
-    def __init__(self):
-        self.history_file = "installation_history.json"
-        self.history = self.load_history()
-    
+    def __init__(self, store=None):
+        self.store = store or get_default_store()
+        self._lock = threading.RLock()
+        # Counters are checked on first use so constructing the manager is free
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load_history()
+
     def load_history(self):
-        """Load installation history from file"""
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {"installations": [], "uninstallations": []}
-        except Exception as e:
-            print(f"Error loading installation history: {e}")
-            return {"installations": [], "uninstallations": []}
-    
-    def save_history(self):
-        """Save installation history to file"""
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving installation history: {e}")
-    
-    def add_installation(self, app_name, package_id, version="", status="success"):
-        """Record an installation"""
+        """Make sure the running statistics agree with the history table"""
+        with self._lock:
+            self._loaded = True
+            try:
+                actual = self.store.query_one("SELECT COUNT(*) FROM history")[0]
+                if self._stat("entries") != actual:
+                    # Rows imported by a migration, or an interrupted rebuild
+                    self._rebuild_stats()
+            except Exception as e:
+                print(f"Error loading installation history: {e}")
+
+    def _rebuild_stats(self):
+        """Recompute every counter from the history table in one transaction"""
+        with self.store.transaction():
+            self.store.execute("DELETE FROM history_stats")
+            for name, key, value, where in STAT_GROUPS:
+                self.store.execute(
+                    f"INSERT INTO history_stats (name, key, value) "
+                    f"SELECT ?, {key}, {value} FROM history{where} GROUP BY {key}", (name,))
+
+    def _stat(self, name, key=""):
+        row = self.store.query_one("SELECT value FROM history_stats WHERE name = ? AND key = ?", (name, key))
+        return int(row[0]) if row else 0
+
+    def _stats(self, name, since_key=""):
+        return {key: value for key, value in self.store.query(
+            "SELECT key, value FROM history_stats WHERE name = ? AND key >= ?", (name, since_key))}
+
+    def _append_entries(self, entries):
+        """Insert entries and bump the counters in one commit"""
+        if not entries:
+            return
+        totals = {}
+        for entry in entries:
+            for name, key, amount in _stat_deltas(entry):
+                totals[(name, key)] = totals.get((name, key), 0) + amount
+        with self._lock:
+            self._ensure_loaded()
+            with self.store.transaction():
+                self.store.executemany(INSERT_HISTORY, (history_row(entry) for entry in entries))
+                self.store.executemany(
+                    "INSERT INTO history_stats (name, key, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name, key) DO UPDATE SET value = value + excluded.value",
+                    ((name, key, amount) for (name, key), amount in totals.items()))
+
+    def add_installation(self, app_name, package_id, version="", status="success", duration=None):
+        """Record an installation, optionally with how long it took in seconds"""
         installation = {
             "app_name": app_name,
             "package_id": package_id,
@@ -36,12 +161,16 @@ class InstallationHistoryManager:
             "date": datetime.now().isoformat(),
             "action": "install"
         }
-        
-        self.history["installations"].append(installation)
-        self.save_history()
-    
-    def add_uninstallation(self, app_name, package_id, status="success"):
-        """Record an uninstallation"""
+        if duration is not None:
+            installation["duration"] = round(duration, 2)
+
+        try:
+            self._append_entries([installation])
+        except Exception as e:
+            print(f"Error saving installation history: {e}")
+
+    def add_uninstallation(self, app_name, package_id, status="success", duration=None):
+        """Record an uninstallation, optionally with how long it took in seconds"""
         uninstallation = {
             "app_name": app_name,
             "package_id": package_id,
@@ -49,47 +178,149 @@ class InstallationHistoryManager:
             "date": datetime.now().isoformat(),
             "action": "uninstall"
         }
-        
-        self.history["uninstallations"].append(uninstallation)
-        self.save_history()
-    
-    def get_installation_history(self, limit=50):
-        """Get recent installation history"""
-        all_history = self.history["installations"] + self.history["uninstallations"]
-        # Sort by date (newest first)
-        all_history.sort(key=lambda x: x["date"], reverse=True)
-        return all_history[:limit]
-    
+        if duration is not None:
+            uninstallation["duration"] = round(duration, 2)
+
+        try:
+            self._append_entries([uninstallation])
+        except Exception as e:
+            print(f"Error saving installation history: {e}")
+
+    def add_upgrade(self, app_name, package_id, version="", status="success", duration=None):
+        """Record an upgrade, optionally with how long it took in seconds"""
+        upgrade = {
+            "app_name": app_name,
+            "package_id": package_id,
+            "version": version,
+            "status": status,
+            "date": datetime.now().isoformat(),
+            "action": "upgrade"
+        }
+        if duration is not None:
+            upgrade["duration"] = round(duration, 2)
+
+        try:
+            self._append_entries([upgrade])
+        except Exception as e:
+            print(f"Error saving installation history: {e}")
+
+    def count(self):
+        """Number of recorded operations"""
+        self._ensure_loaded()
+        return self._stat("entries")
+
+    def get_installation_history(self, limit=50, offset=0):
+        """Get recent installation history, newest first"""
+        return self.query().fetch(offset, limit)
+
     def get_app_history(self, package_id):
-        """Get history for a specific application"""
-        app_history = []
-        
-        for installation in self.history["installations"]:
-            if installation["package_id"] == package_id:
-                app_history.append(installation)
-        
-        for uninstallation in self.history["uninstallations"]:
-            if uninstallation["package_id"] == package_id:
-                app_history.append(uninstallation)
-        
-        # Sort by date
-        app_history.sort(key=lambda x: x["date"])
-        return app_history
-    
-    def get_installation_stats(self):
-        """Get installation statistics"""
-        total_installations = len(self.history["installations"])
-        total_uninstallations = len(self.history["uninstallations"])
-        successful_installations = len([i for i in self.history["installations"] if i["status"] == "success"])
-        
+        """Get history for a specific application, oldest first"""
+        rows = self.store.query(SELECT_HISTORY + " WHERE package_id = ? ORDER BY id", (package_id,))
+        return [_entry_from_row(row) for row in rows]
+
+    def get_history_between(self, start, end, limit=50):
+        """Get entries dated between two dates (inclusive), newest first"""
+        return self.query(since=start, until=end).fetch(0, limit)
+
+    def query(self, action=None, status=None, package=None, since=None, until=None):
+        """Filter history through the table's indexes
+
+        action/status are names like "install" or "failed", package matches
+        package ids case-insensitively (the exact id if there is one, else
+        every id starting with it, through the NOCASE index) and since/until
+        are inclusive dates.
+        """
+        clauses = []
+        params = []
+        if action:
+            clauses.append("action = ?")
+            params.append(action)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if package:
+            if self.store.query_one("SELECT 1 FROM history WHERE package_id = ? LIMIT 1", (package,)):
+                clauses.append("package_id = ?")
+                params.append(package)
+            else:
+                escaped = package.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                clauses.append("package_id LIKE ? ESCAPE '\\'")
+                params.append(f"{escaped}%")
+        if since:
+            clauses.append("day >= ?")
+            params.append(since.toordinal())
+        if until:
+            clauses.append("day <= ?")
+            params.append(until.toordinal())
+
+        return HistoryQuery(self, clauses, tuple(params))
+
+    def get_installation_stats(self, top_packages=5, recent_days=7):
+        """Get installation statistics from the running aggregate
+
+        The counters are maintained on every append, so this does not depend
+        on how much history has been recorded.
+        """
+        today = datetime.now().date()
+        with self._lock:
+            self._ensure_loaded()
+            entries = self._stat("entries")
+            by_action = {key: int(value) for key, value in self._stats("by_action").items()}
+            by_status = {key: int(value) for key, value in self._stats("by_status").items()}
+            by_action_status = self._stats("by_action_status")
+            duration_counts = self._stats("duration_count")
+            duration_totals = self._stats("duration_total")
+            by_day = self._stats("by_day", (today - timedelta(days=recent_days - 1)).isoformat())
+            busiest_packages = [
+                (package_id, int(value)) for package_id, value in self.store.query(
+                    "SELECT key, value FROM history_stats WHERE name = 'by_package' "
+                    "ORDER BY value DESC LIMIT ?", (top_packages,))
+            ]
+
+        total_installs = by_action.get("install", 0)
+        total_uninstalls = by_action.get("uninstall", 0)
+        successful_installs = int(by_action_status.get("install:success", 0))
+        successful_uninstalls = int(by_action_status.get("uninstall:success", 0))
+        successful_operations = by_status.get("success", 0)
+
+        average_durations = {
+            action: duration_totals.get(action, 0) / count
+            for action, count in duration_counts.items() if count
+        }
+        activity = []
+        for days_ago in range(recent_days - 1, -1, -1):
+            day = (today - timedelta(days=days_ago)).isoformat()
+            activity.append((day, int(by_day.get(day, 0))))
+
         return {
-            "total_installations": total_installations,
-            "total_uninstallations": total_uninstallations,
-            "successful_installations": successful_installations,
-            "success_rate": (successful_installations / total_installations * 100) if total_installations > 0 else 0
+            "total_operations": entries,
+            "total_installs": total_installs,
+            "successful_installs": successful_installs,
+            "failed_installs": total_installs - successful_installs,
+            "total_uninstalls": total_uninstalls,
+            "successful_uninstalls": successful_uninstalls,
+            "failed_uninstalls": total_uninstalls - successful_uninstalls,
+            "overall_success_rate": _rate(successful_operations, entries),
+            "install_success_rate": _rate(successful_installs, total_installs),
+            "uninstall_success_rate": _rate(successful_uninstalls, total_uninstalls),
+            "by_action": by_action,
+            "by_status": by_status,
+            "average_durations": average_durations,
+            "top_packages": busiest_packages,
+            "recent_activity": activity,
+            # Names used before the aggregate existed
+            "total_installations": total_installs,
+            "total_uninstallations": total_uninstalls,
+            "successful_installations": successful_installs,
+            "success_rate": _rate(successful_installs, total_installs)
         }
-    
+
     def clear_history(self):
         """Clear all installation history"""
-        self.history = {"installations": [], "uninstallations": []}
-        self.save_history()
+        with self._lock:
+            try:
+                with self.store.transaction():
+                    self.store.execute("DELETE FROM history")
+                    self.store.execute("DELETE FROM history_stats")
+            except Exception as e:
+                print(f"Error clearing installation history: {e}")
@@ -0,0 +1,181 @@
+"""Journal of batch jobs in the state store, for resuming interrupted batches
+
+Each batch is a row in jobs with one row per package in job_items. An item
+is marked running before winget starts and done or failed as soon as it
+ends, each in its own commit, so after a crash or a closed window the
+journal shows exactly which packages were finished, which one was in flight
+and which never started.
+
+While a job runs, its heartbeat is refreshed every HEARTBEAT_INTERVAL
+seconds. An active job whose heartbeat is older than STALE_AFTER was
+interrupted; one with a fresh heartbeat is still running in another
+Winstaller process and is left alone.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from state_store import get_default_store
+
+# Job states; only "active" jobs can be resumed
+JOB_ACTIVE = "active"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+JOB_ABANDONED = "abandoned"
+
+# Item states
+ITEM_PENDING = "pending"
+ITEM_RUNNING = "running"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+
+HEARTBEAT_INTERVAL = 10
+STALE_AFTER = 30
+KEEP_FINISHED_JOBS = 50
+
+
+def unique_packages(packages):
+    """(app_name, package_id) pairs with repeated ids dropped, first one kept
+
+    winget ids are case-insensitive. The journal and run_batch both go
+    through this, so every package that runs has exactly one journal item.
+    """
+    seen = set()
+    unique = []
+    for app_name, package_id in packages:
+        if package_id.lower() not in seen:
+            seen.add(package_id.lower())
+            unique.append((app_name, package_id))
+    return unique
+
+
+class JobJournal:
+    """Creates, checkpoints and resumes journaled batch jobs"""
+
+    def __init__(self, store=None):
+        self.store = store or get_default_store()
+
+    def create(self, operation, packages):
+        """Journal a new job for (app_name, package_id) pairs; returns its id"""
+        items = unique_packages(packages)
+        with self.store.transaction():
+            self._prune()
+            self.store.execute(
+                "INSERT INTO jobs (operation, state, created, heartbeat) VALUES (?, ?, ?, ?)",
+                (operation, JOB_ACTIVE, datetime.now().isoformat(), time.time()))
+            job_id = self.store.query_one("SELECT last_insert_rowid()")[0]
+            self.store.executemany(
+                "INSERT INTO job_items (job_id, position, app_name, package_id) VALUES (?, ?, ?, ?)",
+                ((job_id, position, app_name, package_id) for position, (app_name, package_id) in enumerate(items)))
+        return job_id
+
+    def _prune(self):
+        """Forget all but the newest KEEP_FINISHED_JOBS finished jobs"""
+        old = [row[0] for row in self.store.query(
+            "SELECT id FROM jobs WHERE state != ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+            (JOB_ACTIVE, KEEP_FINISHED_JOBS))]
+        if old:
+            marks = ", ".join("?" * len(old))
+            self.store.execute(f"DELETE FROM job_items WHERE job_id IN ({marks})", old)
+            self.store.execute(f"DELETE FROM jobs WHERE id IN ({marks})", old)
+
+    def get(self, job_id):
+        """The job with its items in order, or None"""
+        row = self.store.query_one(
+            "SELECT id, operation, state, created, finished, heartbeat FROM jobs WHERE id = ?", (job_id,))
+        if row is None:
+            return None
+        job = dict(zip(("id", "operation", "state", "created", "finished", "heartbeat"), row))
+        job["items"] = [dict(zip(("name", "id", "state", "seconds"), item)) for item in self.store.query(
+            "SELECT app_name, package_id, state, seconds FROM job_items WHERE job_id = ? ORDER BY position",
+            (job_id,))]
+        return job
+
+    def recent(self, limit=20):
+        """The newest jobs, with their items"""
+        ids = [row[0] for row in self.store.query("SELECT id FROM jobs ORDER BY id DESC LIMIT ?", (limit,))]
+        return [self.get(job_id) for job_id in ids]
+
+    def interrupted(self):
+        """Active jobs nobody is running any more that still have packages left"""
+        return self._unfinished("<")
+
+    def recently_active(self):
+        """Unfinished active jobs with a fresh heartbeat
+
+        Either running in another process or interrupted less than
+        STALE_AFTER seconds ago; which one is only known once that has passed.
+        """
+        return self._unfinished(">=")
+
+    def _unfinished(self, heartbeat_comparison):
+        rows = self.store.query(
+            f"SELECT id FROM jobs WHERE state = ? AND heartbeat {heartbeat_comparison} ? AND EXISTS "
+            "(SELECT 1 FROM job_items WHERE job_id = jobs.id AND state IN (?, ?)) ORDER BY id",
+            (JOB_ACTIVE, time.time() - STALE_AFTER, ITEM_PENDING, ITEM_RUNNING))
+        return [self.get(row[0]) for row in rows]
+
+    def claim(self, job_id):
+        """Take over an interrupted job; False if it is running elsewhere or finished"""
+        return self.store.execute(
+            "UPDATE jobs SET heartbeat = ? WHERE id = ? AND state = ? AND heartbeat < ?",
+            (time.time(), job_id, JOB_ACTIVE, time.time() - STALE_AFTER)) == 1
+
+    def heartbeat(self, job_id):
+        self.store.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+    @contextmanager
+    def keep_alive(self, job_id):
+        """Refresh the job's heartbeat from a side thread for the duration of the block"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                try:
+                    self.heartbeat(job_id)
+                except Exception as e:
+                    print(f"Job {job_id} heartbeat error: {e}")
+
+        self.heartbeat(job_id)
+        thread = threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def _set_item(self, job_id, package_id, state, seconds=None):
+        self.store.execute(
+            "UPDATE job_items SET state = ?, seconds = COALESCE(?, seconds) WHERE job_id = ? AND package_id = ?",
+            (state, seconds, job_id, package_id))
+
+    def mark_running(self, job_id, package_id):
+        """Checkpoint: winget is about to run for this package"""
+        self._set_item(job_id, package_id, ITEM_RUNNING)
+
+    def finish_item(self, job_id, package_id, success, seconds=None):
+        """Checkpoint: the package finished"""
+        self._set_item(job_id, package_id, ITEM_DONE if success else ITEM_FAILED, seconds)
+
+    def settle_item(self, job_id, package_id, state):
+        """Set an in-flight item's state after checking it against the inventory"""
+        self._set_item(job_id, package_id, state)
+
+    def pending_items(self, job_id):
+        """(app_name, package_id) of the items that have not run yet"""
+        return [tuple(row) for row in self.store.query(
+            "SELECT app_name, package_id FROM job_items WHERE job_id = ? AND state = ? ORDER BY position",
+            (job_id, ITEM_PENDING))]
+
+    def finish(self, job_id, cancelled=False):
+        """Close the job; a cancelled job keeps its pending items but is not offered for resuming"""
+        self.store.execute("UPDATE jobs SET state = ?, finished = ? WHERE id = ?",
+                           (JOB_CANCELLED if cancelled else JOB_DONE, datetime.now().isoformat(), job_id))
+
+    def abandon(self, job_id):
+        """Don't offer an interrupted job again"""
+        self.store.execute("UPDATE jobs SET state = ?, finished = ? WHERE id = ?",
+                           (JOB_ABANDONED, datetime.now().isoformat(), job_id))
@@ -0,0 +1,307 @@
+"""Batch install, upgrade and uninstall jobs
+
+run_batch runs one batch, optionally several packages at a time, and records
+each result in the installation history and, when given one, in the job
+journal (job_journal.py) so the batch can be resumed if it is interrupted;
+resume_job does that. JobQueue runs submitted batches one after another on a
+worker thread and reports progress as events; the daemon uses it so every
+client shares one queue and winget never runs two batches against each other.
+"""
+
+import itertools
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from job_journal import ITEM_DONE, ITEM_PENDING, ITEM_RUNNING, unique_packages
+from profiling import profiled
+
+# Concurrent winget runs per batch. Installers using MSI take turns on the
+# Windows Installer lock anyway, so more jobs mostly help exe/msix packages.
+DEFAULT_JOBS = 1
+MAX_JOBS = 8
+
+OPERATIONS = ("install", "upgrade", "uninstall")
+
+
+def run_batch(manager, history, operation, packages, jobs=DEFAULT_JOBS, on_item=None,
+              on_start=None, should_stop=None, journal=None, job_id=None):
+    """Install, upgrade or uninstall packages, up to `jobs` at a time
+
+    packages is a list of (app_name, package_id). on_start(app_name,
+    package_id) is called from a worker as a package starts. Each result is
+    recorded in the history (unless history is None) and passed to
+    on_item(item) as it finishes, where item has name, id, success and
+    seconds. Once should_stop() returns true, packages that have not started
+    are skipped. A package id given twice (in any case) runs once, see
+    unique_packages. Returns the finished items in completion order.
+
+    With a journal, job_id's items are checkpointed as they start and
+    finish, and the job is closed at the end.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown batch operation: {operation}")
+    packages = unique_packages(packages)
+    run_one = getattr(manager, operation)
+
+    # Profiled in the worker that runs the package, where the time goes
+    @profiled("batch")
+    def timed_run(app_name, package_id):
+        if should_stop and should_stop():
+            return None
+        if journal is not None:
+            journal.mark_running(job_id, package_id)
+        if on_start:
+            on_start(app_name, package_id)
+        started = time.monotonic()
+        try:
+            success = run_one(package_id)
+        except Exception as e:
+            print(f"Batch {operation} error for {package_id}: {e}", file=sys.stderr)
+            success = False
+        return success, time.monotonic() - started
+
+    items = []
+    alive = journal.keep_alive(job_id) if journal is not None else nullcontext()
+    with alive, ThreadPoolExecutor(max_workers=max(1, min(jobs, MAX_JOBS))) as pool:
+        futures = {pool.submit(timed_run, app_name, package_id): (app_name, package_id)
+                   for app_name, package_id in packages}
+        # History is written here, one item at a time, not from the workers
+        for future in as_completed(futures):
+            outcome = future.result()
+            if outcome is None:
+                continue
+            app_name, package_id = futures[future]
+            success, seconds = outcome
+            # History first: if we die in between, resuming re-verifies the
+            # package instead of recording it twice
+            if history is not None:
+                record_history(history, operation, app_name, package_id, success, seconds)
+            if journal is not None:
+                journal.finish_item(job_id, package_id, success, seconds)
+            item = {"name": app_name, "id": package_id, "success": success, "seconds": round(seconds, 1)}
+            items.append(item)
+            if on_item:
+                on_item(item)
+    if journal is not None:
+        journal.finish(job_id, cancelled=bool(should_stop and should_stop()))
+    return items
+
+
+def verify_interrupted(manager, journal, job_id):
+    """Settle the items that were in flight when a job was interrupted
+
+    Whether winget finished them is read from a fresh inventory: an install
+    is done if the package is installed, an upgrade if it is installed with
+    no upgrade left, an uninstall if it is gone. Anything else runs again.
+    Returns the (app_name, package_id) pairs still to run.
+    """
+    job = journal.get(job_id)
+    in_flight = [item for item in job["items"] if item["state"] == ITEM_RUNNING]
+    if in_flight:
+        installed = {record["id"].lower() for record in manager.list_installed_records(use_cache=False)}
+        upgradeable = set()
+        if job["operation"] == "upgrade":
+            upgradeable = {record["id"].lower() for record in manager.get_upgradeable_records(use_cache=False)}
+        for item in in_flight:
+            key = item["id"].lower()
+            if job["operation"] == "uninstall":
+                completed = key not in installed
+            else:
+                completed = key in installed and key not in upgradeable
+            journal.settle_item(job_id, item["id"], ITEM_DONE if completed else ITEM_PENDING)
+    return journal.pending_items(job_id)
+
+
+def resume_job(manager, history, journal, job_id, jobs=DEFAULT_JOBS, on_item=None, on_start=None,
+               should_stop=None):
+    """Continue an interrupted job where it stopped; returns None if it can't be claimed
+
+    Finished packages are skipped and the one in flight is re-verified, see
+    verify_interrupted. Otherwise like run_batch.
+    """
+    if not journal.claim(job_id):
+        return None
+    with journal.keep_alive(job_id):
+        packages = verify_interrupted(manager, journal, job_id)
+    operation = journal.get(job_id)["operation"]
+    return run_batch(manager, history, operation, packages, jobs, on_item, on_start, should_stop,
+                     journal=journal, job_id=job_id)
+
+
+def record_history(history, operation, app_name, package_id, success, seconds):
+    add = {"install": history.add_installation, "upgrade": history.add_upgrade,
+           "uninstall": history.add_uninstallation}[operation]
+    add(app_name, package_id, status="success" if success else "failed", duration=seconds)
+
+
+class JobQueue:
+    """Runs batch jobs in submission order on one worker thread
+
+    A job is a dict with id, operation, state (queued, running, done,
+    cancelled) and items, each with name, id and state (pending, running,
+    done, failed, skipped). on_event(event) receives job_queued,
+    item_started, item_finished and job_finished events from the worker.
+    With a journal, jobs that record history are journaled too, under
+    journal_id, and interrupted ones can be resumed with resume().
+    """
+
+    def __init__(self, manager, history, on_event=None, journal=None):
+        self.manager = manager
+        self.history = history
+        self.on_event = on_event
+        self.journal = journal
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="job-queue", daemon=True)
+        self._worker.start()
+
+    def submit(self, operation, packages, jobs=DEFAULT_JOBS, record=True):
+        """Queue a batch; returns the job. record=False leaves history (and journaling) to the caller"""
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown batch operation: {operation}")
+        packages = unique_packages(packages)
+        journal_id = self.journal.create(operation, packages) if self.journal and record else None
+        return self._enqueue(operation, packages, jobs, record, journal_id, resume=False)
+
+    def resume(self, journal_id, jobs=DEFAULT_JOBS):
+        """Queue the rest of an interrupted journaled job; returns the job, or None if it isn't in the journal"""
+        journaled = self.journal.get(journal_id) if self.journal else None
+        if journaled is None:
+            return None
+        packages = [(item["name"], item["id"]) for item in journaled["items"]
+                    if item["state"] in (ITEM_PENDING, ITEM_RUNNING)]
+        return self._enqueue(journaled["operation"], packages, jobs, True, journal_id, resume=True)
+
+    def _enqueue(self, operation, packages, jobs, record, journal_id, resume):
+        with self._lock:
+            job_id = next(self._ids)
+            job = {
+                "id": job_id,
+                "operation": operation,
+                "state": "queued",
+                "jobs": jobs,
+                "record": record,
+                "journal_id": journal_id,
+                "resume": resume,
+                "submitted": time.time(),
+                "finished": None,
+                "cancel_requested": False,
+                "items": [{"name": name, "id": package_id, "state": "pending", "seconds": None}
+                          for name, package_id in packages],
+            }
+            self._jobs[job_id] = job
+            snapshot = self._snapshot(job)
+        self._queue.put(job_id)
+        self._emit({"event": "job_queued", "job": snapshot})
+        return snapshot
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def list(self):
+        with self._lock:
+            return [self._snapshot(job) for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        """Skip the job's packages that have not started; returns False for unknown or finished jobs"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] in ("done", "cancelled"):
+                return False
+            job["cancel_requested"] = True
+            return True
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job has finished; returns it, or None if it is unknown"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["state"] in ("done", "cancelled"):
+                    return self._snapshot(job) if job else None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return self._snapshot(job)
+                self._changed.wait(remaining)
+
+    @staticmethod
+    def _snapshot(job):
+        return dict(job, items=[dict(item) for item in job["items"]])
+
+    def _emit(self, event):
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Job event error: {e}")
+
+    def _set_item(self, job, package_id, **changes):
+        with self._lock:
+            for item in job["items"]:
+                if item["id"] == package_id and item["state"] in ("pending", "running"):
+                    item.update(changes)
+                    break
+            self._changed.notify_all()
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs[job_id]
+                if job["cancel_requested"]:
+                    job["state"] = "cancelled"
+                else:
+                    job["state"] = "running"
+            if job["state"] == "running":
+                self._run_job(job)
+            with self._lock:
+                for item in job["items"]:
+                    if item["state"] == "pending":
+                        item["state"] = "skipped"
+                job["state"] = "cancelled" if job["cancel_requested"] else "done"
+                job["finished"] = time.time()
+                snapshot = self._snapshot(job)
+                self._changed.notify_all()
+            self._emit({"event": "job_finished", "job": snapshot})
+
+    def _run_job(self, job):
+        job_id = job["id"]
+
+        def on_start(app_name, package_id):
+            self._set_item(job, package_id, state="running")
+            self._emit({"event": "item_started", "job_id": job_id, "name": app_name, "id": package_id})
+
+        def on_item(item):
+            self._set_item(job, item["id"], state="done" if item["success"] else "failed", seconds=item["seconds"])
+            self._emit(dict(item, event="item_finished", job_id=job_id))
+
+        should_stop = lambda: job["cancel_requested"]
+        history = self.history if job["record"] else None
+        try:
+            if job["resume"]:
+                if resume_job(self.manager, history, self.journal, job["journal_id"], job["jobs"],
+                              on_item, on_start, should_stop) is None:
+                    print(f"Job {job['journal_id']} is running elsewhere or finished, not resumed")
+                    return
+                # Items verified as done never started here
+                finished = {item["id"] for item in self.journal.get(job["journal_id"])["items"]
+                            if item["state"] == ITEM_DONE}
+                for item in job["items"]:
+                    if item["id"] in finished:
+                        self._set_item(job, item["id"], state="done")
+            else:
+                run_batch(self.manager, history, job["operation"],
+                          [(item["name"], item["id"]) for item in job["items"]], job["jobs"],
+                          on_item=on_item, on_start=on_start, should_stop=should_stop,
+                          journal=self.journal if job["journal_id"] else None, job_id=job["journal_id"])
+        except Exception as e:
+            print(f"Job {job_id} error: {e}")
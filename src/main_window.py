@@ -1,14 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt5.QtWidgets import QMainWindow, QVBoxLayout, QWidget, QTabWidget, QStatusBar, QMenuBar, QAction
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QThread, QByteArray, pyqtSignal
 from PyQt5.QtGui import QIcon, QKeySequence
-from widgets import SearchWidget, InstalledAppsWidget
-from dialogs import InstallDialog
-from winget_manager import WingetManager
+from widgets import SearchWidget, InstalledAppsWidget, RECENT_SEARCHES_KEY
+from daemon import connect_manager
+from config_manager import ConfigManager
+from installation_history import InstallationHistoryManager
+from favorites_manager import FavoritesManager
+from job_journal import STALE_AFTER, JobJournal
+from watchdog import StallWatchdog, STALL_THRESHOLD_KEY, DEFAULT_STALL_THRESHOLD_MS
+
+INSTALLED_TAB = 1
+PREWARM_WORKERS = 3
+WINDOW_GEOMETRY_KEY = "window_geometry"
+
+class PrewarmThread(QThread):
+    """Background thread that warms the winget caches concurrently"""
+    task_finished = pyqtSignal(str, int)  # task name, number of items (a list's length or a count)
+    prewarm_finished = pyqtSignal()
+    
+    def __init__(self, tasks, max_workers=PREWARM_WORKERS):
+        super().__init__()
+        self.tasks = tasks  # list of (name, callable)
+        self.max_workers = max_workers
+    
+    def run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(task): name for name, task in self.tasks}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        result = future.result()
+                        count = result if isinstance(result, int) else len(result or [])
+                        self.task_finished.emit(name, count)
+                    except Exception as e:
+                        print(f"Prewarm {name} error: {e}")
+        finally:
+            self.prewarm_finished.emit()
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.manager = WingetManager()
+        self.config = ConfigManager()
+        # Cache TTLs can be tuned through the "cache_ttls" config key; with
+        # "use_daemon" set, winget work goes through a running daemon
+        self.manager = connect_manager(self.config)
+        # Shared by both tabs; the history index is only read on first use
+        self.history_manager = InstallationHistoryManager()
+        self.favorites_manager = FavoritesManager()
+        # Every fresh winget list/upgrade result is joined into the favorites
+        self.manager.add_listener(self.favorites_manager.on_records_changed)
+        self.prewarm_thread = None
+        self.favorites_thread = None
+        self.journal = JobJournal()
+        # Every batch, from any tab, runs on this one queue
+        from dialogs import BatchJobQueue
+        self.batch_jobs = BatchJobQueue(self.manager, self.history_manager, self.journal)
+        self._interrupted_offered = False
+        self._interrupted_recheck = False
+        self._resume_queue = []
+        self.catalog_thread = None
+        self._prewarm_started = False
         self.init_ui()
         self.init_menu()
         self.init_statusbar()
@@ -18,10 +71,15 @@ class MainWindow(QMainWindow):
         self.cache_cleanup_timer.timeout.connect(self.cleanup_cache)
         self.cache_cleanup_timer.start(1800000)  # 30 minutes
         
+        # Records where the GUI thread blocks; see Tools > Diagnostics
+        self.watchdog = StallWatchdog(self.config.get(STALL_THRESHOLD_KEY, DEFAULT_STALL_THRESHOLD_MS), self)
+        self.watchdog.start()
+        
     def init_ui(self):
         self.setWindowTitle("✨ Winstaller - Windows Package Manager")
         self.setMinimumSize(1000, 700)
         self.resize(1200, 800)
+        self.restore_geometry()
         
         # Set application icon
         try:
@@ -30,247 +88,175 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"Could not load icon: {e}")
         
-        # Apply premium modern styling inspired by macOS and Windows 11
-        self.setStyleSheet("""
-            QMainWindow {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #fafbfc, stop: 1 #f2f4f8);
-                color: #1f2937;
-            }
-            
-            /* Modern Tab Widget */
-            QTabWidget::pane {
-                border: none;
-                background-color: rgba(255, 255, 255, 0.9);
-                border-radius: 12px;
-                margin-top: 0px;
-            }
-            
-            QTabWidget::tab-bar {
-                alignment: center;
-                background-color: transparent;
-            }
-            
-            QTabBar::tab {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(255, 255, 255, 0.8), stop: 1 rgba(248, 250, 252, 0.8));
-                border: 1px solid rgba(209, 213, 219, 0.4);
-                border-bottom: none;
-                padding: 12px 24px;
-                margin-right: 4px;
-                border-top-left-radius: 8px;
-                border-top-right-radius: 8px;
-                font-weight: 600;
-                font-size: 13px;
-                color: #6b7280;
-                min-width: 120px;
-            }
-            
-            QTabBar::tab:selected {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #ffffff, stop: 1 #f8fafc);
-                color: #1f2937;
-                border-color: rgba(59, 130, 246, 0.3);
-                border-bottom: 2px solid #3b82f6;
-            }
-            
-            QTabBar::tab:hover:!selected {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(255, 255, 255, 0.95), stop: 1 rgba(243, 244, 246, 0.95));
-                color: #374151;
-            }
-            
-            /* Premium Buttons */
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #3b82f6, stop: 1 #1d4ed8);
-                color: white;
-                border: none;
-                padding: 10px 20px;
-                border-radius: 8px;
-                font-weight: 600;
-                font-size: 13px;
-                min-height: 20px;
-            }
-            
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #2563eb, stop: 1 #1e40af);
-            }
-            
-            QPushButton:pressed {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #1d4ed8, stop: 1 #1e3a8a);
-            }
-            
-            QPushButton:disabled {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #e5e7eb, stop: 1 #d1d5db);
-                color: #9ca3af;
-            }
-            
-            /* Modern Text Inputs */
-            QLineEdit {
-                background-color: rgba(255, 255, 255, 0.9);
-                border: 2px solid rgba(209, 213, 219, 0.6);
-                border-radius: 10px;
-                padding: 12px 16px;
-                font-size: 14px;
-                color: #1f2937;
-                selection-background-color: #3b82f6;
-            }
-            
-            QLineEdit:focus {
-                border-color: #3b82f6;
-                background-color: #ffffff;
-            }
-            
-            QLineEdit:hover {
-                border-color: rgba(59, 130, 246, 0.4);
-            }
-            
-            /* Premium List Widgets */
-            QListWidget {
-                background-color: rgba(255, 255, 255, 0.95);
-                border: 1px solid rgba(209, 213, 219, 0.3);
-                border-radius: 12px;
-                padding: 8px;
-                font-size: 14px;
-                outline: none;
-                alternate-background-color: rgba(248, 250, 252, 0.5);
-            }
-            
-            QListWidget::item {
-                padding: 16px;
-                margin: 4px;
-                border-radius: 8px;
-                background-color: transparent;
-                border: 1px solid transparent;
-            }
-            
-            QListWidget::item:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(59, 130, 246, 0.08), stop: 1 rgba(59, 130, 246, 0.04));
-                border-color: rgba(59, 130, 246, 0.2);
-            }
-            
-            QListWidget::item:selected {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(59, 130, 246, 0.15), stop: 1 rgba(59, 130, 246, 0.08));
-                border-color: rgba(59, 130, 246, 0.3);
-                color: #1f2937;
-            }
-            
-            /* Progress Bars */
-            QProgressBar {
-                background-color: rgba(229, 231, 235, 0.8);
-                border: none;
-                border-radius: 6px;
-                height: 12px;
-                text-align: center;
-            }
-            
-            QProgressBar::chunk {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #3b82f6, stop: 1 #1d4ed8);
-                border-radius: 6px;
-            }
-            
-            /* Labels */
-            QLabel {
-                color: #374151;
-                font-size: 14px;
-            }
-            
-            /* Scrollbars */
-            QScrollBar:vertical {
-                background-color: rgba(243, 244, 246, 0.5);
-                width: 12px;
-                border-radius: 6px;
-                margin: 0px;
-            }
-            
-            QScrollBar::handle:vertical {
-                background-color: rgba(156, 163, 175, 0.6);
-                border-radius: 6px;
-                min-height: 20px;
-                margin: 2px;
-            }
-            
-            QScrollBar::handle:vertical:hover {
-                background-color: rgba(107, 114, 128, 0.8);
-            }
-            
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-            
-            /* Status Bar */
-            QStatusBar {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(255, 255, 255, 0.9), stop: 1 rgba(243, 244, 246, 0.9));
-                border-top: 1px solid rgba(209, 213, 219, 0.3);
-                padding: 4px 12px;
-                color: #6b7280;
-                font-size: 12px;
-            }
-            
-            /* Menu Bar */
-            QMenuBar {
-                background-color: rgba(255, 255, 255, 0.95);
-                border-bottom: 1px solid rgba(209, 213, 219, 0.3);
-                padding: 4px 8px;
-                font-size: 13px;
-                color: #374151;
-            }
-            
-            QMenuBar::item {
-                padding: 6px 12px;
-                border-radius: 6px;
-                margin: 2px;
-            }
-            
-            QMenuBar::item:selected {
-                background-color: rgba(59, 130, 246, 0.1);
-            }
-            
-            QMenu {
-                background-color: rgba(255, 255, 255, 0.98);
-                border: 1px solid rgba(209, 213, 219, 0.4);
-                border-radius: 8px;
-                padding: 4px;
-                color: #374151;
-            }
-            
-            QMenu::item {
-                padding: 8px 16px;
-                border-radius: 4px;
-                margin: 1px;
-            }
-            
-            QMenu::item:selected {
-                background-color: rgba(59, 130, 246, 0.1);
-            }
-        """)
+        # Styling is applied application-wide from styles.py (see main.py)
         
         # Create tab widget
         self.tab_widget = QTabWidget()
         
-        # Create widgets for each tab
-        self.search_widget = SearchWidget(self.manager)
-        self.installed_widget = InstalledAppsWidget(self.manager)
+        # Only the visible tab is built up front; the Installed tab gets an
+        # empty page that is filled the first time it is shown
+        self.search_widget = SearchWidget(self.manager, self.config, self.history_manager, self.favorites_manager,
+                                          self.batch_jobs)
+        self.installed_widget = None
+        self.installed_page = QWidget()
+        installed_layout = QVBoxLayout(self.installed_page)
+        installed_layout.setContentsMargins(0, 0, 0, 0)
         
         # Add tabs with modern icons
         self.tab_widget.addTab(self.search_widget, "🔍 Discover")
-        self.tab_widget.addTab(self.installed_widget, "📦 Installed")
+        self.tab_widget.addTab(self.installed_page, "📦 Installed")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         
         # Set as central widget
         self.setCentralWidget(self.tab_widget)
         
+    def on_tab_changed(self, index):
+        """Build tabs lazily the first time they are shown"""
+        if index == INSTALLED_TAB:
+            self.ensure_installed_widget()
+    
+    def ensure_installed_widget(self):
+        """Create the Installed tab contents on demand"""
+        if self.installed_widget is None:
+            self.installed_widget = InstalledAppsWidget(self.manager, self.history_manager, self.config, self.batch_jobs)
+            self.installed_page.layout().addWidget(self.installed_widget)
+        return self.installed_widget
+        
+    def restore_geometry(self):
+        """Reopen the window where it was last closed"""
+        geometry = self.config.get(WINDOW_GEOMETRY_KEY)
+        if geometry:
+            self.restoreGeometry(QByteArray.fromBase64(geometry.encode("ascii")))
+    
+    def save_geometry(self):
+        # Resizing and dragging fire many events; the config coalesces the writes
+        geometry = bytes(self.saveGeometry().toBase64()).decode("ascii")
+        self.config.set(WINDOW_GEOMETRY_KEY, geometry, debounce=True)
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.isVisible():
+            self.save_geometry()
+    
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        if self.isVisible():
+            self.save_geometry()
+    
+    def closeEvent(self, event):
+        self.watchdog.stop()
+        self.save_geometry()
+        self.config.flush()
+        super().closeEvent(event)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._prewarm_started:
+            self._prewarm_started = True
+            # Queue behind the first paint so warming never delays the window
+            QTimer.singleShot(0, self.start_prewarm)
+            # Not behind the prewarm: that includes the catalog, which can take minutes
+            QTimer.singleShot(0, self.offer_interrupted_jobs)
+    
+    def prewarm_tasks(self):
+        """Work that fills the caches before the user asks for it"""
+        tasks = [
+            ("installed", self.manager.list_installed),
+            ("upgradeable", self.manager.get_upgradeable),
+            ("favorites", self.refresh_favorites_status),
+            # Rebuilt only when older than a day
+            ("catalog", self.manager.refresh_catalog),
+        ]
+        for query in self.config.get(RECENT_SEARCHES_KEY, []):
+            tasks.append((f"search:{query}", lambda query=query: self.manager.search(query)))
+        return tasks
+    
+    def start_prewarm(self):
+        """Load inventory, upgrades and favorites status in the background"""
+        if self.prewarm_thread and self.prewarm_thread.isRunning():
+            return
+        self.statusbar.showMessage("Warming up package caches...")
+        self.prewarm_thread = PrewarmThread(self.prewarm_tasks())
+        self.prewarm_thread.prewarm_finished.connect(self.on_prewarm_finished)
+        self.prewarm_thread.start()
+    
+    def on_prewarm_finished(self):
+        self.statusbar.showMessage("Ready - Winstaller v1.0.0")
+    
+    def offer_interrupted_jobs(self):
+        """Ask whether to finish batches a crash or a closed window interrupted"""
+        from PyQt5.QtWidgets import QMessageBox
+        if self._interrupted_offered:
+            return
+        interrupted = self.journal.interrupted()
+        if not interrupted:
+            # A job that stopped less than STALE_AFTER ago still looks alive,
+            # e.g. right after a crash and a restart: look once more when
+            # its heartbeat would have gone stale
+            if not self._interrupted_recheck and self.journal.recently_active():
+                self._interrupted_recheck = True
+                QTimer.singleShot((STALE_AFTER + 1) * 1000, self.offer_interrupted_jobs)
+            return
+        self._interrupted_offered = True
+        
+        lines = []
+        for job in interrupted[:10]:
+            left = sum(1 for item in job["items"] if item["state"] in ("pending", "running"))
+            lines.append(f"• {job['operation'].capitalize()} started {job['created'][:16].replace('T', ' ')}: "
+                         f"{left} of {len(job['items'])} packages left")
+        reply = QMessageBox.question(self, "Interrupted Batch Jobs",
+                                     f"{len(interrupted)} batch job(s) did not finish last time.\n\n"
+                                     + "\n".join(lines) + "\n\nResume them now?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self._resume_queue = [job["id"] for job in interrupted]
+            self.resume_next_job()
+        else:
+            for job in interrupted:
+                self.journal.abandon(job["id"])
+    
+    def resume_next_job(self):
+        """Resume the next interrupted job, one batch at a time"""
+        from PyQt5.QtWidgets import QProgressDialog
+        
+        if not self._resume_queue:
+            return
+        job = self.journal.get(self._resume_queue.pop(0))
+        packages = [(item["name"], item["id"]) for item in job["items"] if item["state"] in ("pending", "running")]
+        operation = job["operation"]
+        progress = QProgressDialog(f"Resuming {operation}...", "Cancel", 0, len(packages), self)
+        progress.setWindowModality(Qt.WindowModal)
+        
+        batch = self.batch_jobs.resume(job["id"])
+        batch.item_started.connect(
+            lambda i, name: (progress.setValue(i), progress.setLabelText(f"Resuming {operation}: {name}...")))
+        batch.batch_finished.connect(
+            lambda successful, failed: self.on_resumed_job_finished(progress, operation, successful, failed))
+        progress.canceled.connect(batch.cancel)
+        progress.show()
+        batch.start()
+    
+    def on_resumed_job_finished(self, progress, operation, successful, failed):
+        progress.close()
+        self.refresh_favorites_in_background()
+        self.statusbar.showMessage(f"Resumed {operation}: {successful} succeeded, {failed} failed", 5000)
+        self.resume_next_job()
+    
+    def refresh_favorites_status(self):
+        """Join the (cached) inventory and upgrade records into the favorites"""
+        # Fresh fetches reach the favorites through the listener; cache hits
+        # are joined here. Unchanged rows are not re-annotated either way.
+        self.favorites_manager.update_inventory(self.manager.list_installed_records())
+        self.favorites_manager.update_upgrades(self.manager.get_upgradeable_records())
+        return self.favorites_manager.get_annotated_favorites()
+    
+    def refresh_favorites_in_background(self):
+        """Re-join favorites after installs without blocking the UI"""
+        if self.favorites_thread and self.favorites_thread.isRunning():
+            return
+        self.favorites_thread = PrewarmThread([("favorites", self.refresh_favorites_status)], max_workers=1)
+        self.favorites_thread.start()
+    
     def init_menu(self):
         """Initialize menu bar"""
         menubar = self.menuBar()
@@ -285,11 +271,38 @@ class MainWindow(QMainWindow):
         
         file_menu.addSeparator()
         
+        import_favorites_action = QAction('&Import Favorites...', self)
+        import_favorites_action.triggered.connect(self.import_favorites)
+        file_menu.addAction(import_favorites_action)
+        
+        export_favorites_action = QAction('&Export Favorites...', self)
+        export_favorites_action.triggered.connect(self.export_favorites)
+        file_menu.addAction(export_favorites_action)
+        
+        file_menu.addSeparator()
+        
         exit_action = QAction('E&xit', self)
         exit_action.setShortcut(QKeySequence.Quit)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # Favorites menu
+        favorites_menu = menubar.addMenu('F&avorites')
+        
+        favorites_status_action = QAction('Show Favorites &Status', self)
+        favorites_status_action.triggered.connect(self.show_favorites_status)
+        favorites_menu.addAction(favorites_status_action)
+        
+        favorites_menu.addSeparator()
+        
+        install_missing_action = QAction('&Install Missing Favorites', self)
+        install_missing_action.triggered.connect(self.install_missing_favorites)
+        favorites_menu.addAction(install_missing_action)
+        
+        upgrade_outdated_action = QAction('&Upgrade Outdated Favorites', self)
+        upgrade_outdated_action.triggered.connect(self.upgrade_outdated_favorites)
+        favorites_menu.addAction(upgrade_outdated_action)
+        
         # Tools menu
         tools_menu = menubar.addMenu('&Tools')
         
@@ -297,6 +310,18 @@ class MainWindow(QMainWindow):
         clear_cache_action.triggered.connect(self.clear_all_caches)
         tools_menu.addAction(clear_cache_action)
         
+        cache_stats_action = QAction('Cache &Statistics...', self)
+        cache_stats_action.triggered.connect(self.show_cache_statistics)
+        tools_menu.addAction(cache_stats_action)
+        
+        diagnostics_action = QAction('&Diagnostics...', self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        tools_menu.addAction(diagnostics_action)
+        
+        rebuild_catalog_action = QAction('&Rebuild Search Catalog', self)
+        rebuild_catalog_action.triggered.connect(self.rebuild_catalog)
+        tools_menu.addAction(rebuild_catalog_action)
+        
         # Help menu
         help_menu = menubar.addMenu('&Help')
         
@@ -313,18 +338,162 @@ class MainWindow(QMainWindow):
     def refresh_all(self):
         """Refresh all data"""
         current_tab = self.tab_widget.currentIndex()
-        if current_tab == 1:  # Installed apps tab
-            self.installed_widget.refresh_installed_apps()
+        if current_tab == INSTALLED_TAB:
+            self.ensure_installed_widget().refresh_installed_apps()
         self.statusbar.showMessage("Refreshed data", 3000)
         
+    def import_favorites(self):
+        """Merge favorites from an exported JSON file"""
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
+        path, _ = QFileDialog.getOpenFileName(self, "Import Favorites", "", "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            added = self.favorites_manager.import_favorites(path)
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "Import Failed", f"Could not import favorites: {e}")
+            return
+        self.statusbar.showMessage(f"Imported {added} new favorites", 3000)
+    
+    def export_favorites(self):
+        """Save favorites to a JSON file for use on another machine"""
+        from PyQt5.QtWidgets import QFileDialog, QMessageBox
+        path, _ = QFileDialog.getSaveFileName(self, "Export Favorites", "favorites.json", "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            self.favorites_manager.export_favorites(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Export Failed", f"Could not export favorites: {e}")
+            return
+        self.statusbar.showMessage(f"Exported favorites to {path}", 3000)
+    
+    def favorites_ready(self):
+        """True when favorites have been joined against an inventory; tells the user otherwise"""
+        if self.favorites_manager.has_inventory():
+            return True
+        self.statusbar.showMessage("Loading installed packages, try again in a moment...", 3000)
+        self.refresh_favorites_in_background()
+        return False
+    
+    def show_favorites_status(self):
+        """Summarize which favorites are installed, outdated or missing"""
+        from PyQt5.QtWidgets import QMessageBox
+        if not self.favorites_ready():
+            return
+        
+        favorites = self.favorites_manager.get_annotated_favorites()
+        if not favorites:
+            QMessageBox.information(self, "Favorites Status", "No favorites yet.")
+            return
+        
+        lines = []
+        for fav in favorites:
+            if fav["status"] == "upgrade_available":
+                lines.append(f"⬆️ {fav['app_name']} - v{fav['installed_version']} → v{fav['available_version']}")
+            elif fav["status"] == "installed":
+                lines.append(f"✅ {fav['app_name']} - v{fav['installed_version']}")
+            else:
+                lines.append(f"❌ {fav['app_name']} - not installed")
+        QMessageBox.information(self, "Favorites Status", "\n".join(lines))
+    
+    def install_missing_favorites(self):
+        """Install every favorite that is not installed, as one job"""
+        if self.favorites_ready():
+            self.run_favorites_batch("install", self.favorites_manager.missing_favorites())
+    
+    def upgrade_outdated_favorites(self):
+        """Upgrade every installed favorite with a newer version, as one job"""
+        if self.favorites_ready():
+            self.run_favorites_batch("upgrade", self.favorites_manager.outdated_favorites())
+    
+    def run_favorites_batch(self, operation, favorites):
+        """Confirm and run a batched install/upgrade of favorites in the background"""
+        from PyQt5.QtWidgets import QMessageBox, QProgressDialog
+        
+        if not favorites:
+            QMessageBox.information(self, "Favorites", f"No favorites need to {operation}.")
+            return
+        
+        names = "\n".join(f"• {fav['app_name']}" for fav in favorites[:10])
+        if len(favorites) > 10:
+            names += f"\n... and {len(favorites) - 10} more"
+        reply = QMessageBox.question(self, f"{operation.capitalize()} Favorites",
+                                     f"{operation.capitalize()} {len(favorites)} favorites?\n\n{names}",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        
+        verb = "Installing" if operation == "install" else "Upgrading"
+        progress = QProgressDialog(f"{verb} favorites...", "Cancel", 0, len(favorites), self)
+        progress.setWindowModality(Qt.WindowModal)
+        
+        packages = [(fav["app_name"], fav["package_id"]) for fav in favorites]
+        batch = self.batch_jobs.submit(operation, packages)
+        batch.item_started.connect(
+            lambda i, name: (progress.setValue(i), progress.setLabelText(f"{verb} {name}...")))
+        batch.batch_finished.connect(
+            lambda successful, failed: self.on_favorites_batch_finished(progress, operation, successful, failed))
+        progress.canceled.connect(batch.cancel)
+        progress.show()
+        batch.start()
+    
+    def on_favorites_batch_finished(self, progress, operation, successful, failed):
+        from PyQt5.QtWidgets import QMessageBox
+        progress.close()
+        # Installs invalidated the inventory caches; re-join off the UI thread
+        self.refresh_favorites_in_background()
+        QMessageBox.information(self, "Favorites",
+                                f"Batch {operation} completed!\n\nSuccessful: {successful}\nFailed: {failed}")
+    
     def clear_all_caches(self):
         """Clear all application caches"""
         self.manager.clear_all_caches()
         self.statusbar.showMessage("All caches cleared", 3000)
         
+    def rebuild_catalog(self):
+        """Download a fresh package catalog for instant search, in the background"""
+        if self.catalog_thread and self.catalog_thread.isRunning():
+            return
+        self.statusbar.showMessage("Rebuilding search catalog...")
+        self.catalog_thread = PrewarmThread([("catalog", lambda: self.manager.refresh_catalog(force=True))],
+                                            max_workers=1)
+        self.catalog_thread.task_finished.connect(
+            lambda name, count: self.statusbar.showMessage(f"Search catalog has {count} packages", 5000))
+        self.catalog_thread.start()
+    
+    def show_cache_statistics(self):
+        """Show how many lookups each operation answered from the cache"""
+        from PyQt5.QtWidgets import QMessageBox
+        stats = self.manager.cache.stats.snapshot()
+        if not stats:
+            QMessageBox.information(self, "Cache Statistics", "No cache lookups yet.")
+            return
+        
+        lines = []
+        for operation, counts in sorted(stats.items()):
+            lines.append(f"{operation}: {counts['hit_rate']:.0f}% answered from cache "
+                         f"({counts['total']} lookups)")
+            lines.append(f"    hits {counts['hit']}, empty results {counts['negative_hit']}, "
+                         f"error backoffs {counts['error_backoff']}, misses {counts['miss']}")
+        
+        ttls = self.manager.cache_policy.current_ttls()
+        if ttls:
+            lines.append("")
+            lines.append("Current TTLs:")
+            for key, ttl in sorted(ttls.items()):
+                lines.append(f"    {key}: {ttl:.0f}s")
+        QMessageBox.information(self, "Cache Statistics", "\n".join(lines))
+    
+    def show_diagnostics(self):
+        """Show where time went: winget runs, parsing, cache I/O, list population and UI stalls"""
+        from dialogs import DiagnosticsDialog
+        from metrics import metrics
+        DiagnosticsDialog(metrics, self.manager.cache.stats, self.watchdog, self).exec_()
+    
     def cleanup_cache(self):
         """Periodic cache cleanup"""
-        self.manager.cache.clear_expired_cache()
+        self.manager.cache.clear_expired_cache(stale_max_age=self.manager.cache_policy.stale_max_age())
         
     def show_about(self):
         """Show about dialog"""
@@ -0,0 +1,122 @@
+"""In-process timing histograms and counters for diagnostics
+
+Durations are kept in fixed log-scale buckets (each bound twice the last,
+from 0.0625 ms to about 8.7 minutes), so recording a sample is a bisect and
+a few additions and memory stays constant however long the app runs.
+
+Names are dotted, e.g. "winget.installed.spawn" or "ui.populate.search".
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict
+
+# Upper bounds of the histogram buckets in milliseconds; the last bucket is open
+BUCKET_BOUNDS_MS = tuple(0.0625 * 2 ** i for i in range(24))
+
+
+class Histogram:
+    """Count, sum, min, max and log-scale bucket counts of durations in ms"""
+    __slots__ = ("count", "total", "minimum", "maximum", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def record(self, value_ms: float):
+        self.count += 1
+        self.total += value_ms
+        if self.minimum is None or value_ms < self.minimum:
+            self.minimum = value_ms
+        if self.maximum is None or value_ms > self.maximum:
+            self.maximum = value_ms
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                bound = BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.maximum
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.minimum or 0.0, 3),
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.maximum or 0.0, 3),
+            "buckets": {f"{BUCKET_BOUNDS_MS[i]:g}" if i < len(BUCKET_BOUNDS_MS) else "inf": n
+                        for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Metrics:
+    """Named duration histograms and counters, safe to use from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self.started = time.time()
+
+    def observe(self, name: str, value_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(value_ms)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str):
+        """Record how long the block took under name, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "uptime_s": round(time.time() - self.started, 1),
+                "timings": {name: histogram.summary() for name, histogram in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self.started = time.time()
+
+    def export(self, path: str, extra: Dict = None):
+        """Write a snapshot, plus any extra sections, as JSON"""
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+
+# Shared by every manager and widget in the process
+metrics = Metrics()
@@ -0,0 +1,215 @@
+"""Opt-in profiling of hot code paths in the packaged app
+
+Turned on with WINSTALLER_PROFILE (or --profile on the command line) set to
+a comma-separated list of scopes, or "all":
+
+    parse     - winget output parsing
+    cache     - cache reads and writes
+    populate  - filling result lists
+    batch     - each package of a batch install/uninstall/upgrade job
+
+WINSTALLER_PROFILE_MODE picks the profiler: "cprofile" (default) keeps a
+profiler per scope and thread, since cProfile only sees the thread that
+enabled it, and writes them merged as one <scope>-<timestamp>-<pid>.prof per
+scope, readable with pstats, snakeviz or gprof2dot; "sample" samples the stacks of threads inside a scope every
+few milliseconds and writes <scope>-<timestamp>-<pid>.collapsed, the
+folded-stack format of flamegraph.pl and speedscope. Files go to
+WINSTALLER_PROFILE_DIR, by default a "profiles" folder in the state
+directory, and are written when the app exits.
+
+The hooks are decorators that are resolved at import time: with a scope
+switched off, @profiled(scope) returns the function itself, so there is no
+overhead at all. Configuration therefore has to happen before the
+application modules are imported (main.py does this first).
+"""
+
+import atexit
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_ENV = "WINSTALLER_PROFILE"
+PROFILE_MODE_ENV = "WINSTALLER_PROFILE_MODE"
+PROFILE_DIR_ENV = "WINSTALLER_PROFILE_DIR"
+SCOPES = ("parse", "cache", "populate", "batch")
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+_enabled = set()
+_mode = "cprofile"
+_profilers = {}  # (scope, thread id) -> cProfile.Profile, accumulated over every call
+_samples = {}  # scope -> Counter of folded stacks
+_active = {}  # thread id -> scope, for the sampler
+# Whether this thread's profiler is on; nested scopes are attributed to the outer one
+_profiling = threading.local()
+_profile_lock = threading.Lock()
+_sampler = None
+_started = time.strftime("%Y%m%d-%H%M%S")
+
+
+def configure(scopes=None, mode=None):
+    """Enable scopes ("all" or a comma-separated list), from the environment by default"""
+    global _mode
+    if scopes is None:
+        scopes = os.environ.get(PROFILE_ENV, "")
+    if mode is None:
+        mode = os.environ.get(PROFILE_MODE_ENV, "cprofile")
+    names = {name.strip().lower() for name in scopes.split(",") if name.strip()}
+    if "all" in names:
+        names = set(SCOPES)
+    unknown = names - set(SCOPES)
+    if unknown:
+        print(f"Unknown profiling scopes ignored: {', '.join(sorted(unknown))}")
+    _enabled.clear()
+    _enabled.update(names & set(SCOPES))
+    _mode = "sample" if mode == "sample" else "cprofile"
+    if _enabled:
+        print(f"Profiling {', '.join(sorted(_enabled))} ({_mode}); profiles go to {profile_dir()}")
+
+
+def configure_from_args(argv):
+    """Handle --profile SCOPES / --profile=SCOPES, removing it from argv"""
+    for i, arg in enumerate(list(argv)):
+        if arg == "--profile" and i + 1 < len(argv):
+            os.environ[PROFILE_ENV] = argv[i + 1]
+            del argv[i:i + 2]
+            break
+        if arg.startswith("--profile="):
+            os.environ[PROFILE_ENV] = arg.split("=", 1)[1]
+            del argv[i]
+            break
+    configure()
+
+
+def is_enabled(scope):
+    return scope in _enabled
+
+
+def profile_dir():
+    directory = os.environ.get(PROFILE_DIR_ENV)
+    if not directory:
+        from state_store import default_state_dir
+        directory = os.path.join(default_state_dir(), "profiles")
+    return directory
+
+
+def profiled(scope):
+    """Decorator profiling calls under scope; a no-op unless the scope is enabled"""
+    def decorate(function):
+        if scope not in _enabled:
+            return function
+        if _mode == "sample":
+            return _sampled(scope, function)
+        return _cprofiled(scope, function)
+    return decorate
+
+
+def _cprofiled(scope, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if getattr(_profiling, "active", False):
+            return function(*args, **kwargs)
+        key = (scope, threading.get_ident())
+        with _profile_lock:
+            profiler = _profilers.get(key)
+            if profiler is None:
+                profiler = _profilers[key] = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; run unprofiled
+            return function(*args, **kwargs)
+        _profiling.active = True
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.disable()
+            _profiling.active = False
+    return wrapper
+
+
+def _sampled(scope, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        thread_id = threading.get_ident()
+        if thread_id in _active:
+            return function(*args, **kwargs)  # attributed to the outer scope
+        _start_sampler()
+        _active[thread_id] = scope
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _active.pop(thread_id, None)
+    return wrapper
+
+
+def _start_sampler():
+    global _sampler
+    with _profile_lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="profile-sampler", daemon=True)
+            _sampler.start()
+
+
+def _sample_loop():
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        if not _active:
+            continue
+        frames = sys._current_frames()
+        for thread_id, scope in list(_active.items()):
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(scope)
+            _samples.setdefault(scope, Counter())[";".join(reversed(stack))] += 1
+
+
+def write_profiles():
+    """Write what has been collected so far; returns the paths written"""
+    if not _profilers and not _samples:
+        return []
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    merged = {}
+    for (scope, _), profiler in list(_profilers.items()):
+        try:
+            if scope in merged:
+                merged[scope].add(profiler)
+            else:
+                merged[scope] = pstats.Stats(profiler)
+        except TypeError:
+            pass  # nothing recorded by this one
+    for scope, stats in merged.items():
+        path = os.path.join(directory, f"{scope}-{_started}-{os.getpid()}.prof")
+        stats.dump_stats(path)
+        written.append(path)
+    for scope, counts in list(_samples.items()):
+        path = os.path.join(directory, f"{scope}-{_started}-{os.getpid()}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        written.append(path)
+    return written
+
+
+def _write_at_exit():
+    try:
+        for path in write_profiles():
+            print(f"Wrote profile {path}")
+    except OSError as e:
+        print(f"Could not write profiles: {e}")
+
+
+configure()
+atexit.register(_write_at_exit)
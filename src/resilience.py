@@ -0,0 +1,234 @@
+"""Retries with backoff and per-source circuit breakers for winget runs
+
+A failed winget run is classified from its exit code and output:
+
+- network: a source or download could not be reached (winget's download
+  and source errors, WinINet/WinHTTP errors, HTTP 429/5xx). Retried, and
+  counted against the source.
+- busy: another installer holds the Windows Installer lock (MSI 1618).
+  Retried; nothing is wrong with the source.
+- timeout: winget was killed at its timeout. Counted against the source but
+  not retried, since one timeout already used the caller's whole budget.
+- permanent: anything else, e.g. no package found or a hash mismatch. The
+  source answered, so this counts as a success for the breaker.
+
+Retries wait with jittered exponential backoff. After failure_threshold
+consecutive failures a source's breaker opens and runs against it fail at
+once, without starting winget, so callers fall back to stale cached data.
+After reset_after seconds one probe run is let through; if it fails the
+breaker stays open for twice as long, up to MAX_RESET_AFTER. A command
+that searches every source needs all of them, so it fails at once while
+any source's breaker is open, and its success closes them all.
+
+Everything is overridable through the "resilience" config key, e.g.
+{"attempts": 5, "base_delay": 2, "failure_threshold": 5}.
+"""
+
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from metrics import metrics
+
+RESILIENCE_KEY = "resilience"
+DEFAULTS = {
+    "attempts": 3,  # runs per call, including the first
+    "base_delay": 1.0,  # seconds before the first retry, doubled each time
+    "max_delay": 15.0,
+    "failure_threshold": 5,
+    "reset_after": 60.0,
+}
+MAX_RESET_AFTER = 600
+
+FAILURE_NETWORK = "network"
+FAILURE_BUSY = "busy"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_PERMANENT = "permanent"
+
+NETWORK_ERROR_CODES = {
+    0x8A150008,  # APPINSTALLER_CLI_ERROR_DOWNLOAD_FAILED
+    0x8A15000F,  # APPINSTALLER_CLI_ERROR_SOURCE_DATA_MISSING
+    0x80072EE2,  # timeout
+    0x80072EE7,  # name not resolved
+    0x80072EFD,  # cannot connect
+    0x80072EFE,  # connection aborted
+    0x80072EFF,  # connection reset
+    0x80072F78,  # invalid server response
+    0x801901AD,  # HTTP 429
+    0x801901F4,  # HTTP 500
+    0x801901F6,  # HTTP 502
+    0x801901F7,  # HTTP 503
+    0x801901F8,  # HTTP 504
+}
+BUSY_ERROR_CODES = {
+    1618,  # ERROR_INSTALL_ALREADY_RUNNING
+    0x80070652,  # the same, as an HRESULT
+    0x8A150102,  # APPINSTALLER_CLI_ERROR_INSTALL_INSTALL_IN_PROGRESS
+}
+
+# winget prints the HRESULT under "An unexpected error occurred ..."; POSIX
+# exit statuses keep only the low byte, so the output is checked as well
+_HRESULT_PATTERN = re.compile(r"\b0x([0-9a-fA-F]{8})\b")
+_FAILED_SOURCE_PATTERN = re.compile(r"Failed when searching source:\s*(\S+)", re.IGNORECASE)
+
+# Operations that reach a source; the rest are local and have no breaker
+SOURCE_OPERATIONS = {"search", "search_source", "catalog", "show", "upgradeable", "install", "upgrade"}
+# Safe to run twice
+QUERY_OPERATIONS = {"search", "search_source", "sources", "catalog", "show", "installed", "upgradeable"}
+# Package changes: only retried when the failure happened before anything changed
+MUTATING_OPERATIONS = {"install", "upgrade", "uninstall"}
+# Key of the breaker for commands that search every configured source
+ALL_SOURCES = "all sources"
+
+
+class CircuitOpenError(OSError):
+    """A source's breaker is open, so winget was not started"""
+
+
+def classify_failure(returncode: Optional[int], output: str = "") -> Optional[str]:
+    """FAILURE_* for a winget run, None when it succeeded; returncode None means it timed out"""
+    if returncode is None:
+        return FAILURE_TIMEOUT
+    if returncode == 0:
+        return None
+    codes = {returncode & 0xFFFFFFFF}
+    codes.update(int(match, 16) for match in _HRESULT_PATTERN.findall(output or ""))
+    if codes & BUSY_ERROR_CODES:
+        return FAILURE_BUSY
+    if codes & NETWORK_ERROR_CODES or _FAILED_SOURCE_PATTERN.search(output or ""):
+        return FAILURE_NETWORK
+    return FAILURE_PERMANENT
+
+
+def command_source(cmd: List[str]) -> str:
+    """The source a winget command is limited to, or ALL_SOURCES"""
+    for i, arg in enumerate(cmd[:-1]):
+        if arg in ("--source", "-s"):
+            return cmd[i + 1]
+    return ALL_SOURCES
+
+
+def failed_sources(output: str) -> List[str]:
+    """Sources winget reported as failing in its output"""
+    return _FAILED_SOURCE_PATTERN.findall(output or "")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breakers, one per source"""
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._sources = {}  # source -> {"failures", "opened", "open_for"}
+
+    def allow(self, source: str) -> bool:
+        """Whether a run against the source may start"""
+        return not self.blocking([source])
+
+    def blocking(self, sources: List[str]) -> List[str]:
+        """The sources whose open breaker keeps a run needing all of them from starting"""
+        with self._lock:
+            now = time.monotonic()
+            opened = {source: state for source, state in self._sources.items()
+                      if source in sources and state["opened"] is not None}
+            blocked = [source for source, state in opened.items() if now - state["opened"] < state["open_for"]]
+            if not blocked:
+                # Half-open: this caller probes; the others keep failing fast
+                # until it reports back or another open_for has passed
+                for state in opened.values():
+                    state["opened"] = now
+            return blocked
+
+    def sources(self) -> List[str]:
+        """Sources with recent failures"""
+        with self._lock:
+            return list(self._sources)
+
+    def record_success(self, source: str):
+        with self._lock:
+            state = self._sources.pop(source, None)
+        if state is not None and state["opened"] is not None:
+            metrics.increment("winget.circuit.closed")
+
+    def record_failure(self, source: str):
+        with self._lock:
+            state = self._sources.setdefault(source, {"failures": 0, "opened": None, "open_for": self.reset_after})
+            state["failures"] += 1
+            if state["opened"] is not None:
+                # The probe failed
+                state["open_for"] = min(state["open_for"] * 2, MAX_RESET_AFTER)
+            elif state["failures"] < self.threshold:
+                return
+            state["opened"] = time.monotonic()
+        metrics.increment("winget.circuit.opened")
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Sources with recent failures: failures, open and seconds until the next probe"""
+        now = time.monotonic()
+        with self._lock:
+            return {source: {"failures": state["failures"],
+                             "open": state["opened"] is not None,
+                             "retry_in": max(0.0, round(state["opened"] + state["open_for"] - now, 1))
+                             if state["opened"] is not None else 0.0}
+                    for source, state in self._sources.items()}
+
+
+class Resilience:
+    """Retry policy and breakers for one WingetManager"""
+
+    def __init__(self, config=None):
+        self.config = config
+        settings = self.settings()
+        self.breaker = CircuitBreaker(settings["failure_threshold"], settings["reset_after"])
+
+    def settings(self) -> Dict:
+        overrides = self.config.get(RESILIENCE_KEY, {}) if self.config else {}
+        return dict(DEFAULTS, **overrides)
+
+    @staticmethod
+    def retryable(operation: str, failure: Optional[str]) -> bool:
+        if failure == FAILURE_BUSY:
+            return operation in MUTATING_OPERATIONS
+        if failure == FAILURE_NETWORK:
+            return operation in QUERY_OPERATIONS or operation in MUTATING_OPERATIONS
+        return False
+
+    def delay(self, retry: int) -> float:
+        """Seconds to wait before retry number `retry` (0-based): half fixed, half random"""
+        settings = self.settings()
+        ceiling = min(settings["max_delay"], settings["base_delay"] * 2 ** retry)
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def attempts(self) -> int:
+        return max(1, int(self.settings()["attempts"]))
+
+    def covered_sources(self, source: str) -> List[str]:
+        """Breakers a run against source depends on: ALL_SOURCES covers every source"""
+        if source != ALL_SOURCES:
+            return [source]
+        return [ALL_SOURCES] + [name for name in self.breaker.sources() if name != ALL_SOURCES]
+
+    def before_run(self, operation: str, source: str):
+        """Raise CircuitOpenError when the breaker of the source, or of any source it covers, is open"""
+        if operation not in SOURCE_OPERATIONS:
+            return
+        blocked = self.breaker.blocking(self.covered_sources(source))
+        if blocked:
+            metrics.increment(f"winget.{operation}.circuit_open")
+            raise CircuitOpenError(f"winget source {', '.join(blocked)} is unavailable, retrying later")
+
+    def after_run(self, operation: str, source: str, failure: Optional[str], output: str = ""):
+        """Feed a run's outcome to the breakers"""
+        if operation not in SOURCE_OPERATIONS:
+            return
+        if failure in (FAILURE_NETWORK, FAILURE_TIMEOUT):
+            # A search over every source that names the failing one only
+            # counts against that one
+            for name in set(failed_sources(output)) or [source]:
+                self.breaker.record_failure(name)
+        elif failure != FAILURE_BUSY:
+            for name in self.covered_sources(source):
+                self.breaker.record_success(name)
@@ -0,0 +1,387 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+STATE_DB_NAME = "winstaller.db"
+# How long a writer waits for another process's transaction to finish
+BUSY_TIMEOUT_SECONDS = 10
+
+# Files written by older versions next to wherever the app was launched from,
+# normally the application folder
+LEGACY_CONFIG_FILE = "config.json"
+LEGACY_CACHE_FILE = "app_cache.json"
+LEGACY_FAVORITES_FILE = "favorites.json"
+LEGACY_HISTORY_FILE = "installation_history.json"
+LEGACY_HISTORY_LOG = "installation_history.jsonl"
+LEGACY_HISTORY_SIDECARS = (".idx", ".packages", ".stats.json")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# meta flag: the legacy files have been looked for once
+LEGACY_MIGRATED_KEY = "legacy_migrated"
+
+SCHEMA_V1 = """
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS favorites (
+    package_id TEXT PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    added_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    status TEXT NOT NULL,
+    app_name TEXT NOT NULL DEFAULT '',
+    package_id TEXT NOT NULL DEFAULT '',
+    version TEXT,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS history_day ON history (day);
+CREATE INDEX IF NOT EXISTS history_package ON history (package_id);
+CREATE INDEX IF NOT EXISTS history_action_status ON history (action, status);
+CREATE TABLE IF NOT EXISTS history_stats (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+# Cache rows carry the generation of the write that produced them, and
+# deletes leave tombstones (data IS NULL), so another process can find every
+# key that changed since the generation it last saw.
+SCHEMA_V2 = """
+DROP TABLE IF EXISTS cache;
+CREATE TABLE cache (
+    key TEXT PRIMARY KEY,
+    data TEXT,
+    timestamp REAL NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX cache_generation ON cache (generation);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('cache_generation', 0);
+"""
+
+# TTL chosen by the cache policy when the entry was written; NULL means the
+# reader's default applies
+SCHEMA_V3 = """
+ALTER TABLE cache ADD COLUMN ttl REAL;
+"""
+
+# Journal of batch jobs, see job_journal.py. Item states are written as each
+# package starts and finishes, so an interrupted batch can be resumed.
+SCHEMA_V4 = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created TEXT NOT NULL,
+    finished TEXT,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id INTEGER NOT NULL REFERENCES jobs (id),
+    position INTEGER NOT NULL,
+    app_name TEXT NOT NULL,
+    package_id TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    seconds REAL,
+    PRIMARY KEY (job_id, position),
+    UNIQUE (job_id, package_id)
+);
+"""
+
+# Case-insensitive package prefix filters (LIKE 'x%') can only use an index
+# with the same collation
+SCHEMA_V5 = """
+CREATE INDEX IF NOT EXISTS history_package_nocase ON history (package_id COLLATE NOCASE);
+"""
+
+# Applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = (SCHEMA_V1, SCHEMA_V2, SCHEMA_V3, SCHEMA_V4, SCHEMA_V5)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def default_state_dir():
+    """Per-user directory for Winstaller's state
+
+    WINSTALLER_HOME overrides it; otherwise %LOCALAPPDATA%\\Winstaller on
+    Windows and $XDG_DATA_HOME/winstaller (~/.local/share/winstaller) elsewhere.
+    """
+    override = os.environ.get("WINSTALLER_HOME")
+    if override:
+        return override
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        return os.path.join(os.environ["LOCALAPPDATA"], "Winstaller")
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(data_home, "winstaller")
+
+
+def legacy_dirs():
+    """Where older versions kept their files: the application folder, or the executable's when frozen"""
+    if getattr(sys, "frozen", False):
+        return [os.path.dirname(os.path.abspath(sys.executable))]
+    return [APP_DIR]
+
+
+def _list_of_dicts(value):
+    return isinstance(value, list) and all(isinstance(item, dict) for item in value)
+
+
+def check_legacy_data(name, data):
+    """Raise ValueError unless data has the shape of the legacy file `name`
+
+    A file that merely has the right name, e.g. some other program's
+    config.json, is neither imported nor set aside.
+    """
+    if name == LEGACY_CONFIG_FILE:
+        valid = isinstance(data, dict)
+    elif name == LEGACY_CACHE_FILE:
+        valid = isinstance(data, dict) and all(
+            isinstance(item, dict) and "data" in item and "timestamp" in item for item in data.values())
+    elif name == LEGACY_FAVORITES_FILE:
+        favorites = data.get("favorites") if isinstance(data, dict) else None
+        valid = _list_of_dicts(favorites) and all(fav.get("package_id") for fav in favorites)
+    elif name == LEGACY_HISTORY_FILE:
+        valid = (isinstance(data, dict) and ("installations" in data or "uninstallations" in data)
+                 and _list_of_dicts(data.get("installations", []))
+                 and _list_of_dicts(data.get("uninstallations", [])))
+    else:  # LEGACY_HISTORY_LOG, one entry per line
+        valid = _list_of_dicts(data) and all("action" in entry and "date" in entry for entry in data)
+    if not valid:
+        raise ValueError(f"not a Winstaller {name}")
+
+
+def _day_of(date_text):
+    """Day ordinal for an ISO timestamp, 0 if it can't be parsed"""
+    try:
+        return datetime.fromisoformat(date_text).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def history_row(entry):
+    """Column values for a history entry dict, in table order"""
+    duration = entry.get("duration")
+    return (
+        entry.get("date") or "",
+        _day_of(entry.get("date")),
+        entry.get("action") or "unknown",
+        entry.get("status") or "unknown",
+        entry.get("app_name") or "",
+        entry.get("package_id") or "",
+        entry.get("version"),
+        duration if isinstance(duration, (int, float)) else None
+    )
+
+
+INSERT_HISTORY = ("INSERT INTO history (date, day, action, status, app_name, package_id, version, duration) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+class StateStore:
+    """One SQLite database holding config, cache, favorites and history
+
+    A single connection is shared by every manager and thread; calls are
+    serialized with a lock. transaction() groups writes to several tables
+    into one atomic commit.
+    """
+
+    def __init__(self, path=None, migrate=True):
+        if path is None:
+            state_dir = default_state_dir()
+            os.makedirs(state_dir, exist_ok=True)
+            path = os.path.join(state_dir, STATE_DB_NAME)
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        # Transactions are issued explicitly, see transaction()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        if migrate:
+            self.migrate_legacy_files()
+
+    def _create_schema(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for number in range(version, SCHEMA_VERSION):
+                self._conn.executescript(
+                    "BEGIN IMMEDIATE;" + MIGRATIONS[number] + f"PRAGMA user_version = {number + 1}; COMMIT;")
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything in the block at once, or nothing if it raises
+
+        Nested blocks join the outermost transaction.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def execute(self, sql, params=()):
+        """Run a statement and return the number of changed rows"""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def executemany(self, sql, rows):
+        with self._lock:
+            return self._conn.executemany(sql, rows).rowcount
+
+    def query(self, sql, params=()):
+        """Run a query and return all rows"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Run a query and return the first row, or None"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def data_version(self):
+        """Changes whenever another connection (another process) commits"""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def next_generation(self, name):
+        """Bump and return a counter in the meta table; call inside transaction()"""
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES (?, 0)", (name,))
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (name,))
+            return self._conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def migrate_legacy_files(self, directories=None):
+        """Import state files left by older versions, then set them aside
+
+        Looks in the application folder (see legacy_dirs), never the working
+        directory, and only once per store: the LEGACY_MIGRATED_KEY meta flag
+        is set whether or not anything was found. Files that don't have the
+        shape of a Winstaller file are left alone. Existing keys in the store
+        win over imported ones. Everything found is imported in one
+        transaction; the files are renamed to *.bak after the commit.
+        """
+        if self.query_one("SELECT value FROM meta WHERE key = ?", (LEGACY_MIGRATED_KEY,)):
+            return []
+        if directories is None:
+            directories = legacy_dirs()
+        seen = set()
+        found = []
+        for directory in directories:
+            real = os.path.realpath(directory)
+            if real in seen:
+                continue
+            seen.add(real)
+            for name in (LEGACY_CONFIG_FILE, LEGACY_CACHE_FILE, LEGACY_FAVORITES_FILE,
+                         LEGACY_HISTORY_FILE, LEGACY_HISTORY_LOG):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path):
+                    found.append((name, path))
+        imported = []
+        with self.transaction():
+            self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, 1)", (LEGACY_MIGRATED_KEY,))
+            for name, path in found:
+                try:
+                    self._import_legacy_file(name, path)
+                    imported.append(path)
+                except (OSError, ValueError, TypeError, AttributeError) as e:
+                    print(f"Error migrating {path}: {e}")
+
+        for path in imported:
+            try:
+                os.replace(path, path + ".bak")
+                if path.endswith(LEGACY_HISTORY_LOG):
+                    base = os.path.splitext(path)[0]
+                    for suffix in LEGACY_HISTORY_SIDECARS:
+                        if os.path.exists(base + suffix):
+                            os.remove(base + suffix)
+            except OSError as e:
+                print(f"Error setting aside {path}: {e}")
+        return imported
+
+    def _import_legacy_file(self, name, path):
+        if name == LEGACY_HISTORY_LOG:
+            entries = []
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final line
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+            check_legacy_data(name, entries)
+            self._conn.executemany(INSERT_HISTORY, (history_row(entry) for entry in entries))
+            return
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        check_legacy_data(name, data)
+
+        if name == LEGACY_CONFIG_FILE:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)",
+                ((key, json.dumps(value, ensure_ascii=False)) for key, value in data.items()))
+        elif name == LEGACY_CACHE_FILE:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache (key, data, timestamp) VALUES (?, ?, ?)",
+                ((key, json.dumps(item.get("data"), ensure_ascii=False), item.get("timestamp", 0))
+                 for key, item in data.items() if isinstance(item, dict)))
+        elif name == LEGACY_FAVORITES_FILE:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO favorites (package_id, app_name, description, added_date) VALUES (?, ?, ?, ?)",
+                ((fav["package_id"], fav.get("app_name", fav["package_id"]), fav.get("description", ""),
+                  fav.get("added_date", "")) for fav in data.get("favorites", []) if fav.get("package_id")))
+        elif name == LEGACY_HISTORY_FILE:
+            entries = data.get("installations", []) + data.get("uninstallations", [])
+            entries.sort(key=lambda entry: entry.get("date", ""))
+            self._conn.executemany(INSERT_HISTORY, (history_row(entry) for entry in entries))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store():
+    """The per-user store shared by all managers in this process"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = StateStore()
+        return _default_store
@@ -0,0 +1,472 @@
+"""Application-wide Qt style sheet.
+
+Everything is applied once through QApplication.setStyleSheet so Qt parses a
+single sheet at startup instead of one per widget. Widgets opt into the
+specific rules below through their objectName or the "variant"/"size"
+dynamic properties.
+"""
+
+APP_STYLESHEET = """
+QMainWindow {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #fafbfc, stop: 1 #f2f4f8);
+    color: #1f2937;
+}
+
+/* Modern Tab Widget */
+QTabWidget::pane {
+    border: none;
+    background-color: rgba(255, 255, 255, 0.9);
+    border-radius: 12px;
+    margin-top: 0px;
+}
+
+QTabWidget::tab-bar {
+    alignment: center;
+    background-color: transparent;
+}
+
+QTabBar::tab {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(255, 255, 255, 0.8), stop: 1 rgba(248, 250, 252, 0.8));
+    border: 1px solid rgba(209, 213, 219, 0.4);
+    border-bottom: none;
+    padding: 12px 24px;
+    margin-right: 4px;
+    border-top-left-radius: 8px;
+    border-top-right-radius: 8px;
+    font-weight: 600;
+    font-size: 13px;
+    color: #6b7280;
+    min-width: 120px;
+}
+
+QTabBar::tab:selected {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #ffffff, stop: 1 #f8fafc);
+    color: #1f2937;
+    border-color: rgba(59, 130, 246, 0.3);
+    border-bottom: 2px solid #3b82f6;
+}
+
+QTabBar::tab:hover:!selected {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(255, 255, 255, 0.95), stop: 1 rgba(243, 244, 246, 0.95));
+    color: #374151;
+}
+
+/* Premium Buttons */
+QPushButton {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #3b82f6, stop: 1 #1d4ed8);
+    color: white;
+    border: none;
+    padding: 10px 20px;
+    border-radius: 8px;
+    font-weight: 600;
+    font-size: 13px;
+    min-height: 20px;
+}
+
+QPushButton:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #2563eb, stop: 1 #1e40af);
+}
+
+QPushButton:pressed {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #1d4ed8, stop: 1 #1e3a8a);
+}
+
+QPushButton:disabled {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #e5e7eb, stop: 1 #d1d5db);
+    color: #9ca3af;
+}
+
+/* Modern Text Inputs */
+QLineEdit {
+    background-color: rgba(255, 255, 255, 0.9);
+    border: 2px solid rgba(209, 213, 219, 0.6);
+    border-radius: 10px;
+    padding: 12px 16px;
+    font-size: 14px;
+    color: #1f2937;
+    selection-background-color: #3b82f6;
+}
+
+QLineEdit:focus {
+    border-color: #3b82f6;
+    background-color: #ffffff;
+}
+
+QLineEdit:hover {
+    border-color: rgba(59, 130, 246, 0.4);
+}
+
+/* Premium List Widgets */
+QListWidget {
+    background-color: rgba(255, 255, 255, 0.95);
+    border: 1px solid rgba(209, 213, 219, 0.3);
+    border-radius: 12px;
+    padding: 8px;
+    font-size: 14px;
+    outline: none;
+    alternate-background-color: rgba(248, 250, 252, 0.5);
+}
+
+QListWidget::item {
+    padding: 16px;
+    margin: 4px;
+    border-radius: 8px;
+    background-color: transparent;
+    border: 1px solid transparent;
+}
+
+QListWidget::item:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(59, 130, 246, 0.08), stop: 1 rgba(59, 130, 246, 0.04));
+    border-color: rgba(59, 130, 246, 0.2);
+}
+
+QListWidget::item:selected {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(59, 130, 246, 0.15), stop: 1 rgba(59, 130, 246, 0.08));
+    border-color: rgba(59, 130, 246, 0.3);
+    color: #1f2937;
+}
+
+/* Progress Bars */
+QProgressBar {
+    background-color: rgba(229, 231, 235, 0.8);
+    border: none;
+    border-radius: 6px;
+    height: 12px;
+    text-align: center;
+}
+
+QProgressBar::chunk {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+        stop: 0 #3b82f6, stop: 1 #1d4ed8);
+    border-radius: 6px;
+}
+
+/* Labels */
+QLabel {
+    color: #374151;
+    font-size: 14px;
+}
+
+/* Scrollbars */
+QScrollBar:vertical {
+    background-color: rgba(243, 244, 246, 0.5);
+    width: 12px;
+    border-radius: 6px;
+    margin: 0px;
+}
+
+QScrollBar::handle:vertical {
+    background-color: rgba(156, 163, 175, 0.6);
+    border-radius: 6px;
+    min-height: 20px;
+    margin: 2px;
+}
+
+QScrollBar::handle:vertical:hover {
+    background-color: rgba(107, 114, 128, 0.8);
+}
+
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    height: 0px;
+}
+
+QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
+    background: none;
+}
+
+/* Status Bar */
+QStatusBar {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(255, 255, 255, 0.9), stop: 1 rgba(243, 244, 246, 0.9));
+    border-top: 1px solid rgba(209, 213, 219, 0.3);
+    padding: 4px 12px;
+    color: #6b7280;
+    font-size: 12px;
+}
+
+/* Menu Bar */
+QMenuBar {
+    background-color: rgba(255, 255, 255, 0.95);
+    border-bottom: 1px solid rgba(209, 213, 219, 0.3);
+    padding: 4px 8px;
+    font-size: 13px;
+    color: #374151;
+}
+
+QMenuBar::item {
+    padding: 6px 12px;
+    border-radius: 6px;
+    margin: 2px;
+}
+
+QMenuBar::item:selected {
+    background-color: rgba(59, 130, 246, 0.1);
+}
+
+QMenu {
+    background-color: rgba(255, 255, 255, 0.98);
+    border: 1px solid rgba(209, 213, 219, 0.4);
+    border-radius: 8px;
+    padding: 4px;
+    color: #374151;
+}
+
+QMenu::item {
+    padding: 8px 16px;
+    border-radius: 4px;
+    margin: 1px;
+}
+
+QMenu::item:selected {
+    background-color: rgba(59, 130, 246, 0.1);
+}
+
+/* Discover tab */
+QWidget#searchCard {
+    background-color: rgba(255, 255, 255, 0.9);
+    border-radius: 12px;
+    padding: 16px;
+}
+
+QProgressBar#searchProgress, QProgressBar#loadProgress {
+    background-color: rgba(229, 231, 235, 0.8);
+    border: none;
+    border-radius: 6px;
+    height: 8px;
+}
+
+QProgressBar#searchProgress::chunk {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+        stop: 0 #3b82f6, stop: 1 #1d4ed8);
+    border-radius: 6px;
+}
+
+QProgressBar#loadProgress::chunk {
+    background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
+        stop: 0 #10b981, stop: 1 #059669);
+    border-radius: 6px;
+}
+
+QLabel#statusLabel {
+    color: #6b7280;
+    font-size: 14px;
+    padding: 8px 12px;
+    background-color: rgba(249, 250, 251, 0.8);
+    border-radius: 8px;
+    border: 1px solid rgba(229, 231, 235, 0.5);
+}
+
+QLabel#searchSelectionLabel {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(34, 197, 94, 0.1), stop: 1 rgba(34, 197, 94, 0.05));
+    border: 1px solid rgba(34, 197, 94, 0.2);
+    border-radius: 8px;
+    padding: 5px;
+    color: #006600;
+    font-weight: bold;
+}
+
+QLabel#selectionLabel {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(59, 130, 246, 0.1), stop: 1 rgba(59, 130, 246, 0.05));
+    border: 1px solid rgba(59, 130, 246, 0.2);
+    border-radius: 8px;
+    padding: 12px 16px;
+    color: #1d4ed8;
+    font-weight: 600;
+    font-size: 13px;
+}
+
+QLabel#titleLabel {
+    font-size: 18px;
+    font-weight: 700;
+    color: #1f2937;
+}
+
+QLabel#hintLabel {
+    color: #6b7280;
+    font-size: 12px;
+    font-style: italic;
+    margin-left: 16px;
+}
+
+/* Package lists */
+QListWidget#resultsList, QListWidget#installedList {
+    background-color: rgba(255, 255, 255, 0.95);
+    border: 1px solid rgba(209, 213, 219, 0.3);
+    border-radius: 12px;
+    padding: 8px;
+    outline: none;
+}
+
+QListWidget#resultsList::item {
+    padding: 16px 20px;
+    margin: 4px 2px;
+    border-radius: 10px;
+    background-color: transparent;
+    border: 1px solid transparent;
+    font-size: 14px;
+    min-height: 20px;
+    color: #374151;
+}
+
+QListWidget#installedList::item {
+    padding: 18px 20px;
+    margin: 6px 2px;
+    border-radius: 10px;
+    background-color: transparent;
+    border: 1px solid transparent;
+    font-size: 13px;
+    min-height: 35px;
+    color: #374151;
+}
+
+QListWidget#resultsList::item:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(59, 130, 246, 0.08), stop: 1 rgba(59, 130, 246, 0.04));
+    border-color: rgba(59, 130, 246, 0.2);
+    color: #1f2937;
+}
+
+QListWidget#installedList::item:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 rgba(245, 158, 11, 0.08), stop: 1 rgba(245, 158, 11, 0.04));
+    border-color: rgba(245, 158, 11, 0.2);
+    color: #1f2937;
+}
+
+QListWidget#resultsList::indicator, QListWidget#installedList::indicator {
+    width: 18px;
+    height: 18px;
+    border-radius: 3px;
+    border: 2px solid #d1d5db;
+    background-color: white;
+    margin-right: 8px;
+}
+
+QListWidget#resultsList::indicator:hover {
+    border-color: #3b82f6;
+    background-color: rgba(59, 130, 246, 0.1);
+}
+
+QListWidget#installedList::indicator:hover {
+    border-color: #ef4444;
+    background-color: rgba(239, 68, 68, 0.1);
+}
+
+QListWidget#resultsList::indicator:checked {
+    background-color: #3b82f6;
+    border-color: #3b82f6;
+    image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xIDVMNCA4TDExIDEiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
+    background-repeat: no-repeat;
+    background-position: center;
+}
+
+QListWidget#installedList::indicator:checked {
+    background-color: #ef4444;
+    border-color: #ef4444;
+    image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xIDVMNCA4TDExIDEiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
+    background-repeat: no-repeat;
+    background-position: center;
+}
+
+QCheckBox#autoRefreshCheck {
+    color: #374151;
+    font-size: 11px;
+    font-weight: 500;
+}
+
+QCheckBox#autoRefreshCheck::indicator {
+    width: 14px;
+    height: 14px;
+    border-radius: 2px;
+    border: 1px solid #d1d5db;
+}
+
+QCheckBox#autoRefreshCheck::indicator:checked {
+    background-color: #3b82f6;
+    border-color: #3b82f6;
+}
+
+/* Action buttons: colour comes from "variant", metrics from "size" */
+QPushButton[size="small"] {
+    padding: 6px 12px;
+    border-radius: 6px;
+    font-weight: 500;
+    font-size: 11px;
+}
+
+QPushButton[size="medium"] {
+    padding: 8px 16px;
+    border-radius: 6px;
+    font-weight: 600;
+    font-size: 12px;
+}
+
+QPushButton[size="tiny"] {
+    padding: 6px 12px;
+    border-radius: 4px;
+    font-weight: 500;
+    font-size: 11px;
+}
+
+QPushButton[variant="purple"] {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #8b5cf6, stop: 1 #7c3aed);
+}
+
+QPushButton[variant="purple"]:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #7c3aed, stop: 1 #6d28d9);
+}
+
+QPushButton[variant="green"] {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #10b981, stop: 1 #059669);
+}
+
+QPushButton[variant="green"]:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #059669, stop: 1 #047857);
+}
+
+QPushButton[variant="amber"] {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #f59e0b, stop: 1 #d97706);
+}
+
+QPushButton[variant="amber"]:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #d97706, stop: 1 #b45309);
+}
+
+QPushButton[variant="red"] {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #ef4444, stop: 1 #dc2626);
+}
+
+QPushButton[variant="red"]:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #dc2626, stop: 1 #b91c1c);
+}
+
+QPushButton[variant="gray"] {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #6b7280, stop: 1 #4b5563);
+}
+
+QPushButton[variant="gray"]:hover {
+    background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+        stop: 0 #4b5563, stop: 1 #374151);
+}
+"""
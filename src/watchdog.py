@@ -0,0 +1,112 @@
+"""Detects and records stalls of the Qt event loop
+
+A heartbeat QTimer fires every HEARTBEAT_MS on the GUI thread. A side thread
+checks when it last fired; once the GUI thread has been silent for the stall
+threshold, the side thread captures the GUI thread's Python stack with
+sys._current_frames(), so the stack shows what was blocking while it still
+blocks. When the heartbeat comes back, the stall's length and stack go into
+a ring buffer, and the length into the "ui.stall" histogram of the metrics
+registry (Tools > Diagnostics).
+"""
+
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List
+
+from PyQt5.QtCore import QObject, QTimer
+
+from metrics import metrics
+
+HEARTBEAT_MS = 50
+STALL_THRESHOLD_KEY = "stall_threshold_ms"
+DEFAULT_STALL_THRESHOLD_MS = 250
+RING_SIZE = 50  # most recent stalls kept
+STACK_DEPTH = 25  # innermost frames kept per stall
+# Longer gaps are the machine sleeping, not the app stalling
+MAX_STALL_SECONDS = 300
+
+
+class StallWatchdog(QObject):
+    """Measures event-loop latency and records where the GUI thread stalled"""
+
+    def __init__(self, threshold_ms: float = DEFAULT_STALL_THRESHOLD_MS, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self._gui_thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._pending_stack = None  # captured by the side thread for the current stall
+        self._stalls = deque(maxlen=RING_SIZE)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self._beat)
+
+    def start(self):
+        """Start watching; call from the GUI thread"""
+        if self._thread is not None:
+            return
+        self._gui_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            gap_ms = (now - self._last_beat) * 1000
+            self._last_beat = now
+            stack = self._pending_stack
+            self._pending_stack = None
+
+        lateness_ms = max(gap_ms - HEARTBEAT_MS, 0.0)
+        metrics.observe("ui.event_loop_latency", lateness_ms)
+        if lateness_ms < self.threshold_ms or lateness_ms > MAX_STALL_SECONDS * 1000:
+            return
+
+        metrics.observe("ui.stall", lateness_ms)
+        metrics.increment("ui.stalls")
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - lateness_ms / 1000)),
+            "duration_ms": round(lateness_ms, 1),
+            "stack": stack or [],
+        }
+        with self._lock:
+            self._stalls.append(entry)
+        print(f"UI stalled for {lateness_ms:.0f} ms" + (f" in {stack[-1].strip().splitlines()[0]}" if stack else ""))
+
+    def _watch(self):
+        """Side thread: capture the GUI thread's stack once per stall"""
+        poll = max(self.threshold_ms / 4000, 0.01)
+        while not self._stop.wait(poll):
+            with self._lock:
+                silent_ms = (time.monotonic() - self._last_beat) * 1000 - HEARTBEAT_MS
+                if silent_ms < self.threshold_ms or self._pending_stack is not None:
+                    continue
+                frame = sys._current_frames().get(self._gui_thread_id)
+                if frame is not None:
+                    self._pending_stack = traceback.format_stack(frame)[-STACK_DEPTH:]
+                del frame
+
+    def stalls(self) -> List[Dict]:
+        """Recorded stalls, oldest first"""
+        with self._lock:
+            return list(self._stalls)
+
+    def clear(self):
+        with self._lock:
+            self._stalls.clear()
@@ -1,9 +1,42 @@
 from PyQt5.QtWidgets import (QWidget, QLineEdit, QPushButton, QVBoxLayout, 
                              QListWidget, QMessageBox, QHBoxLayout, QLabel, 
-                             QProgressBar, QCheckBox, QSplitter, QListWidgetItem, QApplication)
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt, QSize
+                             QProgressBar, QCheckBox, QSplitter, QListWidgetItem,
+                             QTextBrowser)
+from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt, QSize, QPoint
 from PyQt5.QtGui import QFont, QIcon
-from dialogs import InstallDialog, UninstallDialog
+import html
+import time
+from installation_history import InstallationHistoryManager
+from job_journal import JobJournal
+from favorites_manager import FavoritesManager
+from metrics import metrics
+from profiling import profiled
+
+RECENT_SEARCHES_KEY = "recent_searches"
+MAX_RECENT_SEARCHES = 5
+SEARCH_PER_SOURCE_KEY = "search_per_source"
+# Details fields shown in the pane, in order: (key from winget show, label)
+DETAILS_FIELDS = [("version", "Version"), ("publisher", "Publisher"), ("author", "Author"),
+                  ("license", "License"), ("installer type", "Installer"), ("installer size", "Size"),
+                  ("tags", "Tags")]
+
+def split_app_text(app_text):
+    """Split display text like "Name (Publisher.AppID) - v1.0" into (name, package_id)
+
+    Names can contain parentheses themselves ("7-Zip 23.01 (x64)"), so the
+    package ID is taken from the last " (" group.
+    """
+    head, sep, tail = app_text.rpartition(" (")
+    if not sep:
+        head, sep, tail = app_text.partition("(")
+    if not sep or ")" not in tail:
+        return app_text.strip(), ""
+    return head.strip(), tail.split(")")[0].strip()
+
+def record_population(view, started, rows):
+    """Time spent filling a result list since started, and how many rows it got"""
+    metrics.observe(f"ui.populate.{view}", (time.perf_counter() - started) * 1000)
+    metrics.increment(f"ui.rows_rendered.{view}", rows)
 
 class CheckableListWidgetItem(QListWidgetItem):
     """Custom list widget item with checkbox functionality"""
@@ -12,34 +45,107 @@ class CheckableListWidgetItem(QListWidgetItem):
         self.setFlags(self.flags() | Qt.ItemIsUserCheckable)
         self.setCheckState(Qt.Unchecked)
 
+def format_search_record(record):
+    """Display text for a merged search record, e.g. Name (Id) - winget, msstore"""
+    return f"{record['name']} ({record['id']}) - {', '.join(record['sources'])}"
+
 class SearchThread(QThread):
-    """Background thread for search operations"""
+    """Background thread for search operations
+    
+    With per_source set, each source is queried separately; source_results
+    delivers each source's rows as it finishes and results_ready the final
+    merged, ranked list. Otherwise page selects one page of results.
+    """
     results_ready = pyqtSignal(list)
+    source_results = pyqtSignal(str, list)  # source, display texts
     search_finished = pyqtSignal()
     
-    def __init__(self, manager, query):
+    def __init__(self, manager, query, per_source=False, page=None):
         super().__init__()
         self.manager = manager
         self.query = query
+        self.per_source = per_source
+        self.page = page
     
     def run(self):
         try:
-            results = self.manager.search(self.query)
+            if self.per_source:
+                records = self.manager.search_sources(self.query, self.emit_source_results)
+                results = [format_search_record(record) for record in records]
+            else:
+                results = self.manager.search(self.query, page=self.page)
             self.results_ready.emit(results)
         except Exception as e:
             print(f"Search thread error: {e}")
             self.results_ready.emit([])
         finally:
             self.search_finished.emit()
+    
+    def emit_source_results(self, source, records):
+        self.source_results.emit(source, [format_search_record(dict(record, sources=[source]))
+                                          for record in records])
+
+class DetailsThread(QThread):
+    """Background thread fetching one package's details"""
+    details_ready = pyqtSignal(str, dict)  # package id, details
+    
+    def __init__(self, manager, package_id):
+        super().__init__()
+        self.manager = manager
+        self.package_id = package_id
+    
+    def run(self):
+        try:
+            details = self.manager.show(self.package_id)
+        except Exception as e:
+            print(f"Details thread error: {e}")
+            details = {}
+        self.details_ready.emit(self.package_id, details)
+
+def format_details_html(package_id, details):
+    """Rich text for the details pane"""
+    if not details:
+        return f"<p><b>{html.escape(package_id)}</b></p><p>No details available.</p>"
+    parts = [f"<h3>{html.escape(details.get('name', package_id))}</h3>",
+             f"<p style='color:#6b7280'>{html.escape(details.get('id', package_id))}</p>"]
+    if details.get("description"):
+        parts.append(f"<p>{html.escape(details['description']).replace(chr(10), '<br>')}</p>")
+    rows = [f"<tr><td><b>{label}</b></td><td>{html.escape(details[key]).replace(chr(10), ', ')}</td></tr>"
+            for key, label in DETAILS_FIELDS if details.get(key)]
+    if rows:
+        parts.append("<table cellspacing='4'>" + "".join(rows) + "</table>")
+    for key, label in (("homepage", "Homepage"), ("publisher url", "Publisher website")):
+        url = details.get(key, "")
+        if url.startswith(("http://", "https://")):
+            parts.append(f"<p><a href='{html.escape(url, quote=True)}'>{label}</a></p>")
+    return "".join(parts)
+
+def own_batch_jobs(manager, history):
+    """A batch queue for a widget used outside MainWindow, which shares its own"""
+    from dialogs import BatchJobQueue
+    return BatchJobQueue(manager, history, JobJournal())
 
 class SearchWidget(QWidget):
-    def __init__(self, manager):
+    def __init__(self, manager, config=None, history=None, favorites=None, batch_jobs=None):
         super().__init__()
         self.manager = manager
+        self.config = config
+        self.history = history or InstallationHistoryManager()
+        self.favorites = favorites or FavoritesManager()
+        self.batch_jobs = batch_jobs or own_batch_jobs(manager, self.history)
+        self.current_query = ""
+        self.shown_package_ids = set()
+        self.current_page = 0
+        self.more_pages = False
         self.search_thread = None
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.perform_search)
+        self.details_thread = None
+        # Prefetching waits until scrolling pauses
+        self.prefetch_timer = QTimer()
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self.prefetch_visible_details)
         
         self.init_ui()
         
@@ -50,13 +156,7 @@ class SearchWidget(QWidget):
         
         # Modern search section with card design
         search_card = QWidget()
-        search_card.setStyleSheet("""
-            QWidget {
-                background-color: rgba(255, 255, 255, 0.9);
-                border-radius: 12px;
-                padding: 16px;
-            }
-        """)
+        search_card.setObjectName("searchCard")
         search_layout = QVBoxLayout(search_card)
         search_layout.setSpacing(16)
         
@@ -75,26 +175,20 @@ class SearchWidget(QWidget):
         self.search_button.setMinimumHeight(44)
         self.search_button.setMinimumWidth(100)
         
+        self.per_source_checkbox = QCheckBox("Search sources in parallel")
+        self.per_source_checkbox.setToolTip("Query each winget source separately and show results as each one answers")
+        self.per_source_checkbox.setChecked(bool(self.config.get(SEARCH_PER_SOURCE_KEY, False)) if self.config else False)
+        self.per_source_checkbox.toggled.connect(self.toggle_per_source)
+        
         search_input_layout.addWidget(self.search_box, 1)
         search_input_layout.addWidget(self.search_button)
+        search_input_layout.addWidget(self.per_source_checkbox)
         
         # Progress indicator with modern styling
         self.search_progress = QProgressBar()
         self.search_progress.setRange(0, 0)  # Indeterminate
         self.search_progress.hide()
-        self.search_progress.setStyleSheet("""
-            QProgressBar {
-                background-color: rgba(229, 231, 235, 0.8);
-                border: none;
-                border-radius: 6px;
-                height: 8px;
-            }
-            QProgressBar::chunk {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #3b82f6, stop: 1 #1d4ed8);
-                border-radius: 6px;
-            }
-        """)
+        self.search_progress.setObjectName("searchProgress")
         
         search_layout.addLayout(search_input_layout)
         search_layout.addWidget(self.search_progress)
@@ -105,63 +199,21 @@ class SearchWidget(QWidget):
         
         self.select_all_btn = QPushButton("☑️ Select All")
         self.select_all_btn.clicked.connect(self.toggle_select_all_items)
-        self.select_all_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #8b5cf6, stop: 1 #7c3aed);
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 6px;
-                font-weight: 500;
-                font-size: 11px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #7c3aed, stop: 1 #6d28d9);
-            }
-        """)
+        self.select_all_btn.setProperty("variant", "purple")
+        self.select_all_btn.setProperty("size", "small")
+        self.select_all_btn.setMinimumWidth(80)
         
         self.install_selected_btn = QPushButton("📦 Install Selected")
         self.install_selected_btn.clicked.connect(self.install_selected_apps)
-        self.install_selected_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #10b981, stop: 1 #059669);
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 6px;
-                font-weight: 500;
-                font-size: 11px;
-                min-width: 100px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #059669, stop: 1 #047857);
-            }
-        """)
+        self.install_selected_btn.setProperty("variant", "green")
+        self.install_selected_btn.setProperty("size", "small")
+        self.install_selected_btn.setMinimumWidth(100)
         
         self.add_to_favorites_btn = QPushButton("⭐ Add to Favorites")
         self.add_to_favorites_btn.clicked.connect(self.add_selected_to_favorites)
-        self.add_to_favorites_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #f59e0b, stop: 1 #d97706);
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 6px;
-                font-weight: 500;
-                font-size: 11px;
-                min-width: 110px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #d97706, stop: 1 #b45309);
-            }
-        """)
+        self.add_to_favorites_btn.setProperty("variant", "amber")
+        self.add_to_favorites_btn.setProperty("size", "small")
+        self.add_to_favorites_btn.setMinimumWidth(110)
         
         batch_layout.addWidget(self.select_all_btn)
         batch_layout.addWidget(self.install_selected_btn)
@@ -172,107 +224,34 @@ class SearchWidget(QWidget):
         
         # Status and selection labels with modern styling
         self.status_label = QLabel("💡 Enter search terms to find applications")
-        self.status_label.setStyleSheet("""
-            QLabel {
-                color: #6b7280;
-                font-size: 14px;
-                padding: 8px 12px;
-                background-color: rgba(249, 250, 251, 0.8);
-                border-radius: 8px;
-                border: 1px solid rgba(229, 231, 235, 0.5);
-            }
-        """)
+        self.status_label.setObjectName("statusLabel")
         
         self.search_selection_label = QLabel("")
-        self.search_selection_label.setStyleSheet("""
-            QLabel {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(34, 197, 94, 0.1), stop: 1 rgba(34, 197, 94, 0.05));
-                border: 1px solid rgba(34, 197, 94, 0.2);
-                border-radius: 8px;
-                padding: 5px;
-                color: #006600;
-                font-weight: bold;
-            }
-        """)
+        self.search_selection_label.setObjectName("searchSelectionLabel")
         self.search_selection_label.hide()
         
         # Results list
         self.results_list = QListWidget()
         self.results_list.itemDoubleClicked.connect(self.install_app)
         self.results_list.itemChanged.connect(self.on_search_item_changed)
+        self.results_list.currentItemChanged.connect(self.show_details)
+        # Further pages are fetched when the user scrolls near the end
+        self.results_list.verticalScrollBar().valueChanged.connect(self.on_results_scrolled)
         
         # Improve search results styling with premium design
         self.results_list.setAlternatingRowColors(False)
         self.results_list.setToolTip("Check boxes to select • Double-click to install individual apps")
         
-        # Add custom premium styling
-        self.results_list.setStyleSheet("""
-            QListWidget {
-                background-color: rgba(255, 255, 255, 0.95);
-                border: 1px solid rgba(209, 213, 219, 0.3);
-                border-radius: 12px;
-                padding: 8px;
-                outline: none;
-            }
-            QListWidget::item {
-                padding: 16px 20px;
-                margin: 4px 2px;
-                border-radius: 10px;
-                background-color: transparent;
-                border: 1px solid transparent;
-                font-size: 14px;
-                min-height: 20px;
-                color: #374151;
-            }
-            QListWidget::item:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(59, 130, 246, 0.08), stop: 1 rgba(59, 130, 246, 0.04));
-                border-color: rgba(59, 130, 246, 0.2);
-                color: #1f2937;
-            }
-            QListWidget::indicator {
-                width: 18px;
-                height: 18px;
-                border-radius: 3px;
-                border: 2px solid #d1d5db;
-                background-color: white;
-                margin-right: 8px;
-            }
-            QListWidget::indicator:hover {
-                border-color: #3b82f6;
-                background-color: rgba(59, 130, 246, 0.1);
-            }
-            QListWidget::indicator:checked {
-                background-color: #3b82f6;
-                border-color: #3b82f6;
-                image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xIDVMNCA4TDExIDEiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
-                background-repeat: no-repeat;
-                background-position: center;
-            }
-        """)
+        # Styled by the application-wide sheet in styles.py
+        self.results_list.setObjectName("resultsList")
         self.search_selection_label.hide()
         
         # Clear cache button with modern styling
         cache_layout = QHBoxLayout()
         self.clear_cache_btn = QPushButton("🗑️ Clear Search Cache")
         self.clear_cache_btn.clicked.connect(self.clear_search_cache)
-        self.clear_cache_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #6b7280, stop: 1 #4b5563);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                font-weight: 500;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #4b5563, stop: 1 #374151);
-            }
-        """)
+        self.clear_cache_btn.setProperty("variant", "gray")
+        self.clear_cache_btn.setProperty("size", "medium")
         cache_layout.addWidget(self.clear_cache_btn)
         cache_layout.addStretch()
         
@@ -280,7 +259,18 @@ class SearchWidget(QWidget):
         layout.addWidget(search_card)
         layout.addWidget(self.status_label)
         layout.addWidget(self.search_selection_label)
-        layout.addWidget(self.results_list, 1)  # Give results list most space
+        # Details of the current result, next to the list
+        self.details_pane = QTextBrowser()
+        self.details_pane.setObjectName("detailsPane")
+        self.details_pane.setOpenExternalLinks(True)
+        self.details_pane.setPlaceholderText("Select a package to see its details")
+        
+        self.results_splitter = QSplitter(Qt.Horizontal)
+        self.results_splitter.addWidget(self.results_list)
+        self.results_splitter.addWidget(self.details_pane)
+        self.results_splitter.setStretchFactor(0, 3)
+        self.results_splitter.setStretchFactor(1, 2)
+        layout.addWidget(self.results_splitter, 1)  # Give results list most space
         layout.addLayout(cache_layout)
         
         self.setLayout(layout)
@@ -311,18 +301,46 @@ class SearchWidget(QWidget):
         if self.search_thread and self.search_thread.isRunning():
             return
         
+        self.current_query = query
         self.search_button.setEnabled(False)
         self.search_progress.show()
         self.status_label.setText(f"Searching for '{query}'...")
         
-        # Start background search
-        self.search_thread = SearchThread(self.manager, query)
+        # Start background search; a plain search fetches a small first page
+        self.manager.cancel_prefetch()
+        self.shown_package_ids = set()
+        self.current_page = 0
+        self.more_pages = False
+        per_source = self.per_source_checkbox.isChecked()
+        self.search_thread = SearchThread(self.manager, query, per_source, page=None if per_source else 0)
+        self.search_thread.source_results.connect(self.on_source_results)
         self.search_thread.results_ready.connect(self.on_search_results)
         self.search_thread.search_finished.connect(self.on_search_finished)
         self.search_thread.start()
 
+    def toggle_per_source(self, enabled):
+        if self.config is not None:
+            self.config.set(SEARCH_PER_SOURCE_KEY, enabled)
+    
+    @profiled("populate")
+    def on_source_results(self, source, results):
+        """Show one source's rows right away; the merged list replaces them at the end"""
+        started = time.perf_counter()
+        if not self.shown_package_ids:
+            self.results_list.clear()
+        for app_text in results:
+            _, package_id = split_app_text(app_text)
+            if package_id.lower() in self.shown_package_ids:
+                continue
+            self.shown_package_ids.add(package_id.lower())
+            self.results_list.addItem(CheckableListWidgetItem(app_text))
+        record_population("search_source", started, len(results))
+        self.status_label.setText(f"Found {len(self.shown_package_ids)} applications so far ({source} answered)...")
+    
+    @profiled("populate")
     def on_search_results(self, results):
         """Handle search results"""
+        started = time.perf_counter()
         self.results_list.clear()
         self.search_selection_label.hide()  # Hide selection when loading new results
         
@@ -336,9 +354,62 @@ class SearchWidget(QWidget):
                 # Create checkable list item
                 item = CheckableListWidgetItem(app_text)
                 self.results_list.addItem(item)
+            record_population("search", started, len(results))
             
             self.status_label.setText(f"Found {len(results)} applications")
             self.update_selection_status()
+            self.remember_search(self.current_query)
+        
+        self.shown_package_ids = {split_app_text(app_text)[1].lower() for app_text in results}
+        self.prefetch_timer.start(200)
+        if self.search_thread and self.search_thread.page is not None:
+            self.more_pages = self.manager.has_more_pages(0, rows=len(results))
+            if self.more_pages:
+                self.status_label.setText(f"Found {len(results)} applications - scroll for more")
+            # A first page that doesn't fill the view can't be scrolled
+            QTimer.singleShot(0, self.on_results_scrolled)
+    
+    def on_results_scrolled(self, value=None):
+        """Load the next page once the view is within a screen of the end"""
+        self.prefetch_timer.start(200)
+        bar = self.results_list.verticalScrollBar()
+        if self.more_pages and bar.maximum() - bar.value() <= bar.pageStep():
+            self.load_more_results()
+    
+    def load_more_results(self):
+        if self.search_thread and self.search_thread.isRunning():
+            return
+        self.search_progress.show()
+        self.search_thread = SearchThread(self.manager, self.current_query, page=self.current_page + 1)
+        self.search_thread.results_ready.connect(self.on_more_results)
+        self.search_thread.search_finished.connect(self.on_search_finished)
+        self.search_thread.start()
+    
+    @profiled("populate")
+    def on_more_results(self, results):
+        """Append the next page below the rows already shown"""
+        started = time.perf_counter()
+        self.current_page += 1
+        self.more_pages = self.manager.has_more_pages(self.current_page, rows=len(results))
+        for app_text in results:
+            package_id = split_app_text(app_text)[1].lower()
+            if package_id in self.shown_package_ids:
+                continue
+            self.shown_package_ids.add(package_id)
+            self.results_list.addItem(CheckableListWidgetItem(app_text))
+        record_population("search_page", started, len(results))
+        more = " - scroll for more" if self.more_pages else ""
+        self.status_label.setText(f"Found {len(self.shown_package_ids)} applications{more}")
+        self.update_selection_status()
+        QTimer.singleShot(0, self.on_results_scrolled)
+    
+    def remember_search(self, query):
+        """Keep the most recent successful queries so startup can prewarm them"""
+        if self.config is None or not query:
+            return
+        recent = [q for q in self.config.get(RECENT_SEARCHES_KEY, []) if q.lower() != query.lower()]
+        recent.insert(0, query)
+        self.config.set(RECENT_SEARCHES_KEY, recent[:MAX_RECENT_SEARCHES])
     
     def on_search_finished(self):
         """Clean up after search completes"""
@@ -398,10 +469,7 @@ class SearchWidget(QWidget):
             app_text = item.text()
             if not app_text.startswith("No applications found"):
                 # Parse the format: "AppName (Publisher.AppID)"
-                if "(" in app_text and ")" in app_text:
-                    app_name = app_text.split("(")[0].strip()
-                else:
-                    app_name = app_text.strip()
+                app_name, _ = split_app_text(app_text)
                 app_names.append(app_name)
         
         if not app_names:
@@ -419,54 +487,32 @@ class SearchWidget(QWidget):
             self.start_batch_install(selected_items)
     
     def start_batch_install(self, selected_items):
-        """Start batch installation process"""
+        """Start batch installation process in the background"""
         from PyQt5.QtWidgets import QProgressDialog
         
-        progress = QProgressDialog("Installing applications...", "Cancel", 0, len(selected_items), self)
-        progress.setWindowModality(Qt.WindowModal)
-        progress.show()
-        
-        successful = 0
-        failed = 0
-        
-        for i, item in enumerate(selected_items):
-            if progress.wasCanceled():
-                break
-                
+        packages = []
+        for item in selected_items:
             app_text = item.text()
             if app_text.startswith("No applications found"):
                 continue
-                
-            # Parse the format: "AppName (Publisher.AppID)"
-            if "(" in app_text and ")" in app_text:
-                app_name = app_text.split("(")[0].strip()
-            else:
-                app_name = app_text.strip()
-                
-            progress.setLabelText(f"Installing {app_name}...")
-            progress.setValue(i)
-            
-            try:
-                # Extract package ID from the app text format: "AppName (Publisher.AppID)"
-                if "(" in app_text and ")" in app_text:
-                    package_id = app_text.split("(")[1].split(")")[0].strip()
-                else:
-                    # Fallback - use the app name
-                    package_id = app_name
-                
-                if package_id:
-                    result = self.manager.install(package_id)
-                    if result and "successfully" in result.lower():
-                        successful += 1
-                    else:
-                        failed += 1
-                else:
-                    failed += 1
-                    
-            except Exception as e:
-                print(f"Failed to install {app_name}: {e}")
-                failed += 1
+            # Parse the format: "AppName (Publisher.AppID)", falling back to the app name
+            app_name, package_id = split_app_text(app_text)
+            packages.append((app_name, package_id or app_name))
         
+        progress = QProgressDialog("Installing applications...", "Cancel", 0, len(packages), self)
+        progress.setWindowModality(Qt.WindowModal)
+        
+        # Queued behind any other batch and journaled, see BatchJobQueue
+        batch = self.batch_jobs.submit("install", packages)
+        batch.item_started.connect(
+            lambda i, name: (progress.setValue(i), progress.setLabelText(f"Installing {name}...")))
+        batch.batch_finished.connect(
+            lambda successful, failed: self.on_batch_install_finished(progress, successful, failed))
+        progress.canceled.connect(batch.cancel)
+        progress.show()
+        batch.start()
+    
+    def on_batch_install_finished(self, progress, successful, failed):
         progress.close()
         
         # Show results
@@ -485,39 +531,30 @@ class SearchWidget(QWidget):
             QMessageBox.warning(self, "No Selection", "Please check the boxes next to applications you want to add to favorites.")
             return
         
-        # Import favorites manager
-        try:
-            from .favorites_manager import FavoritesManager
-        except ImportError:
-            # Fallback for when running directly
-            import sys
-            import os
-            sys.path.append(os.path.dirname(__file__))
-            from favorites_manager import FavoritesManager
-        favorites = FavoritesManager()
-        
-        added_count = 0
+        apps = []
         for item in selected_items:
             app_text = item.text()
             if not app_text.startswith("No applications found"):
                 # Parse the format: "AppName (Publisher.AppID)"
                 if "(" in app_text and ")" in app_text:
                     # Extract app name and package ID
-                    app_name = app_text.split("(")[0].strip()
-                    package_id = app_text.split("(")[1].split(")")[0].strip()
+                    app_name, package_id = split_app_text(app_text)
                     
                     if package_id:
-                        favorites.add_favorite(app_name, package_id)
-                        added_count += 1
+                        apps.append((app_name, package_id))
                 else:
                     # Fallback - use the whole text as both name and ID
                     lines = app_text.split('\n')
                     app_name = lines[0].strip()
-                    favorites.add_favorite(app_name, app_name)
-                    added_count += 1
-        
-        QMessageBox.information(self, "Favorites Updated", 
-                              f"Added {added_count} applications to favorites!")
+                    apps.append((app_name, app_name))
+        
+        # One save for the whole selection
+        added_count = self.favorites.bulk_add(apps)
+        skipped = len(apps) - added_count
+        message = f"Added {added_count} applications to favorites!"
+        if skipped:
+            message += f"\n{skipped} were already favorites."
+        QMessageBox.information(self, "Favorites Updated", message)
     
     def update_selection_status(self):
         """Update selection status label"""
@@ -542,6 +579,62 @@ class SearchWidget(QWidget):
         else:
             self.search_selection_label.hide()
 
+    def visible_package_ids(self):
+        """Package ids of the result rows currently on screen"""
+        viewport = self.results_list.viewport()
+        first = self.results_list.indexAt(QPoint(0, 0)).row()
+        if first < 0:
+            return []
+        last = self.results_list.indexAt(QPoint(0, viewport.height() - 1)).row()
+        if last < 0:
+            last = self.results_list.count() - 1
+        ids = []
+        for row in range(first, last + 1):
+            _, package_id = split_app_text(self.results_list.item(row).text())
+            if package_id:
+                ids.append(package_id)
+        return ids
+    
+    def prefetch_visible_details(self):
+        """Fetch details for the rows on screen; rows scrolled away are dropped from the queue"""
+        self.manager.prefetch_details(self.visible_package_ids())
+    
+    def show_details(self, item, previous=None):
+        """Show the current result's details, from memory when prefetched"""
+        if item is None:
+            self.details_pane.clear()
+            return
+        _, package_id = split_app_text(item.text())
+        if not package_id:
+            self.details_pane.clear()
+            return
+        
+        details = self.manager.cached_details(package_id)
+        if details is not None:
+            self.details_pane.setHtml(format_details_html(package_id, details))
+            return
+        
+        self.details_pane.setHtml(f"<p>Loading details for <b>{html.escape(package_id)}</b>...</p>")
+        if self.details_thread and self.details_thread.isRunning():
+            return  # the current row is fetched next, see on_details_thread_finished
+        self.details_thread = DetailsThread(self.manager, package_id)
+        self.details_thread.details_ready.connect(self.on_details_ready)
+        self.details_thread.finished.connect(self.on_details_thread_finished)
+        self.details_thread.start()
+    
+    def on_details_thread_finished(self):
+        """Catch up with a row selected while the previous fetch was running"""
+        item = self.results_list.currentItem()
+        if item is not None:
+            package_id = split_app_text(item.text())[1]
+            if package_id and self.manager.cached_details(package_id) is None:
+                self.show_details(item)
+    
+    def on_details_ready(self, package_id, details):
+        item = self.results_list.currentItem()
+        if item is not None and split_app_text(item.text())[1] == package_id:
+            self.details_pane.setHtml(format_details_html(package_id, details))
+    
     def on_search_item_changed(self, item):
         """Handle checkbox state changes in search results"""
         self.update_selection_status()
@@ -551,10 +644,9 @@ class SearchWidget(QWidget):
         if app_info.startswith("No applications found"):
             return
             
-        if "(" in app_info and ")" in app_info:
-            app_id = app_info.split("(")[-1].split(")")[0].strip()
-        else:
-            app_id = app_info
+        _, app_id = split_app_text(app_info)
+        app_id = app_id or app_info
+        from dialogs import InstallDialog
         dialog = InstallDialog(app_id, self.manager)
         dialog.exec_()
 
@@ -583,15 +675,19 @@ class LoadAppsThread(QThread):
             self.load_finished.emit()
 
 class InstalledAppsWidget(QWidget):
-    def __init__(self, manager):
+    def __init__(self, manager, history=None, config=None, batch_jobs=None):
         super().__init__()
         self.manager = manager
+        self.history = history or InstallationHistoryManager()
+        self.batch_jobs = batch_jobs or own_batch_jobs(manager, self.history)
+        self.config = config
         self.load_thread = None
+        self.debug_dialog = None  # kept, with its worker thread, while the widget lives
         
         self.init_ui()
         
-        # Auto-load on startup
-        QTimer.singleShot(1000, self.refresh_installed_apps)  # Delay initial load
+        # The tab is built on first view, so load right away
+        QTimer.singleShot(0, self.refresh_installed_apps)
     
     def init_ui(self):
         layout = QVBoxLayout()
@@ -603,23 +699,10 @@ class InstalledAppsWidget(QWidget):
         header_layout.setContentsMargins(0, 0, 0, 0)
         
         title_label = QLabel("📦 Installed Applications")
-        title_label.setStyleSheet("""
-            QLabel {
-                font-size: 18px;
-                font-weight: 700;
-                color: #1f2937;
-            }
-        """)
+        title_label.setObjectName("titleLabel")
         
         info_label = QLabel("💡 Double-click to uninstall")
-        info_label.setStyleSheet("""
-            QLabel {
-                color: #6b7280;
-                font-size: 12px;
-                font-style: italic;
-                margin-left: 16px;
-            }
-        """)
+        info_label.setObjectName("hintLabel")
         
         header_layout.addWidget(title_label)
         header_layout.addWidget(info_label)
@@ -632,60 +715,20 @@ class InstalledAppsWidget(QWidget):
         button_layout.setSpacing(12)
         
         self.refresh_button = QPushButton("🔄 Refresh")
-        self.refresh_button.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #10b981, stop: 1 #059669);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                font-weight: 600;
-                font-size: 12px;
-                min-width: 100px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #059669, stop: 1 #047857);
-            }
-        """)
+        self.refresh_button.setProperty("variant", "green")
+        self.refresh_button.setProperty("size", "medium")
+        self.refresh_button.setMinimumWidth(100)
         
         self.show_upgrades_button = QPushButton("⬆️ Updates")
-        self.show_upgrades_button.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #f59e0b, stop: 1 #d97706);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                font-weight: 600;
-                font-size: 12px;
-                min-width: 100px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #d97706, stop: 1 #b45309);
-            }
-        """)
+        self.show_upgrades_button.setProperty("variant", "amber")
+        self.show_upgrades_button.setProperty("size", "medium")
+        self.show_upgrades_button.setMinimumWidth(100)
         
         # Progress indicator
         self.load_progress = QProgressBar()
         self.load_progress.setRange(0, 0)  # Indeterminate
         self.load_progress.hide()
-        self.load_progress.setStyleSheet("""
-            QProgressBar {
-                background-color: rgba(229, 231, 235, 0.8);
-                border: none;
-                border-radius: 6px;
-                height: 8px;
-            }
-            QProgressBar::chunk {
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 0,
-                    stop: 0 #10b981, stop: 1 #059669);
-                border-radius: 6px;
-            }
-        """)
+        self.load_progress.setObjectName("loadProgress")
         
         button_layout.addWidget(self.refresh_button)
         button_layout.addWidget(self.show_upgrades_button)
@@ -693,63 +736,21 @@ class InstalledAppsWidget(QWidget):
         # Add batch operation buttons
         self.select_all_installed_btn = QPushButton("☑️ Select All")
         self.select_all_installed_btn.clicked.connect(self.toggle_select_all_installed_items)
-        self.select_all_installed_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #8b5cf6, stop: 1 #7c3aed);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                font-weight: 600;
-                font-size: 12px;
-                min-width: 90px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #7c3aed, stop: 1 #6d28d9);
-            }
-        """)
+        self.select_all_installed_btn.setProperty("variant", "purple")
+        self.select_all_installed_btn.setProperty("size", "medium")
+        self.select_all_installed_btn.setMinimumWidth(90)
         
         self.uninstall_selected_btn = QPushButton("🗑️ Uninstall Selected")
         self.uninstall_selected_btn.clicked.connect(self.uninstall_selected_apps)
-        self.uninstall_selected_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #ef4444, stop: 1 #dc2626);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                font-weight: 600;
-                font-size: 12px;
-                min-width: 120px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #dc2626, stop: 1 #b91c1c);
-            }
-        """)
+        self.uninstall_selected_btn.setProperty("variant", "red")
+        self.uninstall_selected_btn.setProperty("size", "medium")
+        self.uninstall_selected_btn.setMinimumWidth(120)
         
         self.view_history_btn = QPushButton("📜 History")
         self.view_history_btn.clicked.connect(self.show_installation_history)
-        self.view_history_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #8b5cf6, stop: 1 #7c3aed);
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 6px;
-                font-weight: 600;
-                font-size: 12px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #7c3aed, stop: 1 #6d28d9);
-            }
-        """)
+        self.view_history_btn.setProperty("variant", "purple")
+        self.view_history_btn.setProperty("size", "medium")
+        self.view_history_btn.setMinimumWidth(80)
         
         button_layout.addWidget(self.select_all_installed_btn)
         button_layout.addWidget(self.uninstall_selected_btn)
@@ -758,44 +759,11 @@ class InstalledAppsWidget(QWidget):
         
         # Status label
         self.status_label = QLabel("🔄 Loading installed applications...")
-        self.status_label.setStyleSheet("""
-            QLabel {
-                color: #6b7280;
-                font-size: 14px;
-                padding: 8px 12px;
-                background-color: rgba(249, 250, 251, 0.8);
-                border-radius: 8px;
-                border: 1px solid rgba(229, 231, 235, 0.5);
-            }
-        """)
+        self.status_label.setObjectName("statusLabel")
         
         # Selection info label
         self.selection_label = QLabel("")
-        self.selection_label.setStyleSheet("""
-            QLabel {
-                background-color: #f0f8ff;
-                border: 1px solid #b3d9ff;
-                border-radius: 4px;
-                padding: 5px;
-                color: #0066cc;
-                font-weight: bold;
-            }
-        """)
-        
-        # Selection info label
-        self.selection_label = QLabel("")
-        self.selection_label.setStyleSheet("""
-            QLabel {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(59, 130, 246, 0.1), stop: 1 rgba(59, 130, 246, 0.05));
-                border: 1px solid rgba(59, 130, 246, 0.2);
-                border-radius: 8px;
-                padding: 12px 16px;
-                color: #1d4ed8;
-                font-weight: 600;
-                font-size: 13px;
-            }
-        """)
+        self.selection_label.setObjectName("selectionLabel")
         self.selection_label.hide()
         
         # Modern apps list
@@ -807,51 +775,7 @@ class InstalledAppsWidget(QWidget):
         self.app_list.setAlternatingRowColors(False)
         self.app_list.setToolTip("Check boxes to select • Double-click to uninstall individual apps")
         
-        self.app_list.setStyleSheet("""
-            QListWidget {
-                background-color: rgba(255, 255, 255, 0.95);
-                border: 1px solid rgba(209, 213, 219, 0.3);
-                border-radius: 12px;
-                padding: 8px;
-                outline: none;
-            }
-            QListWidget::item {
-                padding: 18px 20px;
-                margin: 6px 2px;
-                border-radius: 10px;
-                background-color: transparent;
-                border: 1px solid transparent;
-                font-size: 13px;
-                min-height: 35px;
-                color: #374151;
-                line-height: 1.4;
-            }
-            QListWidget::item:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 rgba(245, 158, 11, 0.08), stop: 1 rgba(245, 158, 11, 0.04));
-                border-color: rgba(245, 158, 11, 0.2);
-                color: #1f2937;
-            }
-            QListWidget::indicator {
-                width: 18px;
-                height: 18px;
-                border-radius: 3px;
-                border: 2px solid #d1d5db;
-                background-color: white;
-                margin-right: 8px;
-            }
-            QListWidget::indicator:hover {
-                border-color: #ef4444;
-                background-color: rgba(239, 68, 68, 0.1);
-            }
-            QListWidget::indicator:checked {
-                background-color: #ef4444;
-                border-color: #ef4444;
-                image: url(data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMTIiIGhlaWdodD0iOSIgdmlld0JveD0iMCAwIDEyIDkiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxwYXRoIGQ9Ik0xIDVMNCA4TDExIDEiIHN0cm9rZT0id2hpdGUiIHN0cm9rZS13aWR0aD0iMiIgc3Ryb2tlLWxpbmVjYXA9InJvdW5kIiBzdHJva2UtbGluZWpvaW49InJvdW5kIi8+Cjwvc3ZnPgo=);
-                background-repeat: no-repeat;
-                background-position: center;
-            }
-        """)
+        self.app_list.setObjectName("installedList")
         
         # Compact cache management section
         cache_layout = QHBoxLayout()
@@ -861,64 +785,20 @@ class InstalledAppsWidget(QWidget):
         
         self.clear_cache_btn = QPushButton("🗑️ Clear Cache")
         self.clear_cache_btn.clicked.connect(self.clear_cache)
-        self.clear_cache_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #ef4444, stop: 1 #dc2626);
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 4px;
-                font-weight: 500;
-                font-size: 11px;
-                min-width: 80px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #dc2626, stop: 1 #b91c1c);
-            }
-        """)
+        self.clear_cache_btn.setProperty("variant", "red")
+        self.clear_cache_btn.setProperty("size", "tiny")
+        self.clear_cache_btn.setMinimumWidth(80)
         
         self.auto_refresh_check = QCheckBox("🔄 Auto-refresh (5 min)")
         self.auto_refresh_check.setChecked(False)
         self.auto_refresh_check.toggled.connect(self.toggle_auto_refresh)
-        self.auto_refresh_check.setStyleSheet("""
-            QCheckBox {
-                color: #374151;
-                font-size: 11px;
-                font-weight: 500;
-            }
-            QCheckBox::indicator {
-                width: 14px;
-                height: 14px;
-                border-radius: 2px;
-                border: 1px solid #d1d5db;
-            }
-            QCheckBox::indicator:checked {
-                background-color: #3b82f6;
-                border-color: #3b82f6;
-            }
-        """)
+        self.auto_refresh_check.setObjectName("autoRefreshCheck")
         
         self.debug_btn = QPushButton("🔍 Debug")
         self.debug_btn.clicked.connect(self.show_debug_output)
-        self.debug_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #6b7280, stop: 1 #4b5563);
-                color: white;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 4px;
-                font-weight: 500;
-                font-size: 11px;
-                min-width: 60px;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                    stop: 0 #4b5563, stop: 1 #374151);
-            }
-        """)
+        self.debug_btn.setProperty("variant", "gray")
+        self.debug_btn.setProperty("size", "tiny")
+        self.debug_btn.setMinimumWidth(60)
         
         cache_layout.addWidget(self.clear_cache_btn)
         cache_layout.addWidget(self.debug_btn)
@@ -981,8 +861,10 @@ class InstalledAppsWidget(QWidget):
         self.load_thread.load_finished.connect(self.on_load_finished)
         self.load_thread.start()
     
+    @profiled("populate")
     def on_apps_loaded(self, apps, operation_type):
         """Handle loaded apps"""
+        started = time.perf_counter()
         self.app_list.clear()
         self.selection_label.hide()  # Hide selection when loading new data
         
@@ -1005,6 +887,7 @@ class InstalledAppsWidget(QWidget):
                 # Create checkable list item
                 item = CheckableListWidgetItem(cleaned_app)
                 self.app_list.addItem(item)
+            record_population(operation_type, started, len(apps))
             
             if operation_type == 'installed':
                 self.status_label.setText(f"� Loaded {len(apps)} installed applications")
@@ -1017,11 +900,13 @@ class InstalledAppsWidget(QWidget):
             # Handle different formats of app text
             if "(" in app_text and ")" in app_text:
                 # Format: AppName (Publisher.AppID) - vVersion
-                parts = app_text.split("(")
-                app_name = parts[0].strip()
+                # (names may contain parentheses, so split at the last " (")
+                app_name, sep, remaining = app_text.rpartition(" (")
+                if not sep:
+                    app_name, _, remaining = app_text.partition("(")
+                app_name = app_name.strip()
                 
                 # Extract publisher and version info
-                remaining = "(".join(parts[1:])
                 if ") - v" in remaining:
                     id_part = remaining.split(") - v")[0]
                     version_part = remaining.split(") - v")[1] if len(remaining.split(") - v")) > 1 else ""
@@ -1141,45 +1026,13 @@ class InstalledAppsWidget(QWidget):
         self.update_installed_selection_status()
     
     def show_debug_output(self):
-        """Show raw winget output for debugging"""
-        import subprocess
-        try:
-            result = subprocess.run(
-                ["winget", "list", "--accept-source-agreements"],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=30
-            )
-            
-            # Create a dialog to show the raw output
-            from PyQt5.QtWidgets import QDialog, QTextEdit, QVBoxLayout, QPushButton
-            
-            dialog = QDialog(self)
-            dialog.setWindowTitle("Debug: Raw Winget Output")
-            dialog.resize(800, 600)
-            
-            layout = QVBoxLayout()
-            
-            text_edit = QTextEdit()
-            text_edit.setPlainText(f"Command: winget list --accept-source-agreements\n"
-                                  f"Return code: {result.returncode}\n"
-                                  f"STDOUT:\n{result.stdout}\n\n"
-                                  f"STDERR:\n{result.stderr}")
-            text_edit.setReadOnly(True)
-            
-            close_btn = QPushButton("Close")
-            close_btn.clicked.connect(dialog.accept)
-            
-            layout.addWidget(text_edit)
-            layout.addWidget(close_btn)
-            dialog.setLayout(layout)
-            
-            dialog.exec_()
-            
-        except Exception as e:
-            QMessageBox.warning(self, "Debug Error", f"Failed to get winget output: {str(e)}")
+        """Show raw winget output for debugging, without blocking the window"""
+        from dialogs import DebugOutputDialog
+        if self.debug_dialog is None:
+            self.debug_dialog = DebugOutputDialog(self.manager, self)
+        self.debug_dialog.show()
+        self.debug_dialog.raise_()
+        self.debug_dialog.activateWindow()
     
     def uninstall_app(self, item):
         """Handle uninstalling an application"""
@@ -1216,6 +1069,7 @@ class InstalledAppsWidget(QWidget):
                     app_id = f"{publisher_part}.{app_name.replace(' ', '')}"
         
         # Show uninstall dialog
+        from dialogs import UninstallDialog
         dialog = UninstallDialog(app_id, self.manager)
         if dialog.exec_() == dialog.Accepted:
             # Refresh the list after uninstall
@@ -1274,24 +1128,11 @@ class InstalledAppsWidget(QWidget):
             self.start_batch_uninstall(valid_items)
     
     def start_batch_uninstall(self, selected_items):
-        """Start the batch uninstallation process"""
+        """Start the batch uninstallation process in the background"""
         from PyQt5.QtWidgets import QProgressDialog
-        from PyQt5.QtCore import QTimer
-        import time
-        
-        # Create progress dialog
-        progress = QProgressDialog("Uninstalling applications...", "Cancel", 0, len(selected_items), self)
-        progress.setWindowModality(2)  # Qt.WindowModal
-        progress.setAutoClose(True)
-        progress.setAutoReset(True)
-        
-        successful_uninstalls = []
-        failed_uninstalls = []
         
-        for i, item in enumerate(selected_items):
-            if progress.wasCanceled():
-                break
-            
+        packages = []
+        for item in selected_items:
             app_info = item.text()
             lines = app_info.split('\n')
             if len(lines) > 0:
@@ -1316,36 +1157,29 @@ class InstalledAppsWidget(QWidget):
                     publisher_part = publisher_line.split("📦")[1].split("•")[0].strip()
                     if publisher_part and not publisher_part == "Unknown":
                         app_id = f"{publisher_part}.{app_name.replace(' ', '')}"
-            
-            progress.setLabelText(f"Uninstalling: {app_name}")
-            progress.setValue(i)
-            
-            # Process events to keep UI responsive
-            QApplication.processEvents()
-            
-            try:
-                # Perform uninstallation
-                success = self.manager.uninstall_app(app_id)
-                if success:
-                    successful_uninstalls.append(app_name)
-                    # Add to installation history
-                    from .installation_history import InstallationHistoryManager
-                    history = InstallationHistoryManager()
-                    history.add_uninstallation(app_name, app_id, "success")
-                else:
-                    failed_uninstalls.append(app_name)
-                    # Add failed uninstallation to history
-                    from .installation_history import InstallationHistoryManager
-                    history = InstallationHistoryManager()
-                    history.add_uninstallation(app_name, app_id, "failed")
-            except Exception as e:
-                failed_uninstalls.append(f"{app_name} (Error: {str(e)})")
-                # Add failed uninstallation to history
-                from .installation_history import InstallationHistoryManager
-                history = InstallationHistoryManager()
-                history.add_uninstallation(app_name, app_id, "failed")
-        
-        progress.setValue(len(selected_items))
+            packages.append((app_name, app_id))
+        
+        # Create progress dialog
+        progress = QProgressDialog("Uninstalling applications...", "Cancel", 0, len(packages), self)
+        progress.setWindowModality(Qt.WindowModal)
+        
+        successful_uninstalls = []
+        failed_uninstalls = []
+        # Queued behind any other batch and journaled, see BatchJobQueue
+        batch = self.batch_jobs.submit("uninstall", packages)
+        batch.item_started.connect(
+            lambda i, name: (progress.setValue(i), progress.setLabelText(f"Uninstalling: {name}")))
+        batch.item_finished.connect(
+            lambda name, package_id, success, seconds:
+            (successful_uninstalls if success else failed_uninstalls).append(name))
+        batch.batch_finished.connect(
+            lambda *_: self.on_batch_uninstall_finished(progress, successful_uninstalls, failed_uninstalls))
+        progress.canceled.connect(batch.cancel)
+        progress.show()
+        batch.start()
+    
+    def on_batch_uninstall_finished(self, progress, successful_uninstalls, failed_uninstalls):
+        progress.close()
         
         # Show results
         result_message = f"Batch uninstallation completed!\n\n"
@@ -1369,123 +1203,6 @@ class InstalledAppsWidget(QWidget):
     
     def show_installation_history(self):
         """Show installation history dialog"""
-        from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLabel, QComboBox
-        from .installation_history import InstallationHistoryManager
-        
-        # Create dialog
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Installation History")
-        dialog.resize(800, 600)
-        
-        layout = QVBoxLayout()
-        
-        # Header with filter options
-        header_layout = QHBoxLayout()
-        header_layout.addWidget(QLabel("Filter:"))
-        
-        filter_combo = QComboBox()
-        filter_combo.addItems(["All", "Installations", "Uninstallations", "Successful", "Failed"])
-        header_layout.addWidget(filter_combo)
-        
-        header_layout.addStretch()
-        
-        # Stats button
-        stats_btn = QPushButton("📊 Show Statistics")
-        header_layout.addWidget(stats_btn)
-        
-        layout.addLayout(header_layout)
-        
-        # History display
-        history_text = QTextEdit()
-        history_text.setReadOnly(True)
-        layout.addWidget(history_text)
-        
-        # Load and display history
-        def load_history():
-            history_manager = InstallationHistoryManager()
-            history = history_manager.get_installation_history()
-            
-            filter_value = filter_combo.currentText().lower()
-            
-            if not history:
-                history_text.setPlainText("No installation history found.")
-                return
-            
-            # Filter history based on selection
-            filtered_history = history
-            if filter_value == "installations":
-                filtered_history = [h for h in history if h.get('operation') == 'install']
-            elif filter_value == "uninstallations":
-                filtered_history = [h for h in history if h.get('operation') == 'uninstall']
-            elif filter_value == "successful":
-                filtered_history = [h for h in history if h.get('status') == 'success']
-            elif filter_value == "failed":
-                filtered_history = [h for h in history if h.get('status') == 'failed']
-            
-            # Format history for display
-            history_display = []
-            for entry in filtered_history:
-                timestamp = entry.get('timestamp', 'Unknown time')
-                app_name = entry.get('app_name', 'Unknown app')
-                operation = entry.get('operation', 'unknown').title()
-                status = entry.get('status', 'unknown')
-                
-                status_emoji = "✅" if status == "success" else "❌" if status == "failed" else "⚠️"
-                operation_emoji = "📦" if operation == "Install" else "🗑️"
-                
-                history_display.append(
-                    f"{operation_emoji} {operation} - {app_name}\n"
-                    f"   {status_emoji} Status: {status.title()}\n"
-                    f"   🕒 Time: {timestamp}\n"
-                )
-            
-            if history_display:
-                history_text.setPlainText("\n".join(history_display))
-            else:
-                history_text.setPlainText(f"No {filter_value} found in history.")
-        
-        def show_statistics():
-            history_manager = InstallationHistoryManager()
-            stats = history_manager.get_installation_stats()
-            
-            stats_text = f"""Installation Statistics:
-
-📊 Total Operations: {stats['total_operations']}
-
-📦 Installations:
-   • Successful: {stats['successful_installs']}
-   • Failed: {stats['failed_installs']}
-   • Total: {stats['total_installs']}
-
-🗑️ Uninstallations:
-   • Successful: {stats['successful_uninstalls']}
-   • Failed: {stats['failed_uninstalls']}
-   • Total: {stats['total_uninstalls']}
-
-📈 Success Rate:
-   • Overall: {stats['success_rate']:.1f}%
-   • Installations: {stats['install_success_rate']:.1f}%
-   • Uninstallations: {stats['uninstall_success_rate']:.1f}%
-"""
-            QMessageBox.information(dialog, "Installation Statistics", stats_text)
-        
-        # Connect signals
-        filter_combo.currentTextChanged.connect(lambda: load_history())
-        stats_btn.clicked.connect(show_statistics)
-        
-        # Load initial history
-        load_history()
-        
-        # Close button
-        button_layout = QHBoxLayout()
-        button_layout.addStretch()
-        
-        close_btn = QPushButton("Close")
-        close_btn.clicked.connect(dialog.accept)
-        button_layout.addWidget(close_btn)
-        
-        layout.addLayout(button_layout)
-        dialog.setLayout(layout)
-        
-        # Show dialog
-        dialog.exec_()
\ No newline at end of file
+        from dialogs import HistoryDialog
+        dialog = HistoryDialog(self.history, self, self.config)
+        dialog.exec_()
@@ -1,78 +1,774 @@
+import os
+import re
 import subprocess
+import sys
 import threading
 import time
-from cache_manager import CacheManager
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from cache_manager import CacheManager, CachePolicy, LRUCache
+from catalog_index import CatalogIndex, relevance, write_catalog
+from metrics import metrics
+from profiling import profiled
+from resilience import FAILURE_NETWORK, FAILURE_TIMEOUT, Resilience, classify_failure, command_source
+from state_store import default_state_dir
+from typing import Callable, Dict, List, Optional
+
+# Header names as printed by an English winget, mapped to record keys
+TABLE_COLUMNS = {"name": "name", "id": "id", "version": "version",
+                 "available": "available", "match": "match", "source": "source"}
+# Used when the headers are localized: winget always prints Name, Id, Version first
+POSITIONAL_COLUMNS = ["name", "id", "version", "available", "source"]
+
+# A recent failure for a cache key is remembered under this prefix so the
+# command is not retried on every call while winget or a source is down
+ERROR_KEY_PREFIX = "error:"
+
+# Local snapshot of the winget source used for instant fuzzy search. Every
+# package id has a dot, so an id filter of "." lists the whole source.
+CATALOG_DIR_NAME = "catalog"
+CATALOG_DIR_KEY = "catalog_dir"
+CATALOG_SOURCE = "winget"
+CATALOG_COMMAND = ["winget", "search", "--id", ".", "--source", CATALOG_SOURCE, "--accept-source-agreements"]
+CATALOG_MAX_AGE = 24 * 3600
+CATALOG_TIMEOUT = 300
+
+# Per-source search: the sources to query (default: every configured winget
+# source) and how long any one of them may take
+SEARCH_SOURCES_KEY = "search_sources"
+SOURCE_TIMEOUT_KEY = "search_source_timeout"
+SOURCE_TIMEOUT = 20
+# winget itself is killed at the timeout; the margin covers spawning it
+SOURCE_TIMEOUT_MARGIN = 5
+
+# Paged search: rows per page, and the most winget's --count accepts
+SEARCH_PAGE_SIZE = 50
+WINGET_MAX_COUNT = 1000
+
+# Package details from `winget show`: how many stay decoded in memory, and
+# the small pool that fetches details for rows the user is looking at
+DETAILS_LRU_SIZE = 256
+PREFETCH_WORKERS = 2
+PREFETCH_LIMIT = 20
+# Prefetches must not compete with the winget processes the user started
+LOW_PRIORITY_FLAGS = getattr(subprocess, "BELOW_NORMAL_PRIORITY_CLASS", 0)
+
+# Raw output of the most recent winget runs, kept for the debug viewer so a
+# parse problem can be looked at without running winget again
+RAW_OUTPUT_HISTORY = 20
+RAW_OUTPUT_MAX_CHARS = 256 * 1024  # per stream; a full catalog listing is megabytes
+RAW_COMMANDS = {
+    "list": ["winget", "list", "--accept-source-agreements"],
+    "upgrade": ["winget", "upgrade", "--accept-source-agreements"],
+}
+
+
+def catalog_dir(config=None) -> str:
+    """Folder of the search catalog, shared by every user of the machine where possible
+    
+    The catalog_dir config key wins. On Windows it is otherwise
+    %ProgramData%\\Winstaller\\catalog, so users of a terminal server map
+    one copy; elsewhere, when WINSTALLER_HOME is set or when that folder
+    can't be created, it is the catalog folder in the user's state folder.
+    """
+    configured = config.get(CATALOG_DIR_KEY) if config else None
+    if configured:
+        return configured
+    per_user = os.path.join(default_state_dir(), CATALOG_DIR_NAME)
+    program_data = os.environ.get("PROGRAMDATA")
+    if sys.platform != "win32" or not program_data or os.environ.get("WINSTALLER_HOME"):
+        return per_user
+    shared = os.path.join(program_data, "Winstaller", CATALOG_DIR_NAME)
+    try:
+        os.makedirs(shared, exist_ok=True)
+    except OSError:
+        return per_user
+    return shared
+
+
+def _on_gui_thread() -> bool:
+    """Whether the caller is a running Qt application's GUI thread"""
+    qt_core = sys.modules.get("PyQt5.QtCore")
+    if qt_core is None:
+        return False
+    app = qt_core.QCoreApplication.instance()
+    return app is not None and qt_core.QThread.currentThread() == app.thread()
+
+
+def _is_separator(line: str) -> bool:
+    stripped = line.strip()
+    return len(stripped) >= 10 and set(stripped) == {"-"}
+
+
+@profiled("parse")
+def parse_winget_table(output: str) -> List[Dict[str, str]]:
+    """Parse winget's column-aligned table output into records
+
+    Column boundaries come from the header line above each dashed separator,
+    so names with spaces are kept whole. Output can contain more than one
+    table (e.g. upgrades that need explicit targeting); each is parsed with
+    its own header. Rows without an id, such as "3 upgrades available.",
+    are skipped.
+    """
+    # Progress spinners are redrawn with carriage returns; keep the final text
+    lines = [line.split("\r")[-1].rstrip() for line in output.splitlines()]
+    separators = [i for i, line in enumerate(lines) if i > 0 and _is_separator(line)]
+    
+    records = []
+    for n, separator in enumerate(separators):
+        header = lines[separator - 1]
+        starts = [match.start() for match in re.finditer(r"\S+", header)]
+        titles = [match.group().lower() for match in re.finditer(r"\S+", header)]
+        keys = [TABLE_COLUMNS.get(title) or (POSITIONAL_COLUMNS[i] if i < len(POSITIONAL_COLUMNS) else title)
+                for i, title in enumerate(titles)]
+        end = separators[n + 1] - 1 if n + 1 < len(separators) else len(lines)
+        
+        for line in lines[separator + 1:end]:
+            if not line.strip():
+                continue
+            record = {}
+            for i, key in enumerate(keys):
+                stop = starts[i + 1] if i + 1 < len(starts) else None
+                record[key] = line[starts[i]:stop].strip()
+            if record.get("name") and record.get("id") and " " not in record["id"]:
+                records.append(record)
+    return records
+
+
+# Sections of `winget show` whose indented lines are fields of their own;
+# indented lines under any other field continue its value
+SHOW_SECTIONS = ("installer", "agreements", "documentation")
+
+
+@profiled("parse")
+def parse_winget_show(output: str) -> Dict[str, str]:
+    """Parse `winget show` output into a dict of lower-cased field names
+
+    The "Found Name [Id]" line gives name and id. Values continued on
+    indented lines (Description, Release Notes, Tags) are joined with
+    newlines. Fields of a section such as Installer are prefixed with the
+    section name unless they already start with it ("installer type",
+    "installer url", "agreements category").
+    """
+    details = {}
+    section = None
+    current = None
+    for raw in output.splitlines():
+        line = raw.split("\r")[-1].rstrip()
+        if not line.strip():
+            continue
+        found = re.match(r"^Found (.+) \[(\S+)\]$", line)
+        if found:
+            details["name"], details["id"] = found.group(1), found.group(2)
+            continue
+        
+        key, sep, value = line.strip().partition(":")
+        is_field = bool(sep and key) and (value == "" or value.startswith(" "))
+        if not line.startswith(" "):
+            if not is_field:
+                continue
+            current = key.lower()
+            section = current if current in SHOW_SECTIONS else None
+            details[current] = value.strip()
+        elif section and is_field:
+            name = key.lower()
+            current = name if name.startswith(section) else f"{section} {name}"
+            details[current] = value.strip()
+        elif current:
+            details[current] = f"{details[current]}\n{line.strip()}".strip()
+    return details
+
+
+def _stream_process(process: subprocess.Popen, timeout: float,
+                    on_output: Callable[[str, str], None]):
+    """Wait for process like communicate(), passing each line to on_output as it arrives
+    
+    on_output gets the stream name ("stdout" or "stderr") and the line, and
+    is called from reader threads. Returns (stdout, stderr); on timeout kills
+    the process and raises TimeoutExpired.
+    """
+    captured = {"stdout": [], "stderr": []}
+    
+    def pump(name, pipe):
+        for line in pipe:
+            captured[name].append(line)
+            try:
+                on_output(name, line)
+            except Exception as e:
+                print(f"Output callback error: {e}")
+    
+    readers = [threading.Thread(target=pump, args=(name, pipe), daemon=True)
+               for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))]
+    for reader in readers:
+        reader.start()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        raise
+    finally:
+        for reader in readers:
+            reader.join()
+    return "".join(captured["stdout"]), "".join(captured["stderr"])
+
+
+def format_raw_output(entry: Dict) -> str:
+    """Text of a captured winget run, as shown by the debug viewer"""
+    returncode = "timed out" if entry["returncode"] is None else entry["returncode"]
+    text = (f"Command: {' '.join(entry['command'])}\n"
+            f"Started: {entry['time']} ({entry['seconds']:.1f} s)\n"
+            f"Return code: {returncode}\n\n"
+            f"STDOUT:\n{entry['stdout']}\n\n"
+            f"STDERR:\n{entry['stderr']}")
+    if entry["truncated"]:
+        text += f"\n\n(output cut to the first {RAW_OUTPUT_MAX_CHARS} characters)"
+    return text
+
+
+def merge_search_results(query: str, results_by_source: Dict[str, List[Dict[str, str]]],
+                         source_order: List[str]) -> List[Dict[str, str]]:
+    """Merge per-source search records into one ranked list without duplicates
+
+    A package offered by several sources appears once, taken from the
+    earliest source in source_order, with every source listed under
+    "sources". Results are ranked by relevance to the query, then by source
+    order, then by name.
+    """
+    rank = {source: i for i, source in enumerate(source_order)}
+    merged = {}
+    for source in sorted(results_by_source, key=lambda source: rank.get(source, len(rank))):
+        for record in results_by_source[source]:
+            key = record["id"].lower()
+            if key in merged:
+                merged[key]["sources"].append(source)
+            else:
+                merged[key] = dict(record, source=source, sources=[source])
+    return sorted(merged.values(), key=lambda record: (
+        -relevance(query, record["name"], record["id"]),
+        rank.get(record["source"], len(rank)),
+        record["name"].lower()))
+
 
 class WingetManager:
-    def __init__(self):
+    def __init__(self, config=None):
+        self.config = config
+        # Thread-safe and shared with other running instances, see CacheManager
         self.cache = CacheManager()
-        self._installed_apps_cache = None
-        self._cache_lock = threading.Lock()
+        self.cache_policy = CachePolicy(config)
+        # Memory-mapped, so its pages are shared with other running instances
+        self.catalog = CatalogIndex(catalog_dir(config))
+        self.details = LRUCache(DETAILS_LRU_SIZE)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._listeners = []
+        self._prefetch_pool = None
+        self._prefetches = {}  # package id -> Future of a pending prefetch
+        # Cancelling runs the done callback, which takes the lock again
+        self._prefetch_lock = threading.RLock()
+        self._raw_outputs = deque(maxlen=RAW_OUTPUT_HISTORY)
+        self._raw_outputs_lock = threading.Lock()
+        # Retries and per-source circuit breakers, see resilience.py
+        self.resilience = Resilience(config)
+    
+    def _single_flight(self, key: str, fetch: Callable[[], List[str]]) -> List[str]:
+        """Run fetch once for concurrent callers asking for the same key
+        
+        Startup prewarm and a user click can ask for the same winget listing at
+        the same time; the second caller waits for the first call's result
+        instead of spawning another winget process.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not is_owner:
+            return future.result()
+        
+        try:
+            result = fetch()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def _run_winget(self, operation: str, cmd: List[str], timeout: float,
+                    low_priority: bool = False,
+                    on_output: Optional[Callable[[str, str], None]] = None) -> subprocess.CompletedProcess:
+        """Run winget like subprocess.run, retrying transient failures
+        
+        Failures are classified from the exit code and output; network and
+        installer-busy failures are retried with jittered backoff and the
+        last run is returned. On the Qt GUI thread the first failure is
+        returned instead, since a backoff wait there would freeze the window.
+        While the breaker of the command's source is open this raises
+        CircuitOpenError, an OSError, without starting winget. See
+        resilience.py.
+        """
+        source = command_source(cmd)
+        attempts = self.resilience.attempts()
+        for attempt in range(attempts):
+            self.resilience.before_run(operation, source)
+            try:
+                result = self._run_winget_once(operation, cmd, timeout, low_priority, on_output)
+            except subprocess.TimeoutExpired:
+                self.resilience.after_run(operation, source, FAILURE_TIMEOUT)
+                raise
+            output = "" if result.returncode == 0 else (result.stdout or "") + (result.stderr or "")
+            failure = classify_failure(result.returncode, output)
+            self.resilience.after_run(operation, source, failure, output)
+            if attempt + 1 == attempts or not self.resilience.retryable(operation, failure):
+                return result
+            if _on_gui_thread():
+                metrics.increment(f"winget.{operation}.retry_skipped")
+                return result
+            delay = self.resilience.delay(attempt)
+            metrics.increment(f"winget.{operation}.retries")
+            metrics.observe(f"winget.{operation}.backoff", delay * 1000)
+            print(f"winget {operation} failed ({failure}, exit {result.returncode}), retrying in {delay:.1f} s")
+            time.sleep(delay)
+    
+    def _run_winget_once(self, operation: str, cmd: List[str], timeout: float,
+                         low_priority: bool = False,
+                         on_output: Optional[Callable[[str, str], None]] = None) -> subprocess.CompletedProcess:
+        """Run winget once, timing process start and the wait separately
+        
+        Records winget.<operation>.spawn and .wait durations plus counters for
+        failed starts, timeouts and non-zero exits, and keeps the raw output
+        for recent_raw_outputs(). With on_output, lines are also passed on as
+        they arrive, see _stream_process. Raises what subprocess.run would:
+        OSError when winget can't start, TimeoutExpired after killing it.
+        """
+        started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        start = time.perf_counter()
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                creationflags=LOW_PRIORITY_FLAGS if low_priority else 0
+            )
+        except OSError:
+            metrics.increment(f"winget.{operation}.spawn_failed")
+            raise
+        spawned = time.perf_counter()
+        metrics.observe(f"winget.{operation}.spawn", (spawned - start) * 1000)
+        
+        try:
+            if on_output is None:
+                stdout, stderr = process.communicate(timeout=timeout)
+            else:
+                stdout, stderr = _stream_process(process, timeout, on_output)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            metrics.increment(f"winget.{operation}.timeout")
+            self._keep_raw_output(operation, cmd, started_at, start, None, stdout, stderr)
+            raise
+        finally:
+            metrics.observe(f"winget.{operation}.wait", (time.perf_counter() - spawned) * 1000)
+        
+        metrics.increment(f"winget.{operation}.runs")
+        if process.returncode != 0:
+            metrics.increment(f"winget.{operation}.nonzero_exit")
+        self._keep_raw_output(operation, cmd, started_at, start, process.returncode, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+    
+    def _keep_raw_output(self, operation, cmd, started_at, start, returncode, stdout, stderr):
+        stdout = stdout or ""
+        stderr = stderr or ""
+        entry = {
+            "operation": operation,
+            "command": list(cmd),
+            "time": started_at,
+            "seconds": time.perf_counter() - start,
+            "returncode": returncode,
+            "stdout": stdout[:RAW_OUTPUT_MAX_CHARS],
+            "stderr": stderr[:RAW_OUTPUT_MAX_CHARS],
+            "truncated": len(stdout) > RAW_OUTPUT_MAX_CHARS or len(stderr) > RAW_OUTPUT_MAX_CHARS,
+        }
+        with self._raw_outputs_lock:
+            self._raw_outputs.append(entry)
+    
+    def recent_raw_outputs(self) -> List[Dict]:
+        """Raw output of the last RAW_OUTPUT_HISTORY winget runs, newest first"""
+        with self._raw_outputs_lock:
+            return list(reversed(self._raw_outputs))
+    
+    def _cached(self, operation: str, cache_key: str):
+        """Cached result for cache_key, or None when winget has to be asked
+        
+        Empty results are cached too (negative caching). After a failure the
+        last known data, or an empty list, is returned until the error entry
+        expires.
+        """
+        data = self.cache.get_cached_data(cache_key, self.cache_policy.base_ttl(operation))
+        if data is not None:
+            self._record_lookup(operation, "hit" if data else "negative_hit")
+            return data
+        
+        if self.cache.get_cached_data(ERROR_KEY_PREFIX + cache_key, self.cache_policy.error_ttl()) is not None:
+            self._record_lookup(operation, "error_backoff")
+            stale = self.cache.get_stale_data(cache_key)
+            return stale if stale is not None else []
+        
+        self._record_lookup(operation, "miss")
+        return None
+    
+    def _record_lookup(self, operation: str, outcome: str):
+        self.cache.stats.record(operation, outcome)
+        metrics.increment(f"cache.{operation}.{outcome}")
+    
+    def _store(self, operation: str, cache_key: str, data, partial: bool = False):
+        """Cache fresh data with a TTL chosen by the cache policy"""
+        ttl = self.cache_policy.ttl_for(operation, cache_key, data, partial)
+        self.cache.set_cached_data(cache_key, data, ttl)
+    
+    def _store_error(self, operation: str, cache_key: str, error: Exception):
+        """Remember a failed fetch for a short while"""
+        self.cache.set_cached_data(ERROR_KEY_PREFIX + cache_key, [str(error)], self.cache_policy.error_ttl())
+    
+    def _fetch_failed(self, operation: str, cache_key: str, error: Exception) -> List:
+        """Remember a failed fetch and fall back to the last known data, however old"""
+        self._store_error(operation, cache_key, error)
+        stale = self.cache.get_stale_data(cache_key)
+        if stale is None:
+            return []
+        metrics.increment(f"cache.{operation}.stale_fallback")
+        return stale
     
-    def search(self, query: str, use_cache: bool = True) -> List[str]:
-        """Search for applications with caching"""
+    def search(self, query: str, use_cache: bool = True, page: Optional[int] = None,
+               page_size: int = SEARCH_PAGE_SIZE) -> List[str]:
+        """Search for applications with caching
+        
+        A fresh local catalog answers for the winget source without running
+        `winget search`, merged with the other sources' results, see
+        _search_with_catalog. use_cache=False skips the cached copy and the
+        catalog but still stores the new result.
+        
+        With page set, only that page of page_size results is returned and
+        each page is cached on its own. A full page means there may be more
+        (see has_more_pages).
+        """
         if not query or len(query.strip()) < 2:
             return []
+        if page is not None and not self.has_more_pages(page - 1, page_size):
+            return []
         
         cache_key = f"search_{query.lower().strip()}"
+        limit = None
+        if page is not None:
+            cache_key += f"#{page_size}:{page}"
+            limit = (page + 1) * page_size
         
-        # Try cache first (5 minute expiry for searches)
         if use_cache:
-            cached_result = self.cache.get_cached_data(cache_key, max_age_seconds=300)
+            cached_result = self._cached("search", cache_key)
             if cached_result is not None:
                 return cached_result
+            
+            catalog_result = self._search_with_catalog(query, limit, page_size)
+            if catalog_result is not None:
+                return catalog_result
+        
+        apps = self._single_flight(cache_key, lambda: self._fetch_search(query, cache_key, limit, page_size))
+        if not apps and use_cache and not page:
+            # Nothing under that spelling; typo-tolerant catalog matches may be what was meant
+            return self.search_catalog(query, page_size if page == 0 else 100)
+        return apps
+    
+    @staticmethod
+    def has_more_pages(page: int, page_size: int = SEARCH_PAGE_SIZE, rows: Optional[int] = None) -> bool:
+        """Whether the page after `page` can exist, given how many rows `page` had"""
+        if page < 0:
+            return True
+        if rows is not None and rows < page_size:
+            return False
+        return (page + 1) * page_size < WINGET_MAX_COUNT
+    
+    def _fetch_search(self, query: str, cache_key: str, limit: Optional[int] = None,
+                      page_size: int = SEARCH_PAGE_SIZE) -> List[str]:
+        """Run winget search and cache the parsed results, including no results
         
+        winget has no offset, so a page is the tail of a --count window that
+        ends where the page ends; only that tail is parsed into results.
+        """
+        cmd = ["winget", "search", query, "--accept-source-agreements"]
+        if limit is not None:
+            cmd += ["--count", str(limit)]
         try:
-            result = subprocess.run(
-                ["winget", "search", query, "--accept-source-agreements"],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=30  # Add timeout to prevent hanging
-            )
+            result = self._run_winget("search", cmd, 30)  # Add timeout to prevent hanging
             
             if result.stdout is None:
                 return []
             
-            lines = result.stdout.splitlines()
-            apps = []
-            
-            for line in lines:
-                # Skip header and separator lines more efficiently
-                if not line.strip() or line.startswith(("Name", "-", "No package")):
-                    continue
-                
-                # More robust parsing
-                parts = line.split(None, 2)  # Split into max 3 parts
-                if len(parts) >= 2:
-                    name = parts[0]
-                    app_id = parts[1]
-                    # Create more informative display format
-                    apps.append(f"{name} ({app_id})")
+            with metrics.timer("winget.search.parse"):
+                records = parse_winget_table(result.stdout)
+            if limit is not None:
+                records = records[limit - page_size:limit]
+            if not records and classify_failure(result.returncode, result.stdout) == FAILURE_NETWORK:
+                # Not "no results": the sources could not be reached
+                return self._fetch_failed("search", cache_key, OSError(f"winget exited with {result.returncode}"))
+            apps = [f"{record['name']} ({record['id']})" for record in records]
             
-            # Cache the results
-            if use_cache and apps:
-                self.cache.set_cached_data(cache_key, apps)
+            # "No package found" is cached as well, with the shorter negative TTL
+            self._store("search", cache_key, apps)
             
             return apps
             
         except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
             print(f"Search error: {e}")
-            return []
+            return self._fetch_failed("search", cache_key, e)
 
+    def list_sources(self, use_cache: bool = True) -> List[str]:
+        """Names of the sources to search, from config or `winget source list`"""
+        configured = self.config.get(SEARCH_SOURCES_KEY) if self.config else None
+        if configured:
+            return list(configured)
+        
+        cache_key = "sources"
+        if use_cache:
+            cached_result = self._cached("sources", cache_key)
+            if cached_result is not None:
+                return cached_result
+        
+        def fetch():
+            try:
+                result = self._run_winget("sources", ["winget", "source", "list"], 30)
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
+                print(f"Source list error: {e}")
+                return self._fetch_failed("sources", cache_key, e)
+            # The table is Name, Argument; the argument (URL) lands in "id"
+            sources = [record["name"] for record in parse_winget_table(result.stdout or "")]
+            self._store("sources", cache_key, sources, partial=result.returncode != 0)
+            return sources
+        
+        return self._single_flight(cache_key, fetch)
+    
+    def search_sources(self, query: str, on_source_results: Optional[Callable[[str, List[Dict[str, str]]], None]] = None,
+                       use_cache: bool = True) -> List[Dict[str, str]]:
+        """Search every source concurrently and merge the results
+        
+        on_source_results(source, records) is called from a worker thread as
+        each source finishes, so results can be shown before the slowest
+        source answers. A source that exceeds the per-source timeout is
+        left out of the merged list.
+        """
+        if not query or len(query.strip()) < 2:
+            return []
+        sources = self.list_sources()
+        if not sources:
+            return []
+        timeout = self.config.get(SOURCE_TIMEOUT_KEY, SOURCE_TIMEOUT) if self.config else SOURCE_TIMEOUT
+        
+        results = {}
+        merged = threading.Event()
+        def run(source):
+            records = self.search_source(query, source, timeout, use_cache)
+            results[source] = records
+            # A source that answers after the merge only warms the cache
+            if on_source_results and not merged.is_set():
+                try:
+                    on_source_results(source, records)
+                except Exception as e:
+                    print(f"Search listener error: {e}")
+        
+        pool = ThreadPoolExecutor(max_workers=len(sources))
+        try:
+            wait([pool.submit(run, source) for source in sources], timeout=timeout + SOURCE_TIMEOUT_MARGIN)
+        finally:
+            merged.set()
+            pool.shutdown(wait=False)
+        return merge_search_results(query, dict(results), sources)
+    
+    def search_source(self, query: str, source: str, timeout: float = SOURCE_TIMEOUT,
+                      use_cache: bool = True) -> List[Dict[str, str]]:
+        """Search one source, returning records with name, id, version and source"""
+        cache_key = f"search:{source}:{query.lower().strip()}"
+        if use_cache:
+            cached_result = self._cached("search", cache_key)
+            if cached_result is not None:
+                return cached_result
+        
+        def fetch():
+            try:
+                result = self._run_winget(
+                    "search_source", ["winget", "search", query, "--source", source, "--accept-source-agreements"],
+                    timeout)
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
+                print(f"Search error in {source}: {e}")
+                return self._fetch_failed("search", cache_key, e)
+            
+            # With --source winget omits the Source column
+            with metrics.timer("winget.search_source.parse"):
+                records = [dict(record, source=source) for record in parse_winget_table(result.stdout or "")]
+            if not records and classify_failure(result.returncode, result.stdout) == FAILURE_NETWORK:
+                return self._fetch_failed("search", cache_key, OSError(f"winget exited with {result.returncode}"))
+            self._store("search", cache_key, records)
+            return records
+        
+        return self._single_flight(cache_key, fetch)
+    
+    def search_catalog(self, query: str, limit: int = 100) -> List[str]:
+        """Fuzzy matches from the local catalog, empty when it is missing or stale"""
+        return [f"{record['name']} ({record['id']})" for record in self._catalog_records(query, limit)]
+    
+    def _catalog_records(self, query: str, limit: int) -> List[Dict[str, str]]:
+        age = self.catalog.age_seconds()
+        if age is None or age > CATALOG_MAX_AGE:
+            return []
+        return self.catalog.search(query, limit)
+    
+    def _search_with_catalog(self, query: str, limit: Optional[int],
+                             page_size: int = SEARCH_PAGE_SIZE) -> Optional[List[str]]:
+        """Catalog matches merged with the other sources' results; None to ask winget
+        
+        The catalog only holds the winget source, so it answers only when
+        that source is searched and has real matches, i.e. names or ids
+        containing the query. Typo-tolerant matches alone don't answer, so
+        winget's own search and ranking aren't replaced by weak guesses.
+        Every other source is searched on its own (from its cache when it
+        can be) and merged in, so store packages still show up.
+        """
+        sources = self.list_sources()
+        if CATALOG_SOURCE not in sources:
+            return None
+        records = [record for record in self._catalog_records(query, limit or 100)
+                   if relevance(query, record["name"], record["id"]) > 0]
+        if not records:
+            return None
+        metrics.increment("search.catalog_answers")
+        
+        timeout = self.config.get(SOURCE_TIMEOUT_KEY, SOURCE_TIMEOUT) if self.config else SOURCE_TIMEOUT
+        results = {CATALOG_SOURCE: records}
+        for source in sources:
+            if source != CATALOG_SOURCE:
+                results[source] = self.search_source(query, source, timeout)
+        apps = [f"{record['name']} ({record['id']})" for record in merge_search_results(query, results, sources)]
+        return apps[limit - page_size:limit] if limit else apps
+    
+    def refresh_catalog(self, force: bool = False) -> int:
+        """Rebuild the local catalog from winget if it is missing or stale
+        
+        Returns the number of packages in the catalog. The new snapshot
+        replaces the old one atomically, so searches running meanwhile, here
+        or in another instance, keep using the previous one.
+        """
+        age = self.catalog.age_seconds()
+        if not force and age is not None and age <= CATALOG_MAX_AGE:
+            return len(self.catalog)
+        
+        def fetch():
+            try:
+                result = self._run_winget("catalog", CATALOG_COMMAND, CATALOG_TIMEOUT)
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
+                print(f"Catalog refresh error: {e}")
+                return len(self.catalog)
+            
+            with metrics.timer("winget.catalog.parse"):
+                records = parse_winget_table(result.stdout or "")
+            # A failed or truncated listing must not replace a good snapshot
+            if result.returncode != 0 or not records:
+                print(f"Catalog refresh skipped: winget returned {result.returncode} with {len(records)} packages")
+                return len(self.catalog)
+            try:
+                write_catalog(self.catalog.directory, records)
+            except OSError as e:
+                # e.g. a shared catalog folder this user may read but not replace
+                print(f"Catalog refresh skipped: {e}")
+                return len(self.catalog)
+            return len(records)
+        
+        return self._single_flight("catalog", fetch)
+    
+    def cached_details(self, package_id: str) -> Optional[Dict[str, str]]:
+        """Details already in memory, without running winget"""
+        return self.details.get(package_id)
+    
+    def show(self, package_id: str, use_cache: bool = True, low_priority: bool = False) -> Dict[str, str]:
+        """Package details (description, publisher, homepage, ...) from `winget show`
+        
+        Looked up in the in-memory LRU first, then the persistent cache.
+        An empty dict means the details could not be fetched.
+        """
+        if use_cache:
+            details = self.details.get(package_id)
+            if details is not None:
+                return details
+        
+        cache_key = f"show_{package_id}"
+        if use_cache:
+            cached_result = self._cached("show", cache_key)
+            if cached_result is not None:
+                details = cached_result[0] if cached_result else {}
+                self.details.put(package_id, details)
+                return details
+        
+        def fetch():
+            try:
+                result = self._run_winget(
+                    "show", ["winget", "show", "--id", package_id, "--exact", "--accept-source-agreements"], 30,
+                    low_priority=low_priority)
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
+                print(f"Show error for {package_id}: {e}")
+                stale = self._fetch_failed("show", cache_key, e)
+                return stale[0] if stale else {}
+            
+            with metrics.timer("winget.show.parse"):
+                details = parse_winget_show(result.stdout or "") if result.returncode == 0 else {}
+            # Cached as a one-element list so "not found" is cached negatively
+            self._store("show", cache_key, [details] if details else [])
+            self.details.put(package_id, details)
+            return details
+        
+        return self._single_flight(cache_key, fetch)
+    
+    def prefetch_details(self, package_ids: List[str]):
+        """Fetch details for these packages in the background, in order
+        
+        Prefetches still queued for packages not in the list are cancelled,
+        so calling this with the rows currently on screen keeps the queue
+        relevant as the user scrolls. At most PREFETCH_LIMIT are queued.
+        """
+        wanted = [package_id for package_id in dict.fromkeys(package_ids)
+                  if package_id and package_id not in self.details][:PREFETCH_LIMIT]
+        with self._prefetch_lock:
+            for package_id, future in list(self._prefetches.items()):
+                if package_id not in wanted and future.cancel():
+                    self._prefetches.pop(package_id, None)
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS,
+                                                         thread_name_prefix="details-prefetch")
+            for package_id in wanted:
+                if package_id not in self._prefetches:
+                    future = self._prefetch_pool.submit(self.show, package_id, low_priority=True)
+                    future.add_done_callback(lambda _, package_id=package_id: self._prefetch_done(package_id))
+                    self._prefetches[package_id] = future
+    
+    def cancel_prefetch(self):
+        """Drop every queued prefetch; ones already running finish into the cache"""
+        self.prefetch_details([])
+    
+    def _prefetch_done(self, package_id: str):
+        with self._prefetch_lock:
+            future = self._prefetches.get(package_id)
+            if future is not None and future.done():
+                self._prefetches.pop(package_id, None)
+    
     def install(self, app_name: str) -> bool:
         """Install application with better error handling"""
         try:
-            result = subprocess.run(
-                ["winget", "install", "--silent", "--accept-package-agreements", "--accept-source-agreements", app_name],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=600  # 10 minute timeout for installations
-            )
+            result = self._run_winget("install", [
+                "winget", "install", "--silent", "--accept-package-agreements", "--accept-source-agreements", app_name
+            ], 600)  # 10 minute timeout for installations
             
             success = result.returncode == 0
             
@@ -89,12 +785,7 @@ class WingetManager:
     def uninstall(self, app_name: str) -> bool:
         """Uninstall application with better error handling"""
         try:
-            result = subprocess.run(
-                ["winget", "uninstall", "--silent", app_name], 
-                capture_output=True, 
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
+            result = self._run_winget("uninstall", ["winget", "uninstall", "--silent", app_name], 300)  # 5 minute timeout
             
             success = result.returncode == 0
             
@@ -111,12 +802,9 @@ class WingetManager:
     def upgrade(self, app_name: str) -> bool:
         """Upgrade application with better error handling"""
         try:
-            result = subprocess.run(
-                ["winget", "upgrade", "--silent", "--accept-package-agreements", "--accept-source-agreements", app_name], 
-                capture_output=True, 
-                text=True,
-                timeout=600  # 10 minute timeout
-            )
+            result = self._run_winget("upgrade", [
+                "winget", "upgrade", "--silent", "--accept-package-agreements", "--accept-source-agreements", app_name
+            ], 600)  # 10 minute timeout
             
             success = result.returncode == 0
             
@@ -132,209 +820,130 @@ class WingetManager:
 
     def list_installed(self, use_cache: bool = True) -> List[str]:
         """Get list of installed applications with caching and improved parsing"""
-        cache_key = "installed_apps"
+        apps = []
+        seen = set()
+        for record in self.list_installed_records(use_cache):
+            display_text = self._format_installed(record)
+            # Remove duplicates while preserving order
+            if display_text and display_text not in seen:
+                seen.add(display_text)
+                apps.append(display_text)
+        return apps
+
+    def list_installed_records(self, use_cache: bool = True) -> List[Dict[str, str]]:
+        """Get installed packages as records with name, id, version, available and source"""
+        cache_key = "installed_records"
         
-        # Try cache first (2 minute expiry for installed apps)
         if use_cache:
-            with self._cache_lock:
-                cached_result = self.cache.get_cached_data(cache_key, max_age_seconds=120)
-                if cached_result is not None:
-                    return cached_result
+            cached_result = self._cached("installed", cache_key)
+            if cached_result is not None:
+                return cached_result
         
-        try:
-            result = subprocess.run(
-                ["winget", "list", "--accept-source-agreements"],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=45  # Timeout for list operations
-            )
-            
-            if result.stdout is None:
-                return []
-            
-            lines = result.stdout.splitlines()
-            apps = []
-            header_found = False
-            
-            for line_num, line in enumerate(lines):
-                # Skip empty lines
-                if not line.strip():
-                    continue
-                
-                # Look for the header line to know when data starts
-                if "Name" in line and "Id" in line:
-                    header_found = True
-                    continue
-                
-                # Skip lines before header
-                if not header_found:
-                    continue
-                
-                # Skip separator lines (lines with just dashes)
-                if line.strip().replace('-', '').replace(' ', '') == '':
-                    continue
-                
-                # Skip informational lines
-                if line.startswith(("The following", "No package", "Found")):
-                    continue
-                
-                # Try to parse the line more carefully
-                # winget list output is typically: Name   Id   Version   Available   Source
-                try:
-                    # Handle lines with multiple spaces/tabs
-                    cleaned_line = ' '.join(line.split())
-                    
-                    # Skip if line is too short or looks like a continuation
-                    if len(cleaned_line) < 3:
-                        continue
-                    
-                    # Try to extract meaningful parts
-                    parts = cleaned_line.split()
-                    
-                    if len(parts) >= 1:
-                        name = parts[0]
-                        
-                        # Skip if name looks invalid (too short, only special chars, etc.)
-                        if len(name) < 2 or name.replace('.', '').replace('-', '').replace('_', '') == '':
-                            continue
-                        
-                        # Try to get ID and version
-                        app_id = parts[1] if len(parts) > 1 else ""
-                        version = parts[2] if len(parts) > 2 else "Unknown"
-                        
-                        # Clean up the version field (remove extra info)
-                        if version and len(version) > 20:  # Truncate very long versions
-                            version = version[:20] + "..."
-                        
-                        # Format the display string
-                        if app_id and app_id != name and len(app_id) > 1:
-                            # Only show ID if it's different from name and meaningful
-                            if not app_id.startswith('…') and len(app_id.replace('.', '').replace('-', '')) > 0:
-                                display_text = f"{name} ({app_id}) - v{version}"
-                            else:
-                                display_text = f"{name} - v{version}"
-                        else:
-                            display_text = f"{name} - v{version}"
-                        
-                        # Final validation - skip if display text looks corrupted
-                        if len(display_text.strip()) > 5 and not display_text.startswith('…'):
-                            apps.append(display_text)
-                        
-                except (IndexError, ValueError) as e:
-                    # Skip malformed lines
-                    print(f"Skipping malformed line {line_num}: {line[:50]}... Error: {e}")
-                    continue
-            
-            # Remove duplicates while preserving order
-            seen = set()
-            unique_apps = []
-            for app in apps:
-                if app not in seen:
-                    seen.add(app)
-                    unique_apps.append(app)
-            
-            # Cache the results
-            if use_cache and unique_apps:
-                with self._cache_lock:
-                    self.cache.set_cached_data(cache_key, unique_apps)
-            
-            return unique_apps
-            
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
-            print(f"List installed error: {e}")
-            return []
+        return self._single_flight(cache_key, lambda: self._fetch_records(
+            "installed", ["winget", "list", "--accept-source-agreements"], 45, cache_key))
 
     def get_upgradeable(self, use_cache: bool = True) -> List[str]:
         """Get list of applications that can be upgraded with caching"""
-        cache_key = "upgradeable_apps"
+        apps = []
+        for record in self.get_upgradeable_records(use_cache):
+            name = record["name"]
+            app_id = record["id"]
+            current_version = record.get("version") or "Unknown"
+            available_version = record.get("available") or "Unknown"
+            
+            if app_id and app_id != name:
+                apps.append(f"{name} ({app_id}) - v{current_version} → v{available_version}")
+            else:
+                apps.append(f"{name} - v{current_version} → v{available_version}")
+        return apps
+
+    def get_upgradeable_records(self, use_cache: bool = True) -> List[Dict[str, str]]:
+        """Get upgradeable packages as records with name, id, version, available and source"""
+        cache_key = "upgradeable_records"
         
-        # Try cache first (5 minute expiry for upgrade info)
         if use_cache:
-            cached_result = self.cache.get_cached_data(cache_key, max_age_seconds=300)
+            cached_result = self._cached("upgradeable", cache_key)
             if cached_result is not None:
                 return cached_result
         
+        return self._single_flight(cache_key, lambda: self._fetch_records(
+            "upgradeable", ["winget", "upgrade", "--accept-source-agreements"], 60, cache_key))
+
+    def add_listener(self, callback: Callable[[str, List[Dict[str, str]]], None]):
+        """Call callback(kind, records) whenever fresh installed/upgradeable data arrives"""
+        self._listeners.append(callback)
+
+    def _fetch_records(self, kind: str, cmd: List[str], timeout: int, cache_key: str) -> List[Dict[str, str]]:
+        """Run a winget listing command, parse its table and cache the records"""
         try:
-            result = subprocess.run(
-                ["winget", "upgrade", "--accept-source-agreements"],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=60  # Longer timeout for upgrade checks
-            )
-            
-            if result.stdout is None:
-                return []
-            
-            lines = result.stdout.splitlines()
-            apps = []
-            
-            for line in lines:
-                # Skip header and separator lines
-                if not line.strip() or line.startswith(("Name", "-", "No applicable", "Everything")):
-                    continue
-                
-                parts = line.split(None, 5)  # Split into max 6 parts
-                if len(parts) >= 4:
-                    name = parts[0]
-                    app_id = parts[1] if len(parts) > 1 else ""
-                    current_version = parts[2] if len(parts) > 2 else "Unknown"
-                    available_version = parts[3] if len(parts) > 3 else "Unknown"
-                    
-                    if app_id and app_id != name:
-                        apps.append(f"{name} ({app_id}) - v{current_version} → v{available_version}")
-                    else:
-                        apps.append(f"{name} - v{current_version} → v{available_version}")
-            
-            # Cache the results
-            if use_cache and apps:
-                self.cache.set_cached_data(cache_key, apps)
-            
-            return apps
-            
+            result = self._run_winget(kind, cmd, timeout)
         except (subprocess.TimeoutExpired, subprocess.CalledProcessError, OSError) as e:
-            print(f"Get upgradeable error: {e}")
+            print(f"winget {cmd[1]} error: {e}")
+            return self._fetch_failed(kind, cache_key, e)
+        
+        if result.stdout is None:
             return []
+        
+        with metrics.timer(f"winget.{kind}.parse"):
+            records = parse_winget_table(result.stdout)
+        metrics.increment(f"winget.{kind}.rows", len(records))
+        
+        # A failing exit code with some rows means the listing may be incomplete
+        self._store(kind, cache_key, records, partial=result.returncode != 0)
+        self._notify_listeners(kind, records)
+        return records
+    
+    def _notify_listeners(self, kind: str, records: List[Dict[str, str]]):
+        for listener in self._listeners:
+            try:
+                listener(kind, records)
+            except Exception as e:
+                print(f"Listener error: {e}")
+
+    @staticmethod
+    def _format_installed(record: Dict[str, str]) -> Optional[str]:
+        """Display text for an installed package, e.g. Name (Id) - vVersion"""
+        name = record["name"]
+        app_id = record.get("id", "")
+        version = record.get("version") or "Unknown"
+        
+        # Clean up the version field (remove extra info)
+        if len(version) > 20:  # Truncate very long versions
+            version = version[:20] + "..."
+        
+        # Only show ID if it's different from name and meaningful
+        if app_id and app_id != name and not app_id.startswith('…'):
+            display_text = f"{name} ({app_id}) - v{version}"
+        else:
+            display_text = f"{name} - v{version}"
+        
+        # Skip if display text looks corrupted
+        if len(display_text.strip()) <= 5 or display_text.startswith('…'):
+            return None
+        return display_text
     
     def _clear_install_caches(self):
         """Clear caches related to installed apps after install/uninstall operations"""
-        with self._cache_lock:
-            # Remove cached data that might be outdated
-            keys_to_remove = [key for key in self.cache.cache.keys() 
-                            if key in ["installed_apps", "upgradeable_apps"]]
-            for key in keys_to_remove:
-                if key in self.cache.cache:
-                    del self.cache.cache[key]
-            if keys_to_remove:
-                self.cache.save_cache()
+        # Remove cached data that might be outdated, and re-check sooner next time
+        self.cache.invalidate(["installed_records", "upgradeable_records"])
+        self.cache_policy.local_change(["installed", "upgradeable"])
     
     def clear_all_caches(self):
         """Clear all caches - useful for troubleshooting"""
         self.cache.clear_cache()
+        self.details.clear()
     
-    def get_raw_winget_output(self, command: str = "list") -> str:
-        """Get raw winget output for debugging purposes"""
+    def get_raw_winget_output(self, command: str = "list",
+                              on_output: Optional[Callable[[str, str], None]] = None) -> str:
+        """Run winget list or upgrade and return its raw output for debugging
+        
+        on_output receives each line as it arrives, see _run_winget.
+        """
+        cmd = RAW_COMMANDS.get(command)
+        if cmd is None:
+            return f"Unknown command: {command}"
         try:
-            if command == "list":
-                cmd = ["winget", "list", "--accept-source-agreements"]
-            elif command == "upgrade":
-                cmd = ["winget", "upgrade", "--accept-source-agreements"]
-            else:
-                return f"Unknown command: {command}"
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                timeout=30
-            )
-            
+            result = self._run_winget("raw", cmd, 30, on_output=on_output)
             return f"Command: {' '.join(cmd)}\nReturn code: {result.returncode}\n\nSTDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}"
-            
         except Exception as e:
-            return f"Error getting raw output: {str(e)}"
\ No newline at end of file
+            return f"Error getting raw output: {str(e)}"
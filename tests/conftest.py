@@ -0,0 +1,33 @@
+"""Shared fixtures: a private state folder and the fake winget on PATH
+
+Every test gets its own WINSTALLER_HOME, so the per-user state store, the
+cache and the daemon file never touch the real ones, and runs against
+benchmarks/fake_winget, so the suite works off Windows.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_WINGET_DIR = os.path.join(REPO_ROOT, "benchmarks", "fake_winget")
+sys.path.insert(0, os.path.join(REPO_ROOT, "src"))
+
+import state_store  # noqa: E402
+from metrics import metrics  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("WINSTALLER_HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("PATH", FAKE_WINGET_DIR + os.pathsep + os.environ.get("PATH", ""))
+    for name in list(os.environ):
+        if name.startswith("FAKE_WINGET_"):
+            monkeypatch.delenv(name)
+    state_store._default_store = None
+    metrics.reset()
+    yield tmp_path
+    if state_store._default_store is not None:
+        state_store._default_store.close()
+        state_store._default_store = None
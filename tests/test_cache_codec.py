@@ -0,0 +1,18 @@
+import cache_codec
+
+
+def test_records_round_trip_with_absent_keys():
+    records = [{"name": f"Mozilla Firefox {i}", "id": f"Mozilla.Firefox{i}", "version": "1.0"} for i in range(50)]
+    records += [{"name": "No Id"}, {"name": "Undotted", "id": "Undotted", "source": "msstore"}]
+    assert cache_codec.decode(cache_codec.encode(records)) == records
+
+
+def test_records_keep_key_order():
+    records = [{"version": "2", "name": "A", "id": "Pub.A"}]
+    decoded = cache_codec.decode(cache_codec.encode(records))
+    assert list(decoded[0]) == ["version", "name", "id"]
+
+
+def test_strings_and_json_round_trip():
+    assert cache_codec.decode(cache_codec.encode(["a (A.b)", "c"])) == ["a (A.b)", "c"]
+    assert cache_codec.decode(cache_codec.encode([{"details": {"nested": 1}}])) == [{"details": {"nested": 1}}]
@@ -0,0 +1,35 @@
+import time
+
+from cache_manager import STALE_MAX_AGE, CacheManager, CachePolicy
+from winget_manager import WingetManager
+
+
+def test_cleanup_keeps_expired_data_for_the_stale_grace_period():
+    cache = CacheManager()
+    cache.set_cached_data("search:studio", ["Studio (Vendor.Studio)"], ttl=0.01)
+    time.sleep(0.05)
+    cache.clear_expired_cache(max_age_seconds=0, stale_max_age=60)
+    assert cache.get_cached_data("search:studio") is None
+    assert cache.get_stale_data("search:studio") == ["Studio (Vendor.Studio)"]
+    # Another instance reads it from the store
+    assert CacheManager().get_stale_data("search:studio") == ["Studio (Vendor.Studio)"]
+
+    cache.clear_expired_cache(max_age_seconds=0, stale_max_age=0)
+    assert cache.get_stale_data("search:studio") is None
+    assert CacheManager().get_stale_data("search:studio") is None
+
+
+def test_stale_grace_period_is_configurable():
+    assert CachePolicy().stale_max_age() == STALE_MAX_AGE
+    assert CachePolicy({"cache_ttls": {"stale": 600}}).stale_max_age() == 600
+
+
+def test_failed_search_falls_back_to_results_kept_by_cleanup(monkeypatch):
+    manager = WingetManager({"resilience": {"attempts": 1}})
+    results = manager.search("Studio")
+    assert results
+    manager.cache.clear_expired_cache(max_age_seconds=0, stale_max_age=manager.cache_policy.stale_max_age())
+
+    monkeypatch.setenv("FAKE_WINGET_FAIL", "search")
+    monkeypatch.setenv("FAKE_WINGET_EXIT_CODE", str(0x80072EFD))
+    assert manager.search("Studio", use_cache=False) == results
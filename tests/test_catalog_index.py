@@ -0,0 +1,56 @@
+import os
+import threading
+
+from catalog_index import POINTER_FILE, CatalogIndex, write_catalog
+from winget_manager import CATALOG_DIR_KEY, catalog_dir
+
+
+def make_records(count, publisher="Vendor"):
+    return [{"name": f"{publisher} Tool{i}", "id": f"{publisher}.Tool{i}", "version": "1.0", "source": ""}
+            for i in range(count)]
+
+
+def test_search_finds_exact_and_fuzzy_matches(tmp_path):
+    write_catalog(str(tmp_path), make_records(200))
+    catalog = CatalogIndex(str(tmp_path))
+    assert catalog.search("Vendor.Tool42", 5)[0]["id"] == "Vendor.Tool42"
+    assert any(record["id"] == "Vendor.Tool42" for record in catalog.search("vendr tool42", 20))
+    assert len(catalog) == 200
+
+
+def test_concurrent_refreshes_leave_one_valid_pointer(tmp_path):
+    errors = []
+
+    def publish(publisher):
+        try:
+            write_catalog(str(tmp_path), make_records(50, publisher))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=publish, args=(f"P{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    with open(tmp_path / POINTER_FILE, encoding="utf-8") as f:
+        assert os.path.exists(tmp_path / f.read().strip())
+    assert len(CatalogIndex(str(tmp_path))) == 50
+
+
+def test_catalog_dir_config_overrides_the_default(tmp_path):
+    assert catalog_dir({CATALOG_DIR_KEY: str(tmp_path / "shared")}) == str(tmp_path / "shared")
+    assert catalog_dir().startswith(os.environ["WINSTALLER_HOME"])
+
+
+def test_refresh_catalog_from_fake_winget(monkeypatch):
+    from winget_manager import WingetManager
+    monkeypatch.setenv("FAKE_WINGET_CATALOG", "300")
+    manager = WingetManager()
+    # Only the winget source's packages, as with the real CATALOG_COMMAND
+    count = manager.refresh_catalog(force=True)
+    assert 0 < count < 300
+    assert len(manager.catalog) == count
+    assert manager.catalog.age_seconds() < 60
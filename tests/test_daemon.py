@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import pytest
+
+from daemon import DaemonClient, DaemonError, DaemonManager, DaemonService, connect_manager, read_daemon_info
+from installation_history import InstallationHistoryManager
+from job_journal import JOB_DONE, JobJournal
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """A daemon serving on a free port from a background thread"""
+    monkeypatch.setenv("FAKE_WINGET_ROWS", "5")
+    service = DaemonService()
+    thread = threading.Thread(target=service.serve, args=(0,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while read_daemon_info() is None:
+        assert time.monotonic() < deadline, "the daemon did not start"
+        time.sleep(0.01)
+    yield service
+    if thread.is_alive():
+        service.shutdown()
+        thread.join(5)
+
+
+@pytest.fixture
+def client(service):
+    client = DaemonClient.connect()
+    yield client
+    client.close()
+
+
+def test_round_trip(client):
+    assert client.call("ping")["pid"] == os.getpid()
+    assert len(client.call("list")) == 5
+    with pytest.raises(DaemonError, match="Unknown method"):
+        client.call("format_disk")
+
+
+def test_wrong_token_is_rejected(service):
+    intruder = DaemonClient(dict(read_daemon_info(), token="0" * 32))
+    with pytest.raises(DaemonError, match="unauthorized"):
+        intruder.call("ping")
+    # The daemon hung up on it
+    with pytest.raises(DaemonError):
+        intruder.call("ping")
+    intruder.close()
+
+
+def test_batch_runs_in_the_daemon(service, client):
+    manager = connect_manager({"use_daemon": True})
+    assert isinstance(manager, DaemonManager)
+    packages = [(record["name"], record["id"]) for record in client.call("list")[:3]]
+    seen = []
+    finished = manager.run_job("install", packages, jobs=2, on_item=seen.append)
+    assert sorted(item["id"] for item in finished) == sorted(package_id for _, package_id in packages)
+    assert all(item["success"] for item in finished)
+    assert sorted(item["id"] for item in seen) == sorted(item["id"] for item in finished)
+    # Recorded by the daemon, in the shared history and journal
+    assert len(InstallationHistoryManager().get_installation_history()) == 3
+    assert client.call("journal")[0]["state"] == JOB_DONE
+    manager.client.close()
+
+
+def test_interrupted_job_resumes_in_the_daemon(service, client):
+    packages = [(record["name"], record["id"]) for record in client.call("list")[:3]]
+    journal = JobJournal()
+    job_id = journal.create("uninstall", packages)
+    journal.mark_running(job_id, packages[0][1])
+    journal.finish_item(job_id, packages[0][1], True)
+    journal.store.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+    assert [job["id"] for job in client.call("interrupted_jobs")] == [job_id]
+
+    manager = DaemonManager(client)
+    finished = manager.resume_job(job_id)
+    assert [item["id"] for item in finished] == [package_id for _, package_id in packages[1:]]
+    assert journal.get(job_id)["state"] == JOB_DONE
+    assert manager.resume_job(job_id + 1) is None
+
+
+def test_shutdown_removes_the_daemon_file(service, client):
+    assert client.call("shutdown") is True
+    deadline = time.monotonic() + 5
+    while read_daemon_info() is not None:
+        assert time.monotonic() < deadline, "the daemon did not stop"
+        time.sleep(0.01)
+    assert DaemonClient.connect() is None
+    assert not isinstance(connect_manager({"use_daemon": True}), DaemonManager)
+
+
+class GoneDaemon:
+    """A client whose daemon has gone away"""
+
+    def call(self, method, **params):
+        raise DaemonError("Daemon connection failed: refused")
+
+
+def test_listeners_hear_each_listing_once(client):
+    heard = []
+    for manager in (DaemonManager(client), DaemonManager(GoneDaemon())):
+        heard.clear()
+        manager.add_listener(lambda kind, records: heard.append(kind))
+        assert len(manager.list_installed_records(use_cache=False)) == 5
+        assert heard == ["installed"]
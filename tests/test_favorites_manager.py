@@ -0,0 +1,30 @@
+from favorites_manager import FavoritesManager
+
+
+def fail_writes(favorites, monkeypatch):
+    def executemany(sql, rows):
+        raise OSError("disk full")
+    monkeypatch.setattr(favorites.store, "executemany", executemany)
+
+
+def test_failed_bulk_add_leaves_favorites_unchanged(monkeypatch):
+    favorites = FavoritesManager()
+    assert favorites.bulk_add([("Git", "Git.Git"), ("Git", "Git.Git")]) == 1
+    fail_writes(favorites, monkeypatch)
+    assert favorites.bulk_add([("Firefox", "Mozilla.Firefox")]) == 0
+    assert not favorites.is_favorite("Mozilla.Firefox")
+    assert [fav["package_id"] for fav in FavoritesManager().get_favorites()] == ["Git.Git"]
+
+
+def test_failed_bulk_remove_leaves_favorites_unchanged(monkeypatch):
+    favorites = FavoritesManager()
+    favorites.bulk_add([("Git", "Git.Git"), ("Firefox", "Mozilla.Firefox")])
+    favorites.update_inventory([{"id": "Git.Git", "version": "2.45.0"}])
+    fail_writes(favorites, monkeypatch)
+    assert favorites.bulk_remove(["Git.Git"]) == 0
+    assert favorites.is_favorite("Git.Git")
+    assert favorites._status["Git.Git"]["installed_version"] == "2.45.0"
+
+    monkeypatch.undo()
+    assert favorites.bulk_remove(["Git.Git", "Git.Git"]) == 1
+    assert [fav["package_id"] for fav in FavoritesManager().get_favorites()] == ["Mozilla.Firefox"]
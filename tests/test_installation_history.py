@@ -0,0 +1,54 @@
+from installation_history import InstallationHistoryManager
+from state_store import INSERT_HISTORY, history_row
+
+
+def fill(history, count):
+    """count entries spread over three packages, oldest first"""
+    packages = ["Git.Git", "GitHub.GitHubDesktop", "Mozilla.Firefox"]
+    history.store.executemany(INSERT_HISTORY, (history_row({
+        "date": f"2026-01-01T00:00:{i % 60:02d}", "action": "install", "status": "success",
+        "app_name": packages[i % 3], "package_id": packages[i % 3]}) for i in range(count)))
+
+
+def test_pages_continue_from_the_last_id():
+    history = InstallationHistoryManager()
+    fill(history, 1000)
+    query = history.query(action="install")
+    entries, last_id = query.page(300)
+    while True:
+        page, next_id = query.page(300, last_id)
+        if not page:
+            break
+        entries += page
+        last_id = next_id
+    assert len(entries) == len(query) == 1000
+    assert entries == query.fetch(0, 1000)
+
+
+def test_package_filter_matches_id_prefixes_case_insensitively():
+    history = InstallationHistoryManager()
+    fill(history, 30)
+    assert {entry["package_id"] for entry in history.query(package="git").fetch(0, 100)} == {
+        "Git.Git", "GitHub.GitHubDesktop"}
+    assert len(history.query(package="Git.Git")) == 10
+    # Not a substring search
+    assert len(history.query(package="firefox")) == 0
+
+
+def test_package_prefix_filter_uses_an_index():
+    history = InstallationHistoryManager()
+    query = history.query(package="git")
+    plan = history.store.query("EXPLAIN QUERY PLAN SELECT id FROM history" + query._where(query._clauses),
+                               query._params)
+    assert any("history_package_nocase" in row[-1] for row in plan)
+
+
+def test_success_rate_keeps_counting_installs_only():
+    history = InstallationHistoryManager()
+    history.add_installation("Git", "Git.Git")
+    history.add_installation("Firefox", "Mozilla.Firefox", status="failed")
+    history.add_uninstallation("Git", "Git.Git")
+    history.add_uninstallation("Git", "Git.Git")
+    stats = history.get_installation_stats()
+    assert stats["success_rate"] == stats["install_success_rate"] == 50
+    assert stats["overall_success_rate"] == 75
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from installation_history import InstallationHistoryManager
+from job_journal import ITEM_DONE, JOB_DONE, JobJournal
+from jobs import JobQueue, resume_job, run_batch
+from winget_manager import WingetManager
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_ROWS", "4")
+    return [(record["name"], record["id"]) for record in WingetManager().list_installed_records(use_cache=False)]
+
+
+def winget_runs(log, command):
+    """Package ids winget was asked to `command`, in order"""
+    calls = [json.loads(line)["args"] for line in log.read_text().splitlines()]
+    return [args[-1] for args in calls if args[0] == command]
+
+
+def interrupt(journal, job_id, done, in_flight):
+    """Leave the job as a crash would: some items done, one running, no heartbeat"""
+    for package_id in done:
+        journal.mark_running(job_id, package_id)
+        journal.finish_item(job_id, package_id, True, 1.0)
+    journal.mark_running(job_id, in_flight)
+    journal.store.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+
+
+def test_run_batch_checkpoints_every_item(installed):
+    journal = JobJournal()
+    job_id = journal.create("install", installed)
+    finished = run_batch(WingetManager(), InstallationHistoryManager(), "install", installed, 2,
+                         journal=journal, job_id=job_id)
+    assert len(finished) == len(installed)
+    job = journal.get(job_id)
+    assert job["state"] == JOB_DONE
+    assert {item["state"] for item in job["items"]} == {ITEM_DONE}
+
+
+def test_resume_skips_done_items_and_verifies_the_one_in_flight(installed, monkeypatch, tmp_path):
+    journal = JobJournal()
+    packages = installed[:3]
+    job_id = journal.create("install", packages)
+    interrupt(journal, job_id, done=[packages[0][1]], in_flight=packages[1][1])
+    assert [job["id"] for job in journal.interrupted()] == [job_id]
+
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    history = InstallationHistoryManager()
+    finished = resume_job(WingetManager(), history, journal, job_id, 1)
+    # The in-flight install finished before the crash: the inventory shows it
+    assert winget_runs(log, "install") == [packages[2][1]]
+    assert [item["id"] for item in finished] == [packages[2][1]]
+    assert len(history.get_installation_history()) == 1
+    assert journal.get(job_id)["state"] == JOB_DONE
+    assert journal.interrupted() == []
+
+
+def test_resume_reruns_an_in_flight_uninstall_that_did_not_happen(installed, monkeypatch, tmp_path):
+    journal = JobJournal()
+    packages = installed[:3]
+    job_id = journal.create("uninstall", packages)
+    interrupt(journal, job_id, done=[packages[0][1]], in_flight=packages[1][1])
+
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    resume_job(WingetManager(), None, journal, job_id, 1)
+    # Still in the inventory, so it runs again
+    assert winget_runs(log, "uninstall") == [packages[1][1], packages[2][1]]
+
+
+def test_a_job_with_a_fresh_heartbeat_is_not_claimed(installed):
+    journal = JobJournal()
+    job_id = journal.create("install", installed)
+    journal.mark_running(job_id, installed[0][1])
+    assert journal.interrupted() == []
+    assert resume_job(WingetManager(), None, journal, job_id, 1) is None
+
+
+def test_a_just_interrupted_job_is_recently_active_until_its_heartbeat_is_stale(installed):
+    journal = JobJournal()
+    job_id = journal.create("install", installed)
+    journal.mark_running(job_id, installed[0][1])
+    assert [job["id"] for job in journal.recently_active()] == [job_id]
+    journal.store.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+    assert journal.recently_active() == []
+    assert [job["id"] for job in journal.interrupted()] == [job_id]
+
+
+def test_ids_differing_only_in_case_run_once_and_are_journaled_once(installed, monkeypatch, tmp_path):
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    name, package_id = installed[0]
+    packages = [(name, package_id), (name.lower(), package_id.upper())]
+    journal = JobJournal()
+    job_id = journal.create("install", packages)
+    finished = run_batch(WingetManager(), None, "install", packages, 2, journal=journal, job_id=job_id)
+    assert [item["id"] for item in finished] == [package_id]
+    assert winget_runs(log, "install") == [package_id]
+    assert [(item["id"], item["state"]) for item in journal.get(job_id)["items"]] == [(package_id, ITEM_DONE)]
+
+
+def test_queued_batches_run_one_after_another(installed, monkeypatch, tmp_path):
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    monkeypatch.setenv("FAKE_WINGET_LATENCY_INSTALL", "0.2")
+    monkeypatch.setenv("FAKE_WINGET_LATENCY_UNINSTALL", "0.2")
+    queue = JobQueue(WingetManager(), InstallationHistoryManager(), journal=JobJournal())
+    first = queue.submit("install", installed[:2], jobs=2)
+    second = queue.submit("uninstall", installed[2:], jobs=2)
+    assert queue.wait(second["id"], timeout=10)["state"] == "done"
+    assert queue.wait(first["id"])["state"] == "done"
+    calls = [json.loads(line) for line in log.read_text().splitlines()]
+    last_install = max(call["time"] for call in calls if call["args"][0] == "install")
+    first_uninstall = min(call["time"] for call in calls if call["args"][0] == "uninstall")
+    # Logged as winget starts, before its latency: the uninstalls began after the installs had
+    assert first_uninstall > last_install + 0.15
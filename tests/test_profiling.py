@@ -0,0 +1,44 @@
+import os
+import pstats
+import threading
+
+import pytest
+
+import profiling
+from jobs import run_batch
+from winget_manager import WingetManager, parse_winget_table
+
+TABLE = "Name  Id       Version\n----------------------\nGit   Git.Git  2.45\n"
+
+
+@pytest.fixture
+def profiles(monkeypatch, tmp_path):
+    """Profiling switched on for batch and parse, writing to a temporary folder"""
+    monkeypatch.setenv(profiling.PROFILE_DIR_ENV, str(tmp_path / "profiles"))
+    profiling.configure("batch,parse", "cprofile")
+    yield tmp_path / "profiles"
+    profiling.configure("", "cprofile")
+    profiling._profilers.clear()
+    profiling._samples.clear()
+
+
+def functions(path):
+    return {name for _, _, name in pstats.Stats(str(path)).stats}
+
+
+def test_batch_profile_covers_the_workers_and_leaves_other_scopes_on(profiles, monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_ROWS", "4")
+    monkeypatch.setenv("FAKE_WINGET_LATENCY_INSTALL", "0.2")
+    manager = WingetManager()
+    packages = [(record["name"], record["id"]) for record in manager.list_installed_records(use_cache=False)]
+    batch = threading.Thread(target=run_batch, args=(manager, None, "install", packages, 2))
+    batch.start()
+    # While the batch runs, parsing on another thread is still profiled
+    assert profiling.profiled("parse")(parse_winget_table)(TABLE)
+    batch.join()
+
+    written = sorted(profiling.write_profiles())
+    assert [os.path.basename(path).split("-")[0] for path in written] == ["batch", "parse"]
+    # The winget runs themselves, from both workers, not just the thread that waited on them
+    assert {"install", "_run_winget_once"} <= functions(written[0])
+    assert "parse_winget_table" in functions(written[1])
@@ -0,0 +1,90 @@
+import json
+import time
+
+import pytest
+
+from metrics import metrics
+from resilience import ALL_SOURCES, FAILURE_NETWORK, CircuitBreaker, classify_failure
+from winget_manager import WingetManager
+
+CANNOT_CONNECT = str(0x80072EFD)
+
+
+def counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def winget_runs(log):
+    return [json.loads(line)["args"] for line in log.read_text().splitlines()] if log.exists() else []
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path):
+    """winget searches fail with a network error; returns the call log"""
+    monkeypatch.setenv("FAKE_WINGET_FAIL", "search")
+    monkeypatch.setenv("FAKE_WINGET_EXIT_CODE", CANNOT_CONNECT)
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    return log
+
+
+def make_manager(reset_after=60.0):
+    return WingetManager({"resilience": {"attempts": 1, "failure_threshold": 2, "reset_after": reset_after}})
+
+
+def test_injected_failures_are_network_failures():
+    output = "An unexpected error occurred while executing the command:\n0x80072efd : injected failure\n"
+    assert classify_failure(0xFD, output) == FAILURE_NETWORK
+
+
+def test_breaker_opens_after_consecutive_failures(offline):
+    manager = make_manager()
+    for _ in range(2):
+        assert manager.search("Studio", use_cache=False) == []
+    assert manager.resilience.breaker.snapshot()[ALL_SOURCES]["open"]
+    assert counter("winget.circuit.opened") == 1
+
+    assert manager.search("Studio", use_cache=False) == []
+    assert len(winget_runs(offline)) == 2, "an open breaker must not start winget"
+    assert counter("winget.search.circuit_open") == 1
+
+
+def test_open_source_breaker_stops_searches_of_every_source(offline):
+    manager = make_manager()
+    for _ in range(2):
+        manager.search_source("Studio", "msstore", use_cache=False)
+    assert manager.resilience.breaker.snapshot()["msstore"]["open"]
+
+    manager.search("Studio", use_cache=False)
+    assert len(winget_runs(offline)) == 2
+    assert counter("winget.search.circuit_open") == 1
+    # The healthy source can still be searched on its own
+    manager.search_source("Studio", "winget", use_cache=False)
+    assert len(winget_runs(offline)) == 3
+
+
+def test_breaker_closes_after_a_successful_probe(offline, monkeypatch):
+    manager = make_manager(reset_after=0.2)
+    for _ in range(2):
+        manager.search_source("Studio", "msstore", use_cache=False)
+    assert manager.resilience.breaker.snapshot()["msstore"]["open"]
+
+    monkeypatch.delenv("FAKE_WINGET_FAIL")
+    time.sleep(0.3)
+    # A search of every source probes msstore too, and closes its breaker
+    assert manager.search("Studio", use_cache=False)
+    assert manager.resilience.breaker.snapshot() == {}
+    assert counter("winget.circuit.closed") == 1
+
+
+def test_failed_probe_keeps_the_breaker_open_for_longer():
+    breaker = CircuitBreaker(threshold=1, reset_after=0.1)
+    breaker.record_failure("winget")
+    assert not breaker.allow("winget")
+    time.sleep(0.15)
+    assert breaker.allow("winget")
+    # Only one caller probes at a time
+    assert not breaker.allow("winget")
+    breaker.record_failure("winget")
+    time.sleep(0.15)
+    assert not breaker.allow("winget"), "a failed probe doubles the pause"
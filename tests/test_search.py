@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from winget_manager import WingetManager, parse_winget_table
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv("FAKE_WINGET_CATALOG", "400")
+    manager = WingetManager()
+    manager.refresh_catalog(force=True)
+    return manager
+
+
+def store_packages(manager):
+    return manager.search_source("a", "msstore", use_cache=False)
+
+
+def test_package_only_in_msstore_is_found_by_id(manager):
+    package = store_packages(manager)[0]
+    assert f"{package['name']} ({package['id']})" in manager.search(package["id"])
+
+
+def test_msstore_packages_are_found_when_the_catalog_answers(manager):
+    package = store_packages(manager)[0]
+    publisher = package["name"].split()[0]
+    catalog_hits = manager._catalog_records(publisher, 100)
+    assert catalog_hits, "the catalog itself should have matches for the publisher"
+    results = manager.search(publisher)
+    # The store package, which the winget-only catalog can't know about
+    assert f"{package['name']} ({package['id']})" in results
+    assert f"{catalog_hits[0]['name']} ({catalog_hits[0]['id']})" in results
+
+
+def test_only_fuzzy_catalog_matches_go_to_winget(manager, monkeypatch, tmp_path):
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    name = manager._catalog_records("Studio", 1)[0]["name"]
+    typo = name[:-1] + "#"  # close to a name, but contained in none
+    assert manager.search_catalog(typo)
+    manager.search(typo)
+    assert '"search", "' + typo in log.read_text()
+
+
+def test_parse_winget_table_handles_truncated_columns():
+    output = ("Name              Id                Version\n"
+              "--------------------------------------------\n"
+              "Mozilla Firefox   Mozilla.Firefox   125.0\n"
+              "Visual Studio Co… Microsoft.VisualS… 1.89\n")
+    records = parse_winget_table(output)
+    assert records[0] == {"name": "Mozilla Firefox", "id": "Mozilla.Firefox", "version": "125.0"}
+    assert len(records) == 2
+
+
+def test_concurrent_listings_share_one_winget_run(monkeypatch, tmp_path):
+    log = tmp_path / "winget.log"
+    monkeypatch.setenv("FAKE_WINGET_LOG", str(log))
+    monkeypatch.setenv("FAKE_WINGET_LATENCY", "0.3")
+    manager = WingetManager()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.list_installed_records(use_cache=False)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4 and all(result == results[0] for result in results)
+    assert log.read_text().count('"list"') == 1
+
+
+def test_search_sources_merges_every_source():
+    manager = WingetManager()
+    seen = []
+    records = manager.search_sources("Adobe", on_source_results=lambda source, found: seen.append(source))
+    assert sorted(seen) == ["msstore", "winget"]
+    assert {"winget", "msstore"} == {record["source"] for record in records}
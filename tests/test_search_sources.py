@@ -0,0 +1,49 @@
+import time
+
+import winget_manager
+from winget_manager import WingetManager
+
+
+class StandInSources(WingetManager):
+    """Sources answered locally: source -> (seconds to answer, records)"""
+
+    def __init__(self, answers, timeout=1.0):
+        super().__init__({"search_sources": list(answers), "search_source_timeout": timeout})
+        self.answers = answers
+
+    def search_source(self, query, source, timeout=winget_manager.SOURCE_TIMEOUT, use_cache=True):
+        seconds, records = self.answers[source]
+        time.sleep(seconds)
+        return [dict(record, source=source) for record in records]
+
+
+def package(name, package_id):
+    return {"name": name, "id": package_id, "version": "1.0"}
+
+
+def test_sources_are_merged_deduplicated_and_ranked():
+    manager = StandInSources({
+        "winget": (0, [package("Git Extensions", "GitExtensionsTeam.GitExtensions"), package("Git", "Git.Git")]),
+        "internal": (0, [package("Git", "Git.Git"), package("GitHub Desktop", "GitHub.GitHubDesktop")]),
+    })
+    records = manager.search_sources("git")
+    assert [record["id"] for record in records][0] == "Git.Git"
+    assert len(records) == 3
+    git = records[0]
+    assert git["source"] == "winget" and git["sources"] == ["winget", "internal"]
+
+
+def test_slow_source_does_not_hold_back_the_others(monkeypatch):
+    monkeypatch.setattr(winget_manager, "SOURCE_TIMEOUT_MARGIN", 0)
+    manager = StandInSources({
+        "winget": (0, [package("Git", "Git.Git")]),
+        "internal": (0.05, [package("Git Internal", "Corp.GitInternal")]),
+        "slow": (2, [package("Git Slow", "Corp.GitSlow")]),
+    }, timeout=0.5)
+    seen = []
+    started = time.monotonic()
+    records = manager.search_sources("git", lambda source, found: seen.append(source))
+    assert time.monotonic() - started < 1.5
+    assert [record["source"] for record in records] == ["winget", "internal"]
+    # Streamed as each source finished, fastest first
+    assert seen == ["winget", "internal"]
@@ -0,0 +1,61 @@
+import json
+import os
+
+from state_store import LEGACY_MIGRATED_KEY, StateStore
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def favorites_in(store):
+    return [row[0] for row in store.query("SELECT package_id FROM favorites")]
+
+
+def test_working_directory_is_never_migrated(tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    project.mkdir()
+    write_json(project / "config.json", {"name": "project", "version": "1.0"})
+    monkeypatch.chdir(project)
+    store = StateStore(str(tmp_path / "state.db"))
+    assert (project / "config.json").exists()
+    assert store.query("SELECT key FROM config") == []
+    store.close()
+
+
+def test_legacy_files_are_imported_and_set_aside(tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    write_json(app / "favorites.json", {"favorites": [{"package_id": "Git.Git", "app_name": "Git"}]})
+    write_json(app / "config.json", {"theme": "dark"})
+    store = StateStore(str(tmp_path / "state.db"), migrate=False)
+    imported = store.migrate_legacy_files([str(app)])
+    assert sorted(os.path.basename(path) for path in imported) == ["config.json", "favorites.json"]
+    assert favorites_in(store) == ["Git.Git"]
+    assert (app / "favorites.json.bak").exists() and not (app / "favorites.json").exists()
+    store.close()
+
+
+def test_files_of_another_shape_are_left_alone(tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    write_json(app / "favorites.json", ["not", "favorites"])
+    write_json(app / "installation_history.json", {"name": "something else"})
+    store = StateStore(str(tmp_path / "state.db"), migrate=False)
+    assert store.migrate_legacy_files([str(app)]) == []
+    assert (app / "favorites.json").exists() and (app / "installation_history.json").exists()
+    assert favorites_in(store) == []
+    store.close()
+
+
+def test_migration_runs_once(tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    store = StateStore(str(tmp_path / "state.db"), migrate=False)
+    assert store.migrate_legacy_files([str(app)]) == []
+    assert store.query_one("SELECT value FROM meta WHERE key = ?", (LEGACY_MIGRATED_KEY,)) == (1,)
+    write_json(app / "favorites.json", {"favorites": [{"package_id": "Git.Git"}]})
+    assert store.migrate_legacy_files([str(app)]) == []
+    assert (app / "favorites.json").exists()
+    store.close()